@@ -2,5 +2,11 @@ from django.contrib import admin
 
 # Register your models here.
 from .models import Company
+from talent_bridge_cron.routers import ReplicaChangeListMixin
 
-admin.site.register(Company)
\ No newline at end of file
+
+class CompanyAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    pass
+
+
+admin.site.register(Company, CompanyAdmin)
\ No newline at end of file
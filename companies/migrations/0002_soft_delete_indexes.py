@@ -0,0 +1,17 @@
+# Generated by Django 4.1.2 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='company',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['name'], name='companies_live_name_idx'),
+        ),
+    ]
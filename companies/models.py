@@ -11,6 +11,11 @@ class Company(AbstractBaseModel):
     job_openings = models.IntegerField(default=0)
     logo = models.ImageField(upload_to='companies/', storage=PublicMediaStorage)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], condition=models.Q(is_deleted=False), name='companies_live_name_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         try:
             this = Company.objects.get(id=self.id)
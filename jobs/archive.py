@@ -0,0 +1,84 @@
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Prefetch
+from django.utils import timezone
+
+from jobs.models import ArchivedJob, JobLocation, Jobs
+from skills.models import Skills
+
+
+def archivable_jobs(days=None):
+    """
+    Jobs closed more than ``days`` ago. A job other jobs are still marked duplicates of stays, its duplicate
+    cluster would fall apart, it is archived once they are gone.
+    """
+    days = days if days is not None else settings.JOBS_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    duplicates = Jobs.all_with_deleted.filter(duplicate_of=OuterRef('pk'))
+
+    return Jobs.all_with_deleted.filter(available=False, unavailable_date__lt=cutoff).exclude(Exists(duplicates))
+
+
+def to_archived_job(job):
+    return ArchivedJob(
+        original_id=job.id, original_created=job.created, company_id=job.company_id, job_id=job.job_id, title=job.title, category=job.category,
+        sub_category=job.sub_category, post=job.post, job_url=job.job_url,
+        required_experience=job.required_experience, reviewed=job.reviewed, remote=job.remote,
+        in_office=job.in_office, date=job.date, unavailable_date=job.unavailable_date, is_deleted=job.is_deleted,
+        locations=[
+            {'location_id': job_location.location_id, 'city': job_location.location.city,
+             'state': job_location.location.state, 'country': job_location.location.country,
+             'remote': job_location.remote}
+            for job_location in job.archive_locations
+        ],
+        skills=[{'skill_id': skill.id, 'name': skill.name} for skill in job.required_skills.all()],
+    )
+
+
+@transaction.atomic
+def archive_batch(job_ids):
+    """Copies the jobs to the archive and deletes them with their location and skill links, all or nothing."""
+    # Soft deleted links, locations and skills are archived too, like the soft deleted jobs themselves
+    jobs = Jobs.all_with_deleted.filter(id__in=job_ids).prefetch_related(
+        Prefetch('joblocation_set', queryset=JobLocation.all_with_deleted.select_related('location').order_by('id'),
+                 to_attr='archive_locations'),
+        Prefetch('required_skills', queryset=Skills.all_with_deleted.all()),
+    )
+
+    ArchivedJob.objects.bulk_create([to_archived_job(job) for job in jobs], ignore_conflicts=True)
+    Jobs.all_with_deleted.filter(id__in=job_ids).delete()
+
+
+def archive_jobs(days=None, batch_size=500):
+    """Archives every job closed more than ``days`` ago, ``batch_size`` at a time. Yields the size of each batch."""
+    while True:
+        job_ids = list(archivable_jobs(days).order_by('id').values_list('id', flat=True)[:batch_size])
+
+        if not job_ids:
+            return
+
+        archive_batch(job_ids)
+        yield len(job_ids)
+
+
+def job_seen(**filters):
+    """
+    Whether a job matching ``filters`` (``job_id`` with ``company`` or ``company__name``) was scraped before, live,
+    soft deleted or archived. Scrapers use it to tell new jobs from ones they already stored.
+    """
+    return Jobs.all_with_deleted.filter(**filters).exists() or ArchivedJob.all_with_deleted.filter(**filters).exists()
+
+
+def get_job(pk):
+    """
+    The job with id ``pk`` whether it is still in the jobs table or archived. Archived jobs come back as
+    ArchivedJob with ``locations`` and ``skills`` as lists of dicts.
+    """
+    job = Jobs.objects.filter(id=pk).first()
+
+    if job is None:
+        job = ArchivedJob.objects.filter(original_id=pk).first()
+
+    return job
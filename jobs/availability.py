@@ -0,0 +1,204 @@
+import asyncio
+import datetime
+import math
+import re
+from collections import defaultdict
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from jobs.models import Jobs
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36'
+
+OPEN = 'open'
+CLOSED = 'closed'
+UNKNOWN = 'unknown'
+
+# Answers to HEAD that say nothing about the job, the request is repeated as a GET
+HEAD_UNSUPPORTED_STATUSES = (403, 405, 501)
+
+
+def normalize_url(url):
+    parts = urlsplit(url)
+    return f'{parts.netloc.lower()}{parts.path.rstrip("/")}'
+
+
+class AvailabilityRule:
+    """
+    Decides from a single unfollowed response whether a job posting is still open.
+
+    * closed_statuses: status codes meaning the posting is gone
+    * closed_on_redirect: a redirect to anything but the job url itself (trailing slash, http -> https) means closed
+    * closed_markers: regexes that mark a closed posting in a page that still answers 200, these need a GET
+    * open_markers: regexes one of which an open posting's page always has, a 200 page without any is closed.
+      For sites that answer closed postings with a generic page redirecting client side, also need a GET
+    * check_url: builds the url to request from the job url, e.g. a JSON endpoint instead of the rendered page
+    """
+
+    def __init__(self, closed_statuses=(404, 410), closed_on_redirect=True, closed_markers=(), open_markers=(),
+                 check_url=None):
+        self.closed_statuses = closed_statuses
+        self.closed_on_redirect = closed_on_redirect
+        self.closed_markers = [re.compile(marker, re.IGNORECASE) for marker in closed_markers]
+        self.open_markers = [re.compile(marker, re.IGNORECASE) for marker in open_markers]
+        self.check_url = check_url or (lambda job_url: job_url)
+
+    @property
+    def needs_body(self):
+        return bool(self.closed_markers or self.open_markers)
+
+    def status(self, url, status, location=None, body=''):
+        if status in self.closed_statuses:
+            return CLOSED
+
+        if 300 <= status < 400:
+            if not self.closed_on_redirect or not location:
+                return UNKNOWN
+
+            return OPEN if normalize_url(urljoin(url, location)) == normalize_url(url) else CLOSED
+
+        if status >= 400:
+            return UNKNOWN
+
+        if any(marker.search(body) for marker in self.closed_markers):
+            return CLOSED
+
+        if self.open_markers and not any(marker.search(body) for marker in self.open_markers):
+            return CLOSED
+
+        return OPEN
+
+
+def workable_api_url(job_url):
+    # apply.workable.com/<account>/j/<shortcode> renders client side, the API behind it answers 404 once closed
+    account, shortcode = re.search(r'apply\.workable\.com/([^/]+)/j/([^/?#]+)', job_url).groups()
+    return f'https://apply.workable.com/api/v2/accounts/{account}/jobs/{shortcode}'
+
+
+# Company name -> rule, companies not listed use the default rule
+AVAILABILITY_RULES = {
+    'default': AvailabilityRule(),
+    'BrowserStack': AvailabilityRule(closed_on_redirect=False, check_url=workable_api_url),
+    # A closed Meta posting still answers 200 with the bare careers shell, whose script then sends the browser
+    # to the job search (what the Selenium scraper sees as a changed current_url). Only an open posting's page
+    # carries its JobPosting structured data.
+    'Meta': AvailabilityRule(open_markers=(r'"@type"\s*:\s*"JobPosting"',)),
+    'Walmart Global Tech India': AvailabilityRule(
+        closed_markers=(r'no longer (available|accepting applications)', r'job (you are looking for|has been) (closed|filled)')),
+}
+
+
+def get_rule(company_name):
+    return AVAILABILITY_RULES.get(company_name, AVAILABILITY_RULES['default'])
+
+
+class AvailabilityChecker:
+    """
+    Checks job urls concurrently without a browser. Each url gets a HEAD (or a GET when the rule reads the page
+    or the server refuses HEAD), redirects are not followed so the rule sees where the job would send us.
+    Requests per domain are capped so a single careers site is never hammered.
+    """
+
+    def __init__(self, concurrency=None, per_domain=None, timeout=None):
+        self.concurrency = concurrency or settings.AVAILABILITY_CONCURRENCY
+        self.per_domain = per_domain or settings.AVAILABILITY_PER_DOMAIN_CONCURRENCY
+        self.timeout = aiohttp.ClientTimeout(total=timeout or settings.AVAILABILITY_TIMEOUT)
+        self.domain_semaphores = defaultdict(lambda: asyncio.Semaphore(self.per_domain))
+
+    async def fetch(self, session, method, url, read_body):
+        async with session.request(method, url, allow_redirects=False) as response:
+            body = await response.text(errors='replace') if read_body else ''
+            return response.status, response.headers.get('Location'), body
+
+    async def check(self, session, job_key, job_url, rule):
+        url = rule.check_url(job_url)
+
+        async with self.domain_semaphores[urlsplit(url).netloc]:
+            try:
+                if rule.needs_body:
+                    status, location, body = await self.fetch(session, 'GET', url, True)
+                else:
+                    status, location, body = await self.fetch(session, 'HEAD', url, False)
+
+                    if status in HEAD_UNSUPPORTED_STATUSES:
+                        status, location, body = await self.fetch(session, 'GET', url, False)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as error:
+                return job_key, UNKNOWN, repr(error)
+
+        return job_key, rule.status(url, status, location, body), status
+
+    async def check_all(self, jobs):
+        """
+        ``jobs`` is an iterable of ``(job_key, job_url, company_name)``, yields ``(job_key, status, detail)``
+        as results come in, detail being the HTTP status or the error.
+        """
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout,
+                                         headers={'User-Agent': USER_AGENT}) as session:
+            tasks = [asyncio.ensure_future(self.check(session, job_key, job_url, get_rule(company_name)))
+                     for job_key, job_url, company_name in jobs]
+
+            for task in asyncio.as_completed(tasks):
+                yield await task
+
+
+def check_availability(jobs, **kwargs):
+    """Blocking wrapper around AvailabilityChecker.check_all, returns the list of results."""
+    async def collect():
+        return [result async for result in AvailabilityChecker(**kwargs).check_all(jobs)]
+
+    return asyncio.run(collect())
+
+
+def company_closure_rates():
+    """
+    Estimated daily closure rate per company id: jobs closed in the last AVAILABILITY_CLOSURE_RATE_WINDOW_DAYS
+    days over the job-days the company had open in that window. Every job counted is taken as open for the whole
+    window, which undercounts the rate of companies with many short-lived postings but needs no per-job dates,
+    next_check_at clamps the intervals it produces anyway.
+    """
+    window = settings.AVAILABILITY_CLOSURE_RATE_WINDOW_DAYS
+    since = timezone.now() - datetime.timedelta(days=window)
+
+    counts = Jobs.objects.filter(Q(available=True) | Q(unavailable_date__gte=since)).values('company_id').annotate(
+        open_jobs=Count('id', filter=Q(available=True)), closed_jobs=Count('id', filter=Q(available=False)))
+
+    return {
+        row['company_id']: row['closed_jobs'] / ((row['open_jobs'] + row['closed_jobs']) * window)
+        for row in counts if row['closed_jobs']
+    }
+
+
+def next_check_at(job, closure_rates, now=None):
+    """
+    When ``job`` should be checked again: the time until the chance it closed reaches
+    AVAILABILITY_RECHECK_PROBABILITY, given its company's closure rate rising with the job's age.
+    """
+    now = now or timezone.now()
+    rate = closure_rates.get(job.company_id, settings.AVAILABILITY_DEFAULT_CLOSURE_RATE)
+    age_days = max((now - job.date).total_seconds() / 86400, 0)
+    hazard = rate * (1 + age_days / settings.AVAILABILITY_AGE_SCALE_DAYS)
+
+    interval_days = -math.log(1 - settings.AVAILABILITY_RECHECK_PROBABILITY) / hazard
+    interval_days = min(max(interval_days, settings.AVAILABILITY_MIN_RECHECK_HOURS / 24),
+                        settings.AVAILABILITY_MAX_RECHECK_DAYS)
+
+    return now + datetime.timedelta(days=interval_days)
+
+
+def due_jobs(queryset, budget=None, now=None):
+    """
+    Jobs of ``queryset`` whose check is due, never scheduled ones first, then the most overdue,
+    capped at ``budget`` (AVAILABILITY_REQUEST_BUDGET) requests.
+    """
+    now = now or timezone.now()
+    budget = budget or settings.AVAILABILITY_REQUEST_BUDGET
+
+    return queryset.filter(Q(next_check_at__isnull=True) | Q(next_check_at__lte=now)).order_by(
+        F('next_check_at').asc(nulls_first=True), 'date')[:budget]
@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import re
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+# Near duplicate jobs (the same role reposted under another id or by an agency) share most of their text.
+# Each job gets a 64 bit SimHash of the 3 word shingles of its title and post, split in 4 indexed 16 bit bands.
+# Two jobs within DUPLICATE_MAX_DISTANCE (< 4) differing bits share at least one band, so candidates are found
+# with one indexed lookup per band and only their signatures are compared, never the posts.
+# Only live jobs are signed and clustered, a soft deleted job never heads a cluster. Jobs with too little text to
+# tell apart (a title without its post) are not signed at all, their signatures would collide across companies.
+
+logger = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 3
+BANDS = 4
+BAND_BITS = 16
+BAND_FIELDS = [f'simhash_band_{band}' for band in range(BANDS)]
+MASK = (1 << 64) - 1
+MIN_WORDS = 20  # Words the title and post of a job need together to be signed
+
+
+def words(text):
+    text = re.sub(r'<[^>]+>', ' ', text or '')
+    return re.findall(r'\w+', text.lower())
+
+
+def simhash(title, post):
+    """Unsigned 64 bit SimHash of the shingles of ``title`` and ``post``."""
+    tokens = words(title) + words(post)
+    count = max(len(tokens) - SHINGLE_SIZE + 1, 1)
+    shingles = {' '.join(tokens[index:index + SHINGLE_SIZE]) for index in range(count)}
+    weights = [0] * 64
+
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+def to_signed(value):
+    # Stored in a signed BIGINT column
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def bands(value):
+    return [(value >> (band * BAND_BITS)) & ((1 << BAND_BITS) - 1) for band in range(BANDS)]
+
+
+def distance(first, second):
+    return bin((first ^ second) & MASK).count('1')
+
+
+def set_signature(job):
+    """
+    Fills in the SimHash fields of ``job`` from its title and post, without saving. Returns False and leaves them
+    empty when the job has fewer than MIN_WORDS words.
+    """
+    if len(words(job.title)) + len(words(job.post)) < MIN_WORDS:
+        return False
+
+    value = simhash(job.title, job.post)
+    job.simhash = to_signed(value)
+
+    for field, band in zip(BAND_FIELDS, bands(value)):
+        setattr(job, field, band)
+
+    return True
+
+
+def find_duplicate_of(job):
+    """
+    Id of the cluster ``job`` duplicates (the oldest job of it), None when it is unique. ``job`` needs its
+    signature set.
+    """
+    from jobs.models import Jobs
+
+    same_band = reduce(or_, [Q(**{field: getattr(job, field)}) for field in BAND_FIELDS])
+    candidates = Jobs.objects.filter(same_band).exclude(id=job.id).values_list('id', 'simhash', 'duplicate_of_id')
+    max_distance = settings.DUPLICATE_MAX_DISTANCE
+
+    matches = [duplicate_of_id or candidate_id for candidate_id, value, duplicate_of_id in candidates
+               if distance(value, job.simhash) <= max_distance]
+
+    return min(matches) if matches else None
+
+
+def backfill(batch_size=1000):
+    """Computes the signature of every job without one, yields the number signed after each batch."""
+    from jobs.models import Jobs
+
+    done = 0
+    last_id = 0
+
+    while True:
+        # Jobs too short to sign stay without a signature, the batches walk the ids to get past them
+        jobs = list(Jobs.objects.filter(simhash__isnull=True, id__gt=last_id).order_by('id').only(
+            'id', 'title', 'post')[:batch_size])
+
+        if not jobs:
+            return
+
+        last_id = jobs[-1].id
+        signed = [job for job in jobs if set_signature(job)]
+        Jobs.objects.bulk_update(signed, ['simhash'] + BAND_FIELDS)
+        done += len(signed)
+        yield done
+
+
+def cluster(batch_size=1000):
+    """
+    Links every job to the oldest job of its cluster in ``duplicate_of``, the oldest itself gets None.
+    Jobs are bucketed on each band in turn, only jobs sharing a band are compared. A bucket stops taking jobs
+    at DUPLICATE_MAX_BUCKET, the jobs past it are only compared through their other bands. Returns the number of
+    jobs marked as duplicates.
+    """
+    from jobs.models import Jobs
+
+    parents = {}
+
+    def root(job_pk):
+        while parents.get(job_pk, job_pk) != job_pk:
+            parents[job_pk] = parents.get(parents[job_pk], parents[job_pk])
+            job_pk = parents[job_pk]
+        return job_pk
+
+    def union(first, second):
+        first, second = root(first), root(second)
+        if first != second:
+            parents[max(first, second)] = min(first, second)
+
+    max_distance = settings.DUPLICATE_MAX_DISTANCE
+    max_bucket = settings.DUPLICATE_MAX_BUCKET
+    signed = Jobs.objects.filter(simhash__isnull=False)
+
+    for field in BAND_FIELDS:
+        bucket_value, bucket, skipped = None, [], 0
+        rows = signed.order_by(field, 'id').values_list(field, 'id', 'simhash').iterator(chunk_size=batch_size)
+
+        for value, job_pk, signature in rows:
+            if value != bucket_value:
+                bucket_value, bucket = value, []
+
+            # Every job of a bucket is compared with all the ones before it, a band value shared by boilerplate
+            # posts would make that quadratic
+            if len(bucket) >= max_bucket:
+                skipped += 1
+                continue
+
+            for other_pk, other_signature in bucket:
+                if distance(signature, other_signature) <= max_distance:
+                    union(job_pk, other_pk)
+
+            bucket.append((job_pk, signature))
+
+        if skipped:
+            logger.warning(f"{skipped} jobs skipped on {field}, their band value is shared by more than "
+                           f"{max_bucket} jobs")
+
+    duplicate_of = {job_pk: root(job_pk) for job_pk in parents if root(job_pk) != job_pk}
+    changed = []
+
+    for job in signed.only('id', 'duplicate_of').iterator(chunk_size=batch_size):
+        new = duplicate_of.get(job.id)
+
+        if job.duplicate_of_id != new:
+            job.duplicate_of_id = new
+            changed.append(job)
+
+    Jobs.objects.bulk_update(changed, ['duplicate_of'], batch_size=batch_size)
+
+    return len(duplicate_of)
+
+
+def duplicate_clusters(queryset=None, min_size=2):
+    """``(job id, number of duplicates)`` of every cluster with at least ``min_size`` jobs, largest first."""
+    from jobs.models import Jobs
+
+    queryset = queryset if queryset is not None else Jobs.objects.all()
+
+    return queryset.filter(duplicate_of__isnull=False).values_list('duplicate_of').annotate(
+        duplicates=Count('id')).filter(duplicates__gte=min_size - 1).order_by('-duplicates')
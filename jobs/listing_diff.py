@@ -0,0 +1,76 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from jobs.models import CrawlSnapshot, Jobs
+from jobs.stats import record_closed_jobs
+from talent_bridge_cron.run_logging import get_run_logger
+
+
+def record_crawl(company_obj, job_ids, complete, source):
+    """
+    Stores the job ids a crawl of ``company_obj`` listed and, for complete crawls, marks the company's jobs
+    missing from the last LISTING_DIFF_MISSES complete crawls as unavailable. Returns the number of jobs marked.
+    """
+    job_ids = sorted(set(job_ids))
+    run_logger = get_run_logger('listing_diff')
+
+    if complete and not is_plausible(company_obj, job_ids):
+        run_logger.warning(f"{source} crawl of {company_obj.name} listed only {len(job_ids)} jobs, keeping it as partial",
+                           extra={'event': 'partial_crawl', 'company': company_obj.name, 'source': source,
+                                  'job_count': len(job_ids)})
+        complete = False
+
+    CrawlSnapshot.objects.create(company=company_obj, source=source, complete=complete, job_count=len(job_ids),
+                                 job_ids=job_ids)
+
+    if not complete:
+        return 0
+
+    marked = mark_missing_jobs_unavailable(company_obj)
+    run_logger.info(f"{source} crawl of {company_obj.name} listed {len(job_ids)} jobs, {marked} marked unavailable",
+                    extra={'event': 'listing_diff', 'company': company_obj.name, 'source': source,
+                           'job_count': len(job_ids), 'marked_unavailable': marked})
+    return marked
+
+
+def is_plausible(company_obj, job_ids):
+    # A crawl that broke half way (a location failing to load, a blocked page) still ends normally,
+    # so a listing far smaller than what we hold as open is not trusted
+    available = Jobs.objects.filter(company=company_obj, available=True).count()
+    return len(job_ids) >= available * settings.LISTING_DIFF_MIN_SHARE
+
+
+def mark_missing_jobs_unavailable(company_obj, misses=None):
+    misses = misses or settings.LISTING_DIFF_MISSES
+    snapshots = list(CrawlSnapshot.objects.filter(company=company_obj, complete=True).order_by('-created')[:misses])
+
+    if len(snapshots) < misses:
+        return 0
+
+    seen_job_ids = set()
+    for snapshot in snapshots:
+        seen_job_ids.update(snapshot.job_ids)
+
+    # Only jobs that existed before the oldest of these crawls started can have been missed by all of them
+    missing_ids = [
+        job_pk for job_pk, job_id in Jobs.objects.filter(company=company_obj, available=True,
+                                                          date__lt=snapshots[-1].created).values_list('id', 'job_id')
+        if job_id not in seen_job_ids
+    ]
+
+    if not missing_ids:
+        return 0
+
+    now = timezone.now()
+    marked = Jobs.objects.filter(id__in=missing_ids).update(available=False, unavailable_date=now, modified=now)
+    record_closed_jobs(missing_ids)
+
+    return marked
+
+
+def fully_crawled_company_ids():
+    """Companies whose availability is kept current by listing diffs, per job checks can skip them."""
+    since = timezone.now() - datetime.timedelta(days=settings.LISTING_DIFF_MAX_AGE_DAYS)
+    return set(CrawlSnapshot.objects.filter(complete=True, created__gte=since).values_list('company_id', flat=True))
@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.archive import archive_jobs
+from talent_bridge_cron.run_logging import get_run_logger
+
+
+class Command(BaseCommand):
+    help = 'Moves jobs closed for more than --days days, with their locations and skills, to the archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.JOBS_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        run_logger = get_run_logger('archive_jobs')
+        run_logger.info("Archive Jobs Command Started", extra={'event': 'start', 'days': options['days']})
+        started = time.monotonic()
+        archived = 0
+
+        for batch in archive_jobs(days=options['days'], batch_size=options['batch_size']):
+            archived += batch
+            print(f"Archived {archived} jobs")
+            run_logger.info(f"Archived {archived} jobs", extra={'event': 'batch', 'batch': batch, 'archived': archived})
+
+        elapsed = time.monotonic() - started
+        print(f"Archived {archived} jobs in {elapsed:.0f}s")
+        run_logger.info(f"Archived {archived} jobs in {elapsed:.0f}s",
+                        extra={'event': 'end', 'archived': archived, 'elapsed': round(elapsed, 3)})
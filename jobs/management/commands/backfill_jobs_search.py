@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import search
+from talent_bridge_cron.run_logging import get_run_logger
+
+
+class Command(BaseCommand):
+    help = 'Indexes existing jobs for full text search, new and edited jobs are indexed by database triggers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Only PostgreSQL and SQLite have a job search index, other databases search unindexed')
+
+        run_logger = get_run_logger('backfill_jobs_search')
+        started = time.monotonic()
+        last_id = 0
+
+        for last_id in search.backfill(batch_size=options['batch_size']):
+            print(f"Indexed jobs up to id {last_id}")
+            run_logger.info(f"Indexed jobs up to id {last_id}", extra={'event': 'batch', 'last_id': last_id})
+
+        elapsed = time.monotonic() - started
+        print(f"Search backfill done in {elapsed:.0f}s")
+        run_logger.info(f"Search backfill done in {elapsed:.0f}s",
+                        extra={'event': 'end', 'last_id': last_id, 'elapsed': round(elapsed, 3)})
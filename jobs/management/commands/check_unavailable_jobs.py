@@ -1,106 +1,99 @@
-import os
-import json
-from selenium.webdriver.chrome.options import Options
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from selenium.webdriver.support import expected_conditions as EC
 import datetime
+import time
 from django.utils import timezone
-from jobs.models import Jobs, JobsStats
-from jobs.utility import *
-
-
-def startup():
-    print(
-        f"---------------------Update Unavailable Jobs Command Started {timezone.datetime.now()}----------------------\n")
-
-    try:
-        logging_file = open('logging/unavailable_jobs_update/start_up_end/daily_startup_and_close.txt', mode='a')
-    except:
-        path = str(settings.BASE_DIR) + '/logging/unavailable_jobs_update/start_up_end'
-        isExist = os.path.exists(path)
-
-        if not isExist:
-            os.makedirs(path)
-            print(f"The new directory is created!: {path}")
-
-        logging_file = open('logging/unavailable_jobs_update/start_up_end/daily_startup_and_close.txt', mode='a')
-
-    logging_file.write(
-        f"---------------------Update Unavailable Jobs Command Started {timezone.datetime.now()}----------------------")
-    logging_file.close()
-
-    jobs = Jobs.objects.filter(date__lt=timezone.now().date()-datetime.timedelta(days=5), available=True)
-    driver = get_driver_with_vpn()
-
-    try:
-        logging_file = open(
-            f'logging/unavailable_jobs_update/jobs_status/{timezone.datetime.today().date()}.txt',
-            mode='a')
-    except:
-        path = str(settings.BASE_DIR) + '/logging/unavailable_jobs_update/jobs_status'
-        isExist = os.path.exists(path)
+from jobs.availability import check_availability, company_closure_rates, due_jobs, next_check_at, CLOSED, OPEN
+from jobs.listing_diff import fully_crawled_company_ids
+from companies.models import Company
+from jobs.models import Jobs
+from jobs.stats import record_closed_jobs
+from talent_bridge_cron.run_logging import get_run_logger
+
+
+def check_chunk(chunk, company_names, closure_rates, counts, run_logger):
+    """Checks a chunk of jobs and writes every status change of the chunk with one bulk update."""
+    jobs_by_id = {job.id: job for job in chunk}
+    results = check_availability((job.id, job.job_url, company_names.get(job.company_id)) for job in chunk)
+    now = timezone.now()
+
+    for job_pk, status, detail in results:
+        job = jobs_by_id[job_pk]
+
+        if status == CLOSED:
+            job.available = False
+            job.unavailable_date = now
+            job.next_check_at = None
+            run_logger.info(f"Job is no longer available job url: {job.job_url} and job id: {job.job_id}",
+                            extra={'event': 'job_status', 'job_id': job.job_id, 'available': False, 'detail': detail})
+        elif status == OPEN:
+            job.next_check_at = next_check_at(job, closure_rates, now)
+            run_logger.debug(f"Job is still available job url: {job.job_url} and job id: {job.job_id}",
+                             extra={'event': 'job_status', 'job_id': job.job_id, 'available': True, 'detail': detail})
+        else:
+            print(f"There is error in job url: {job.job_url} and job id: {job.job_id}")
+            job.next_check_at = now + datetime.timedelta(hours=settings.AVAILABILITY_ERROR_RECHECK_HOURS)
+            run_logger.warning(f"Could not check job url: {job.job_url} and job id: {job.job_id}",
+                               extra={'event': 'job_error', 'job_id': job.job_id, 'detail': detail})
 
-        if not isExist:
-            os.makedirs(path)
-            print(f"The new directory is created!: {path}")
+        job.modified = now
+        counts[status] = counts.get(status, 0) + 1
 
-        logging_file = open(
-            f'logging/unavailable_jobs_update/jobs_status/{timezone.datetime.today().date()}.txt',
-            mode='a')
+    Jobs.objects.bulk_update(chunk, ['available', 'unavailable_date', 'next_check_at', 'modified'])
+    record_closed_jobs([job.id for job in chunk if not job.available])
+    return len(chunk)
 
-    for job in jobs:
-        try:
-            driver.get(job.job_url)
-            time.sleep(random.randint(1, 3))
-            job_url = job.job_url
 
-            if job_url[-1] != '/':
-                job_url += '/'
+def log_throughput(run_logger, checked, started):
+    elapsed = time.monotonic() - started
+    run_logger.info(f"Checked {checked} jobs, {checked / (elapsed or 1):.1f} jobs/s",
+                    extra={'event': 'progress', 'checked': checked, 'elapsed': round(elapsed, 3),
+                           'jobs_per_second': round(checked / (elapsed or 1), 1)})
 
-            if driver.current_url != job.job_url:
-                print(f"Job is no longer available job url: {job.job_url} and job id: {job.job_id}")
 
-                job.available = False
-                job.unavailable_date = timezone.now()
-                job.save()
+def startup():
+    print(
+        f"---------------------Update Unavailable Jobs Command Started {timezone.datetime.now()}----------------------\n")
 
-                logging_file.write(
-                    f"Job is no longer available job url: {job.job_url} and job id: {job.job_id} \n")
-            else:
-                print(f"Job is still available job url: {job.job_url} and job id: {job.job_id}")
+    run_logger = get_run_logger('unavailable_jobs_update')
+    run_logger.info("Update Unavailable Jobs Command Started", extra={'event': 'start'})
 
-                logging_file.write(
-                    f"Job is still available job url: {job.job_url} and job id: {job.job_id} \n")
+    # Companies crawled completely have their closed jobs found by listing diffs, see jobs.listing_diff
+    jobs = Jobs.objects.filter(date__lt=timezone.now().date()-datetime.timedelta(days=5), available=True).exclude(
+        company_id__in=fully_crawled_company_ids())
+    # Only the columns the check and the update touch, the post column alone can be 100k characters a row
+    jobs = due_jobs(jobs).only('id', 'job_id', 'job_url', 'company_id', 'date', 'available', 'unavailable_date',
+                               'next_check_at', 'modified')
 
-        except:
-            print(f"There is error in job url: {job.job_url} and job id: {job.job_id}")
+    company_names = dict(Company.objects.values_list('id', 'name'))
+    closure_rates = company_closure_rates()
+    chunk_size = settings.AVAILABILITY_CHUNK_SIZE
 
-            logging_file.write(
-                f"There is error in job url: {job.job_url} and job id: {job.job_id} \n")
+    counts = {OPEN: 0, CLOSED: 0}
+    checked = 0
+    started = time.monotonic()
+    chunk = []
 
-    logging_file.close()
+    for job in jobs.iterator(chunk_size=chunk_size):
+        chunk.append(job)
 
-    new_jobs_status = JobsStats.objects.filter(date__gt=timezone.datetime.today()).first()
+        if len(chunk) == chunk_size:
+            checked += check_chunk(chunk, company_names, closure_rates, counts, run_logger)
+            chunk = []
+            log_throughput(run_logger, checked, started)
 
-    if not new_jobs_status:
-        new_jobs_status = JobsStats()
+    if chunk:
+        checked += check_chunk(chunk, company_names, closure_rates, counts, run_logger)
 
-    new_jobs_status.total_available = Jobs.objects.filter(available=True).count()
-    new_jobs_status.total_unavailable = Jobs.objects.filter(available=False).count()
-    new_jobs_status.save()
+    elapsed = time.monotonic() - started
+    print(f"Checked {checked} jobs in {elapsed:.0f}s, {counts[CLOSED]} no longer available")
+    run_logger.info(f"Checked {checked} jobs in {elapsed:.0f}s", extra={'event': 'summary', 'elapsed': round(elapsed, 3),
+                                                                        'jobs_per_second': round(checked / (elapsed or 1), 1),
+                                                                        **counts})
 
     print(f"---------------------Update Unavailable Jobs Command Ended {timezone.datetime.now()}----------------------")
 
-    logging_file = open('logging/unavailable_jobs_update/start_up_end/daily_startup_and_close.txt', mode='a')
-    logging_file.write(
-        f"---------------------Update Unavailable Jobs Command Ended {timezone.datetime.now()}----------------------\n")
-    logging_file.close()
-
-    sleep_time = random.randint(50400, 82800)
-    print(f'Waiting for {sleep_time % (24 * 3600)}')
-    time.sleep(sleep_time)
-    startup()
+    run_logger.info("Update Unavailable Jobs Command Ended", extra={'event': 'end'})
 
 
 class Command(BaseCommand):
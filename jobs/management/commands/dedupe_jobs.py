@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from jobs import dedupe
+from talent_bridge_cron.run_logging import get_run_logger
+
+
+class Command(BaseCommand):
+    help = 'Computes the SimHash of jobs without one and links every job to the oldest job of its duplicate cluster'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--skip-cluster', action='store_true', help='Only backfill the signatures')
+
+    def handle(self, *args, **options):
+        run_logger = get_run_logger('dedupe_jobs')
+        started = time.monotonic()
+
+        for done in dedupe.backfill(batch_size=options['batch_size']):
+            print(f"Signed {done} jobs")
+            run_logger.info(f"Signed {done} jobs", extra={'event': 'batch', 'signed': done})
+
+        duplicates = None
+
+        if not options['skip_cluster']:
+            duplicates = dedupe.cluster(batch_size=options['batch_size'])
+            print(f"{duplicates} jobs are near duplicates of an older job")
+
+        elapsed = time.monotonic() - started
+        print(f"Dedupe done in {elapsed:.0f}s")
+        run_logger.info(f"Dedupe done in {elapsed:.0f}s",
+                        extra={'event': 'end', 'duplicates': duplicates, 'elapsed': round(elapsed, 3)})
@@ -0,0 +1,49 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from jobs.models import ArchivedJob, Jobs
+from jobs.stats import get_totals, reconcile_day
+from talent_bridge_cron.routers import use_replica
+from talent_bridge_cron.run_logging import get_run_logger
+
+
+def startup(day=None, days=1, totals=False):
+    run_logger = get_run_logger('reconcile_jobs_stats')
+    last_day = day or timezone.localdate()
+
+    for offset in range(days):
+        stats_day = last_day - datetime.timedelta(days=offset)
+        rows = reconcile_day(stats_day)
+
+        print(f"Rebuilt {rows} stats rows for {stats_day}")
+        run_logger.info(f"Rebuilt {rows} stats rows for {stats_day}",
+                        extra={'event': 'reconciled', 'date': str(stats_day), 'rows': rows})
+
+    if totals:
+        # The one full scan left, only run on demand to fix drift of the incremental totals
+        with use_replica():
+            counts = Jobs.objects.aggregate(available_count=Count('id', filter=Q(available=True)),
+                                            unavailable_count=Count('id', filter=Q(available=False)))
+            # Archived jobs are closed jobs moved out of the jobs table, see jobs.archive
+            counts['unavailable_count'] += ArchivedJob.objects.count()
+        jobs_status = get_totals(timezone.localdate())
+        jobs_status.total_available = counts['available_count']
+        jobs_status.total_unavailable = counts['unavailable_count']
+        jobs_status.save()
+
+        run_logger.info("Recounted job totals", extra={'event': 'totals', **counts})
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the daily job stats of the given days from the jobs table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=datetime.date.fromisoformat, help='Last day to rebuild, YYYY-MM-DD, today by default')
+        parser.add_argument('--days', type=int, default=1, help='Number of days to rebuild, counting back from --date')
+        parser.add_argument('--totals', action='store_true', help="Also recount today's JobsStats totals")
+
+    def handle(self, *args, **options):
+        startup(day=options['date'], days=options['days'], totals=options['totals'])
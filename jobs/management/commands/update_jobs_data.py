@@ -1,33 +1,37 @@
-import os
-import json
 from django.core.management.base import BaseCommand
-from django.conf import settings
 from django.utils import timezone
-from selenium.webdriver.support import expected_conditions as EC
 import datetime
-import traceback as tb
+import logging
 import re
 
-from selenium.webdriver.support.ui import WebDriverWait
-
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.common.by import By
 
 from jobs.utility import *
+from jobs.waits import wait_for, url_reached, element_count_stable, network_idle, log_wait_summary
+from jobs.archive import job_seen
+from jobs.listing_diff import record_crawl
+from talent_bridge_cron.run_logging import get_run_logger
 
 from companies.models import Company
 from locations.models import Locations
-from jobs.models import Jobs, JobsStats
-from skills.models import Skills
+from jobs.models import Jobs
+from jobs.stats import record_new_jobs
+from talent_bridge_cron.cache import get_skills, log_cache_metrics
 
 import spacy
 
-all_skills = Skills.objects.all()
 nlp = spacy.load("en_core_web_sm")
 
+logger = logging.getLogger(__name__)
+
+# Upper bound on "load more" clicks on the Walmart listing, about 20 results are added per click
+MAX_LOAD_MORE_CLICKS = 200
+
 
 def add_skill(job):
     skills_list = []
-    for skill in all_skills:
+    for skill in get_skills():
         skill_name = skill.name.lower()
 
         if skill_name in [chunk.text.lower() for chunk in nlp(job.title)] or skill_name in [chunk.text.lower()
@@ -39,32 +43,37 @@ def add_skill(job):
     print(f"update job with job_id: {job.job_id} with skills: {skills_list} ")
 
 
-def browserstack(base_url, company_obj):
-    path = str(settings.BASE_DIR) + f'/logging/{company_obj.name.lower()}/start_up_end'
-    isExist = os.path.exists(path)
+def record_listing(company_obj, checkpoint, run_logger):
+    """
+    Records the job ids the scrape went through. Only a listing walked to the end without a failed location,
+    page or row is complete and can mark the company's missing jobs unavailable.
+    """
+    complete = not checkpoint.failures
 
-    if not isExist:
-        os.makedirs(path)
-        print(f"The new directory is created!: {path}")
+    if not complete:
+        run_logger.warning(f"{company_obj.name} listing had {checkpoint.failures} failures, crawl recorded as "
+                           f"incomplete", extra={'event': 'incomplete_listing', 'company': company_obj.name,
+                                                 'failures': checkpoint.failures})
 
-    logging_file = open(f'logging/{company_obj.name.lower()}/start_up_end/{company_obj.name.lower()}_logging.txt',
-                        mode='a')
-    logging_file.write(
-        f"---------------------Update {company_obj.name} Jobs Started {timezone.datetime.now()}----------------------\n\n")
-    logging_file.close()
-    print(
-        f"---------------------Update {company_obj.name} Jobs Started {timezone.datetime.now()}----------------------\n\n")
+    record_crawl(company_obj, checkpoint.processed, complete=complete, source='selenium')
 
-    initial_time = timezone.datetime.now()
-    # connect_to_vpn()
 
-    driver = get_driver_with_vpn()
-    driver.get(base_url)
-    locations = driver.find_elements(By.CLASS_NAME, 'location-card-wrapper')
-    job_objects = {}
+def browserstack_listings(driver, base_url, checkpoint):
+    """
+    Walks every location and category tab and yields one row per listed job. Rows of a category are read
+    before being yielded, since the consumer navigates the same driver to the job page. Categories already
+    read by a resumed run are skipped.
+    """
+    pending = checkpoint.pending_rows()
+    yield from pending
+
+    done_sections = list(checkpoint.position or [])
+    load_page(driver, base_url, 'browserstack')
+    locations = [location.text for location in driver.find_elements(By.CLASS_NAME, 'location-card-wrapper')]
+    seen_job_ids = {row['job_id'] for row in pending}
     print('started scraping')
-    for location in locations:
-        locations_and_position = str(location.text).split('\n')
+    for location_text in locations:
+        locations_and_position = str(location_text).split('\n')
         remo = '.cls-1{fill:none;}.cls-2{clip-path:url(#clip-path);}.cls-3{fill:#bcbcbb;}.cls-4{' \
                'fill:#fff;}Location_New York'
 
@@ -99,14 +108,23 @@ def browserstack(base_url, company_obj):
                     location_url = 'atlanta'
 
                 print('----------', city, location_url, '-----------')
-                driver.get(base_url + '/' + location_url)
+                load_page(driver, base_url + '/' + location_url, 'browserstack')
                 category_index = 1
                 category = driver.find_elements(By.XPATH, '//*[@id="bd-careers"]/section/div[2]/div[2]/div/div/div[' +
                                                 str(category_index) + ']')
                 while category:
                     print("Category Name: {}".format(category[0].text))
                     category_name = category[0].text
-                    driver.get(base_url + '/' + location_url + '#' + category[0].text.lower())
+                    section = f'{location_url}#{category_index}'
+
+                    if section in done_sections:
+                        category_index += 1
+                        category = driver.find_elements(By.XPATH,
+                                                        '//*[@id="bd-careers"]/section/div[2]/div[2]/div/div/div[' +
+                                                        str(category_index) + ']')
+                        continue
+
+                    load_page(driver, base_url + '/' + location_url + '#' + category[0].text.lower(), 'browserstack')
                     driver.refresh()
                     job_index = 1
                     link = driver.find_elements(By.XPATH, '//*[@id="bd-careers"]/section/div[2]/div[3]/div/div['
@@ -115,19 +133,22 @@ def browserstack(base_url, company_obj):
                     job_title = driver.find_elements(By.XPATH, '//*[@id="bd-careers"]/section/div[2]/div[3]/div/div['
                                                      + str(category_index) + ']/ul/li[' + str(job_index) +
                                                      ']/a/div/div[''1]/div')
+                    category_jobs = []
                     while link:
                         job = job_title[0].text
                         job_id = link[0].get_attribute('data-workable-id')
                         job_url = 'https://apply.workable.com/browserstack-2/j/' + job_id
                         print(job, job_id, job_url)
-                        if job_id != '':  # append job_id iff job_id not None
-                            job_objects[job_id] = {
-                                'location': location,
+                        if job_id != '' and job_id not in seen_job_ids:  # append job_id iff job_id not None
+                            seen_job_ids.add(job_id)
+                            category_jobs.append({
+                                'location': [location.city, location.country],
+                                'location_id': location.id,
                                 'job_url': job_url,
                                 'job_id': job_id,
                                 'job_title': job,
                                 'job_category': category_name
-                            }
+                            })
                         print(
                             f'job_id: {job_id} job_url: {job_url} location: {location} job_title: {job_title} job_category: {category_name} ')
                         job_index += 1
@@ -138,52 +159,53 @@ def browserstack(base_url, company_obj):
                                                          '//*[@id="bd-careers"]/section/div[2]/div[3]/div/div['
                                                          + str(category_index) + ']/ul/li[' + str(job_index) +
                                                          ']/a/div/div[''1]/div')
-                    time.sleep(2)
+
+                    done_sections.append(section)
+                    yield from checkpoint.page_read(done_sections, category_jobs)
+
                     category_index += 1
+                    load_page(driver, base_url + '/' + location_url, 'browserstack')
+                    wait_for(driver, element_count_stable(By.XPATH, '//*[@id="bd-careers"]/section/div[2]/div[2]/div/div/div',
+                                                          site='browserstack'),
+                             site='browserstack', description='category tabs')
                     category = driver.find_elements(By.XPATH,
                                                     '//*[@id="bd-careers"]/section/div[2]/div[2]/div/div/div[' +
                                                     str(category_index) + ']')
 
-            except Exception as error:
-                print("error occurred :{} ".format(error))
-                print("trace:{}".format(tb.format_exc().replace("\n", " ")))
+            except Exception:
+                # The jobs listed under this location are missing from the crawl
+                logger.exception(f"Failed to read the BrowserStack listing of {city_country}")
+                checkpoint.listing_failed()
 
-    json_dict = {}
-    for keys in job_objects:
-        obj = job_objects[keys]
-        obj['location'] = [obj['location'].city, obj['location'].country]
-        json_dict[keys] = obj
 
-    path = str(settings.BASE_DIR) + f'/logging/{company_obj.name.lower()}/daily_jobs'
-    isExist = os.path.exists(path)
+def browserstack(base_url, company_obj, resume=False):
+    run_logger = get_run_logger(f'{company_obj.name.lower()}/jobs')
+    checkpoint = ScrapeCheckpoint(company_obj, resume)
 
-    if not isExist:
-        os.makedirs(path)
-        print(f"The new directory is created!: {path}")
+    if checkpoint.complete:
+        run_logger.info(f"{company_obj.name} Jobs already updated today, nothing to resume",
+                        extra={'event': 'skipped', 'company': company_obj.name})
+        return
 
-    file_name = f'logging/{company_obj.name.lower()}/daily_jobs/{company_obj.name.lower()}_{str(timezone.datetime.today().date())}.json'
+    run_logger.info(f"Update {company_obj.name} Jobs Started", extra={'event': 'start', 'company': company_obj.name,
+                                                                     'resumed': checkpoint.resumed})
+    print(
+        f"---------------------Update {company_obj.name} Jobs Started {timezone.datetime.now()}----------------------\n\n")
 
-    with open(file_name, "w") as write_file:
-        json.dump(json_dict, write_file)
+    initial_time = timezone.datetime.now()
+    # connect_to_vpn()
 
-    f = open(file_name, "r")
-    data = json.loads(f.read())
+    driver = get_driver_with_vpn()
 
-    path = str(settings.BASE_DIR) + f'/logging/{company_obj.name.lower()}/daily_jobs_info'
-    isExist = os.path.exists(path)
+    snapshot = JsonlSnapshotWriter(get_company_log_file(company_obj, 'daily_jobs', 'jsonl'))
 
-    if not isExist:
-        os.makedirs(path)
-        print(f"The new directory is created!: {path}")
+    for count, job in enumerate(browserstack_listings(driver, base_url, checkpoint), start=1):
+        snapshot.write(job)
 
-    daily_jobs_info_file = f'logging/{company_obj.name.lower()}/daily_jobs_info/{company_obj.name.lower()}_{str(timezone.datetime.today().date())}.txt'
-    count = 1
-    for keys in data:
-        job = data[keys]
         print(f'----Job no : {count} and Job url: {job["job_url"]} ----', end='', sep='')
         logging_str = f'----{job["job_url"]} ----'
 
-        if job['job_id'] and not Jobs.objects.filter(job_id=job['job_id'], company=company_obj):
+        if job['job_id'] and not job_seen(job_id=job['job_id'], company=company_obj):
             print('-new found job-', sep='', end='')
             logging_str += '-new found job-'
 
@@ -197,8 +219,12 @@ def browserstack(base_url, company_obj):
             #
             #     initial_time = now_plus_5
 
-            driver.get(job['job_url'])
-            time.sleep(2)
+            load_page(driver, job['job_url'], 'browserstack')
+
+            if wait_for(driver, url_reached(job['job_url'] + '/'), site='browserstack', description='job page'):
+                wait_for(driver, element_count_stable(By.XPATH, '//*[@id="app"]/div/div/div//main/div', min_count=2,
+                                                      site='browserstack'),
+                         site='browserstack', description='job post')
 
             if driver.current_url == job['job_url'] + '/':
                 div_len = len(driver.find_elements(By.XPATH, '//*[@id="app"]/div/div/div//main/div')) - 1
@@ -217,9 +243,9 @@ def browserstack(base_url, company_obj):
                                job_id=job['job_id'], job_url=job['job_url'])
 
                 job_obj.save()
-                location_obj = Locations.objects.filter(city=job['location'][0], country=job['location'][1]).first()
-                job_obj.location.add(location_obj.id)
+                job_obj.location.add(job['location_id'])
                 add_skill(job_obj)
+                record_new_jobs([job_obj.id])
 
                 print('-Saved in database-')
                 logging_str += '-Saved in database-'
@@ -231,59 +257,48 @@ def browserstack(base_url, company_obj):
             print('-already in database-', sep='', end='')
             logging_str += '- already in database-'
 
-        logging_file = open(daily_jobs_info_file, mode='a')
-        logging_file.write(logging_str)
-        logging_file.close()
+        run_logger.info(logging_str.strip(), extra={'event': 'job', 'job_id': job['job_id']})
+        checkpoint.job_done(job['job_id'])
 
-        count += 1
+    snapshot.close()
+    checkpoint.finish()
+    record_listing(company_obj, checkpoint, run_logger)
 
     # disconnect_to_vpn()
 
-    logging_file = open(f'logging/{company_obj.name.lower()}/start_up_end/{company_obj.name.lower()}_logging.txt',
-                        mode='a')
-    logging_file.write(
+    log_wait_summary(run_logger, company_obj.name.lower().replace(' ', '_'))
+    log_page_load_summary(run_logger, company_obj.name.lower().replace(' ', '_'))
+    run_logger.info(f"Update {company_obj.name} Jobs Ended", extra={'event': 'end', 'company': company_obj.name})
+    print(
         f"---------------------Update {company_obj.name} Jobs Ended {timezone.datetime.now()}----------------------\n\n")
-    logging_file.close()
-    f"---------------------Update {company_obj.name} Jobs Ended {timezone.datetime.now()}----------------------\n\n"
-    driver.close()
-
-
-def meta(base_url, company_obj):
-    path = str(settings.BASE_DIR) + f'/logging/{company_obj.name.lower()}/start_up_end'
-    isExist = os.path.exists(path)
+    release_driver(driver)
 
-    if not isExist:
-        os.makedirs(path)
-        print(f"The new directory is created!: {path}")
 
-    logging_file = open(f'logging/{company_obj.name.lower()}/start_up_end/{company_obj.name.lower()}_logging.txt',
-                        mode='a')
-    logging_file.write(
-        f"---------------------Update {company_obj.name} Jobs Started {timezone.datetime.now()}----------------------\n\n")
-    logging_file.close()
-    print(
-        f"---------------------Update {company_obj.name} Jobs Started {timezone.datetime.now()}----------------------\n\n")
+def meta_listings(driver, base_url, checkpoint):
+    """
+    Walks the paginated search results and yields one row per listed job. Each page is read completely
+    before its rows are yielded, since the consumer navigates the same driver to the job page. A resumed
+    run continues after the last page read.
+    """
+    pending = checkpoint.pending_rows()
+    yield from pending
 
-    # connect to vpn
-    # connect_to_vpn()
-    # initial_time = timezone.datetime.now()
+    if checkpoint.listing_done:
+        return
 
-    driver = get_driver_with_vpn()
-    driver.get(base_url)
+    load_page(driver, base_url, 'meta')
 
-    try:
-        WebDriverWait(driver, 10).until(EC.url_to_be(base_url))
-    except:
+    if not wait_for(driver, url_reached(base_url), site='meta', description='careers page'):
         print("page is taking so much time to load")
 
     # select count per page
 
-    page_count = 1
+    page_count = checkpoint.position + 1 if checkpoint.position else 1
     results_per_page = 100
     page_url = base_url + f'?page={page_count}&results_per_page={results_per_page}#search_result'
 
     page_loop_cond = True
-    all_jobs_without_post = {}
+    seen_job_ids = {row['job_id'] for row in pending}
 
     while page_loop_cond:
 
@@ -297,9 +312,13 @@ def meta(base_url, company_obj):
         #     initial_time = now_plus_5
 
         print(f"---------------------------pageno: {page_count} --------------------------------")
-        driver.get(page_url)
-        time.sleep(10)
+        load_page(driver, page_url, 'meta')
+        if not wait_for(driver, element_count_stable(By.XPATH, '//*[@id="search_result"]/div[3]/a', site='meta'),
+                        site='meta', description='listing page'):
+            logger.warning(f"Meta listing page {page_count} did not finish loading, its jobs may be missing")
+            checkpoint.listing_failed()
 
+        page_jobs = []
         all_buttons = driver.find_elements(By.TAG_NAME, 'button')
 
         for button in all_buttons:
@@ -307,25 +326,28 @@ def meta(base_url, company_obj):
                 button.click()
 
         for job_count_on_page in range(1, results_per_page + 1):
-            try:
-                job_url = driver.find_elements(By.XPATH, f'//*[@id="search_result"]/div[3]/a[{job_count_on_page}]')
-                job_url = job_url[0].get_attribute('href')
-            except:
-                print('-----------------------job url not found ---------------------')
-                continue
+            job_link = driver.find_elements(By.XPATH, f'//*[@id="search_result"]/div[3]/a[{job_count_on_page}]')
 
+            # A page holds up to results_per_page jobs, the last one ends early
+            if not job_link:
+                break
+
+            # A listed job whose row can't be read is missing from the crawl
             try:
+                job_url = job_link[0].get_attribute('href')
                 job_id = job_url.split('/jobs/')[1][:-1]
-            except:
-                print('-----------------------job_id not found ---------------------')
+            except Exception:
+                logger.warning(f"Meta listing page {page_count}, job {job_count_on_page}: job url or id not found")
+                checkpoint.listing_failed()
                 continue
 
             try:
                 title = driver.find_elements(By.XPATH,
                                              f'//*[@id="search_result"]/div[3]/a[{job_count_on_page}]/div/div/div/div[1]')
                 title = title[0].text
-            except:
-                print('-----------------------job title not found ---------------------')
+            except Exception:
+                logger.warning(f"Meta listing page {page_count}, job {job_id}: title not found")
+                checkpoint.listing_failed()
                 continue
 
             locations = []
@@ -335,9 +357,9 @@ def meta(base_url, company_obj):
             try:
                 main_location = main_location[0].text
                 locations.append(main_location)
-            except:
-                print(f'error in main location-----------------{job_id} and {job_url}')
-                locations.append('Invalid, Invalid')
+            except Exception:
+                logger.warning(f"Meta listing page {page_count}, job {job_id}: location not found")
+                checkpoint.listing_failed()
                 continue
 
             extra_locations_cond = len(driver.find_elements(By.XPATH,
@@ -370,61 +392,65 @@ def meta(base_url, company_obj):
             if title == '' or len(locations) == 0 or category == '' or job_id == '' or job_id == '':
                 print('---------------inside something is empty----------------------------')
 
-            try:
-                all_jobs_without_post[job_id] = {
-                    'title': title,
-                    'location': locations,
-                    'category': category,
-                    'job_url': job_url,
-                    'job_id': job_id,
-                    'subcategory': sub_category
-                }
-
-                print(f"pageno: {page_count} jobd no: {job_count_on_page}", all_jobs_without_post[job_id])
-            except:
+            if job_id in seen_job_ids:
                 continue
 
+            seen_job_ids.add(job_id)
+            page_jobs.append({
+                'title': title,
+                'location': locations,
+                'category': category,
+                'job_url': job_url,
+                'job_id': job_id,
+                'subcategory': sub_category
+            })
+
+            print(f"pageno: {page_count} jobd no: {job_count_on_page}", page_jobs[-1])
+
         len_of_next_prev_buttons = len(driver.find_elements(By.XPATH, '//*[@id="search_result"]/div[4]/div[2]/a'))
 
         if len_of_next_prev_buttons == 1 and page_count > 1:
             page_loop_cond = False
+
+        yield from checkpoint.page_read(page_count, page_jobs, last=not page_loop_cond)
+
         # Increasing page count
         page_count += 1
         page_url = base_url + f'?page={page_count}&results_per_page={results_per_page}#search_result'
 
-    path = str(settings.BASE_DIR) + f'/logging/{company_obj.name.lower()}/daily_jobs'
-    isExist = os.path.exists(path)
 
-    if not isExist:
-        os.makedirs(path)
-        print(f"The new directory is created!: {path}")
+def meta(base_url, company_obj, resume=False):
+    run_logger = get_run_logger(f'{company_obj.name.lower()}/jobs')
+    checkpoint = ScrapeCheckpoint(company_obj, resume)
 
-    file_name = f'logging/{company_obj.name.lower()}/daily_jobs/{company_obj.name.lower()}_{str(timezone.datetime.today().date())}.json'
-    with open(file_name, "w") as write_file:
-        json.dump(all_jobs_without_post, write_file)
+    if checkpoint.complete:
+        run_logger.info(f"{company_obj.name} Jobs already updated today, nothing to resume",
+                        extra={'event': 'skipped', 'company': company_obj.name})
+        return
 
-    f = open(file_name, "r")
-    data = json.loads(f.read())
+    run_logger.info(f"Update {company_obj.name} Jobs Started", extra={'event': 'start', 'company': company_obj.name,
+                                                                     'resumed': checkpoint.resumed})
+    print(
+        f"---------------------Update {company_obj.name} Jobs Started {timezone.datetime.now()}----------------------\n\n")
 
-    path = str(settings.BASE_DIR) + f'/logging/{company_obj.name.lower()}/daily_jobs_info'
-    isExist = os.path.exists(path)
+    # connect to vpn
+    # connect_to_vpn()
+    # initial_time = timezone.datetime.now()
 
-    if not isExist:
-        os.makedirs(path)
-        print(f"The new directory is created!: {path}")
+    driver = get_driver_with_vpn()
 
-    daily_jobs_info_file = f'logging/{company_obj.name.lower()}/daily_jobs_info/{company_obj.name.lower()}_{str(timezone.datetime.today().date())}.txt'
+    snapshot = JsonlSnapshotWriter(get_company_log_file(company_obj, 'daily_jobs', 'jsonl'))
+
+    for count, job in enumerate(meta_listings(driver, base_url, checkpoint), start=1):
+        snapshot.write(job)
 
-    count = 1
-    for keys in data:
         logging_str = ''
-        job = data[keys]
         job_locations_objects = []
         print(f'--------------job no: {count}------------{job["job_url"]}-------', sep='', end='')
         logging_str += f'--------------job no: {count}------------{job["job_url"]} -------'
 
         # if job['job_id'] == '426875042300078':
-        if not Jobs.objects.filter(job_id=job['job_id'], company=company_obj) and len(job['location']):
+        if not job_seen(job_id=job['job_id'], company=company_obj) and len(job['location']):
             print(f'-have-', sep='', end='')
             logging_str += f'-have-'
 
@@ -501,8 +527,10 @@ def meta(base_url, company_obj):
             #     re_connect_to_vpn()
             #     initial_time = now_plus_5
 
-            driver.get(job['job_url'])
+            load_page(driver, job['job_url'], 'meta')
             # time.sleep(random.randint(1, 5))
+            # The job page renders client side and redirects closed jobs, let it settle before reading the url
+            wait_for(driver, network_idle(site='meta'), site='meta', description='job page')
 
             # Check Current Url to Check if current Job is Available or not
             if driver.current_url == job['job_url']:
@@ -542,15 +570,16 @@ def meta(base_url, company_obj):
                     print(f'-Error In Post-', end='', sep='')
                     logging_str += f'-Error In Post-'
 
-                new_job_obj = Jobs(title=data[keys]['title'], category=data[keys]['category'].split('+')[0],
-                                   sub_category=data[keys]['subcategory'].split('+')[0], post=post,
-                                   job_url=data[keys]['job_url'], job_id=data[keys]['job_id'], company=company_obj)
+                new_job_obj = Jobs(title=job['title'], category=job['category'].split('+')[0],
+                                   sub_category=job['subcategory'].split('+')[0], post=post,
+                                   job_url=job['job_url'], job_id=job['job_id'], company=company_obj)
                 new_job_obj.save()
                 print(f'-saved into database-', end='', sep='')
                 logging_str += f'-saved into database-'
                 for loc in job_locations_objects:
                     new_job_obj.location.add(loc)
                 add_skill(new_job_obj)
+                record_new_jobs([new_job_obj.id])
             else:
                 print(f'-Not Saved into database-', sep='', end='')
                 logging_str += f'-Not Saved into database-'
@@ -561,70 +590,80 @@ def meta(base_url, company_obj):
             else:
                 print('-not have location-', sep='', end='')
                 logging_str += '-not have location-'
-        count = count + 1
         print()
         logging_str += '\n'
 
-        logging_file = open(daily_jobs_info_file, mode='a')
-        logging_file.write(logging_str)
-        logging_file.close()
+        run_logger.info(logging_str.strip(), extra={'event': 'job', 'job_id': job['job_id']})
+        checkpoint.job_done(job['job_id'])
 
         # disconnect_to_vpn()
 
-    logging_file = open(f'logging/{company_obj.name.lower()}/start_up_end/{company_obj.name.lower()}_logging.txt',
-                        mode='a')
-    logging_file.write(
+    snapshot.close()
+    checkpoint.finish()
+    record_listing(company_obj, checkpoint, run_logger)
+
+    log_wait_summary(run_logger, company_obj.name.lower().replace(' ', '_'))
+    log_page_load_summary(run_logger, company_obj.name.lower().replace(' ', '_'))
+    run_logger.info(f"Update {company_obj.name} Jobs Ended", extra={'event': 'end', 'company': company_obj.name})
+    print(
         f"---------------------Update {company_obj.name} Jobs Ended {timezone.datetime.now()}----------------------\n\n")
-    logging_file.close()
-    f"---------------------Update {company_obj.name} Jobs Ended {timezone.datetime.now()}----------------------\n\n"
-    driver.close()
+    release_driver(driver)
 
 
-def walmart_global_tech_india(base_url, company_obj):
-    path = str(settings.BASE_DIR) + f'/logging/{company_obj.name.lower()}/start_up_end'
-    isExist = os.path.exists(path)
+def walmart_global_tech_india_listings(driver, base_url, checkpoint):
+    """
+    Loads every result on the single listing page and yields one row per listed job. The whole page is read
+    before the rows are yielded, since the consumer navigates the same driver to the job page. A resumed
+    run only finishes the rows left pending.
+    """
+    yield from checkpoint.pending_rows()
 
-    if not isExist:
-        os.makedirs(path)
-        print(f"The new directory is created!: {path}")
+    if checkpoint.listing_done:
+        return
 
-    logging_file = open(f'logging/{company_obj.name.lower()}/start_up_end/{company_obj.name.lower()}_logging.txt',
-                        mode='a')
-    logging_file.write(
-        f"---------------------Update {company_obj.name} Jobs Started {timezone.datetime.now()}----------------------\n\n")
-    logging_file.close()
-    print(
-        f"---------------------Update {company_obj.name} Jobs Started {timezone.datetime.now()}----------------------\n\n")
+    load_page(driver, base_url, 'walmart_global_tech_india')
 
-    driver = get_driver_with_vpn()
-    driver.get(base_url)
-
-    try:
-        WebDriverWait(driver, 10).until(EC.url_to_be(base_url))
-    except:
+    if not wait_for(driver, url_reached(base_url), site='walmart_global_tech_india', description='careers page'):
         print("page is taking so much time to load")
 
     # clicking on load button
-    time.sleep(2)
-    button = True
-    while button:
+    if not wait_for(driver, element_count_stable(By.CLASS_NAME, 'result-section', site='walmart_global_tech_india'),
+                    site='walmart_global_tech_india', description='first results'):
+        logger.warning("Walmart Global Tech India results did not finish loading, jobs may be missing")
+        checkpoint.listing_failed()
+    for _ in range(MAX_LOAD_MORE_CLICKS):
+        results_loaded = len(driver.find_elements(By.CLASS_NAME, 'result-section'))
+        if len(driver.find_elements(By.CLASS_NAME, 'no-results')) > 1:
+            break
+
         load_button = driver.find_elements(By.XPATH,
                                            '/html/body/segmentation-timeout/div[1]/div[3]/div[2]/div/div/div[1]/div[2]/div[2]/div[2]/button')
-        if len(load_button):
-            try:
-                load_button[0].click()
-            except:
-                print('-------------------page has loaded-----------')
-        No_result = driver.find_elements(By.CLASS_NAME, 'no-results')
-        if len(No_result) > 1:
-            button = False
+        if not load_button:
+            break
+
+        try:
+            load_button[0].click()
+        except WebDriverException as e:
+            logger.warning(f"Could not click load more on Walmart Global Tech India: {e}")
+            break
+
+        # Block until the click brought in more results, a visible button that loads nothing ends the listing
+        if not wait_for(driver, lambda d: len(d.find_elements(By.CLASS_NAME, 'result-section')) > results_loaded
+                        or len(d.find_elements(By.CLASS_NAME, 'no-results')) > 1,
+                        site='walmart_global_tech_india', description='load more'):
+            break
+    else:
+        logger.warning(f"Walmart Global Tech India still had more results after {MAX_LOAD_MORE_CLICKS} clicks, "
+                       f"jobs may be missing")
+        checkpoint.listing_failed()
 
     # taking div of jobs
 
     results_on_page = driver.find_elements(By.CLASS_NAME, 'result-section')
     lresults_on_page = len(results_on_page)
     print(lresults_on_page)
-    all_jobs_without_post = {}
+    listed_jobs = []
+    seen_job_ids = set()
     for job_count_on_page in range(1, lresults_on_page + 1):
 
         try:
@@ -640,7 +679,9 @@ def walmart_global_tech_india(base_url, company_obj):
                 print("-----------------no result found-----------------")
                 continue
             else:
-                print('-----------------------job title not found ---------------------')
+                # A listed job whose row can't be read is missing from the crawl
+                logger.warning(f"Walmart Global Tech India result {job_count_on_page}: title not found")
+                checkpoint.listing_failed()
                 continue
 
         try:
@@ -649,83 +690,68 @@ def walmart_global_tech_india(base_url, company_obj):
             location = location[0].text.split('|')[1].strip()
             print(location)
 
-        except:
-            print('-----------------------job location not found ---------------------')
-            continue
-        try:
             posted_date = driver.find_elements(By.XPATH,
                                                f'/html/body/segmentation-timeout/div[1]/div[3]/div[2]/div/div/div[1]/div[2]/div[2]/div[1]/div[{job_count_on_page}]/div[1]/div[2]')
-
             posted_date = posted_date[0].text.split('|')[0].strip()
 
-        except:
-            print('-----------------------posted date not found ---------------------')
-            continue
-
-        try:
             job_url = driver.find_elements(By.XPATH,
                                            f'/html/body/segmentation-timeout/div[1]/div[3]/div[2]/div/div/div[1]/div[2]/div[2]/div[1]/div[{job_count_on_page}]/div[1]/div[1]/a')
             job_url = job_url[0].get_attribute('href')
             print(job_url)
-        except:
-            print('-----------------------job url not found ---------------------')
-            continue
 
-        try:
             job_id = job_url.split('-')[-1]
-
-        except:
-            print('-----------------------job_id not found ---------------------')
+        except Exception:
+            logger.warning(f"Walmart Global Tech India result {job_count_on_page} ({title}): location, posted date "
+                           f"or url not found")
+            checkpoint.listing_failed()
             continue
 
         if title == '' or len(location) == 0 or posted_date == '' or job_id == '' or job_url == '':
             print('---------------inside something is empty----------------------------')
 
-        try:
-            all_jobs_without_post[job_id] = {
-                'title': title,
-                'location': location,
-                'posted_date': posted_date,
-                'job_url': job_url,
-                'job_id': job_id,
-            }
-
-            print(f" job no: {job_count_on_page}", all_jobs_without_post[job_id])
-        except:
+        if job_id in seen_job_ids:
             continue
 
-    path = str(settings.BASE_DIR) + f'/logging/{company_obj.name.lower()}/daily_jobs'
-    isExist = os.path.exists(path)
+        seen_job_ids.add(job_id)
+        listed_jobs.append({
+            'title': title,
+            'location': location,
+            'posted_date': posted_date,
+            'job_url': job_url,
+            'job_id': job_id,
+        })
 
-    if not isExist:
-        os.makedirs(path)
-        print(f"The new directory is created!: {path}")
+        print(f" job no: {job_count_on_page}", listed_jobs[-1])
 
-    file_name = f'logging/{company_obj.name.lower()}/daily_jobs/{company_obj.name.lower()}_{str(timezone.datetime.today().date())}.json'
-    with open(file_name, "w") as write_file:
-        json.dump(all_jobs_without_post, write_file)
+    yield from checkpoint.page_read(1, listed_jobs, last=True)
 
-    f = open(file_name, "r")
-    data = json.loads(f.read())
 
-    path = str(settings.BASE_DIR) + f'/logging/{company_obj.name.lower()}/daily_jobs_info'
-    isExist = os.path.exists(path)
+def walmart_global_tech_india(base_url, company_obj, resume=False):
+    run_logger = get_run_logger(f'{company_obj.name.lower()}/jobs')
+    checkpoint = ScrapeCheckpoint(company_obj, resume)
 
-    if not isExist:
-        os.makedirs(path)
-        print(f"The new directory is created!: {path}")
+    if checkpoint.complete:
+        run_logger.info(f"{company_obj.name} Jobs already updated today, nothing to resume",
+                        extra={'event': 'skipped', 'company': company_obj.name})
+        return
 
-    daily_jobs_info_file = f'logging/{company_obj.name.lower()}/daily_jobs_info/{company_obj.name.lower()}_{str(timezone.datetime.today().date())}.txt'
+    run_logger.info(f"Update {company_obj.name} Jobs Started", extra={'event': 'start', 'company': company_obj.name,
+                                                                     'resumed': checkpoint.resumed})
+    print(
+        f"---------------------Update {company_obj.name} Jobs Started {timezone.datetime.now()}----------------------\n\n")
+
+    driver = get_driver_with_vpn()
+    snapshot = JsonlSnapshotWriter(get_company_log_file(company_obj, 'daily_jobs', 'jsonl'))
+
+    for count, job in enumerate(walmart_global_tech_india_listings(driver, base_url, checkpoint), start=1):
+        snapshot.write(job)
 
-    count = 1
-    for keys in data:
         logging_str = ''
-        job = data[keys]
         job_locations_objects = []
         print(f'--------------job no: {count}------------{job["job_url"]} -------', sep='', end='')
         logging_str += f'--------------job no: {count}------------{job["job_url"]} -------'
 
-        if not Jobs.objects.filter(job_id=job['job_id'], company=company_obj) and len(job['location']):
+        if not job_seen(job_id=job['job_id'], company=company_obj) and len(job['location']):
             print(f'-have-', sep='', end='')
             logging_str += f'-have-'
 
@@ -757,11 +783,9 @@ def walmart_global_tech_india(base_url, company_obj):
             print(f'-Locations: {[location.id for location in job_locations_objects]}-', sep='', end='')
             logging_str += f'-Locations: {[location.id for location in job_locations_objects]}-'
 
-            driver.get(job['job_url'])
+            load_page(driver, job['job_url'], 'walmart_global_tech_india')
 
-            try:
-                WebDriverWait(driver, 10).until(EC.url_to_be(base_url))
-            except:
+            if not wait_for(driver, url_reached(job['job_url']), site='walmart_global_tech_india', description='job page'):
                 print("page is taking so much time to load")
 
             if driver.current_url == job['job_url']:
@@ -800,8 +824,8 @@ def walmart_global_tech_india(base_url, company_obj):
                     continue
 
                 try:
-                    new_job_obj = Jobs(title=data[keys]['title'], date=data[keys]['posted_date'], post=post,
-                                       job_url=data[keys]['job_url'], job_id=data[keys]['job_id'], company=company_obj,
+                    new_job_obj = Jobs(title=job['title'], date=job['posted_date'], post=post,
+                                       job_url=job['job_url'], job_id=job['job_id'], company=company_obj,
                                        category=category, required_experience=required_experience, reviewed=True)
 
                     new_job_obj.save()
@@ -814,6 +838,7 @@ def walmart_global_tech_india(base_url, company_obj):
 
                     # adding skills
                     add_skill(new_job_obj)
+                    record_new_jobs([new_job_obj.id])
 
                     print(f'-saved into database-', end='', sep='')
                     logging_str += f'-saved into database-'
@@ -833,78 +858,51 @@ def walmart_global_tech_india(base_url, company_obj):
                 print('-not have location-', sep='', end='')
                 logging_str += '-not have location-'
 
-        count = count + 1
-
         logging_str += '\n'
         print()
 
-        logging_file = open(daily_jobs_info_file, mode='a')
-        logging_file.write(logging_str)
-        logging_file.close()
+        run_logger.info(logging_str.strip(), extra={'event': 'job', 'job_id': job['job_id']})
+        checkpoint.job_done(job['job_id'])
+
+    snapshot.close()
+    checkpoint.finish()
+    record_listing(company_obj, checkpoint, run_logger)
 
-    logging_file = open(f'logging/{company_obj.name.lower()}/start_up_end/{company_obj.name.lower()}_logging.txt',
-                        mode='a')
-    logging_file.write(
+    log_wait_summary(run_logger, company_obj.name.lower().replace(' ', '_'))
+    log_page_load_summary(run_logger, company_obj.name.lower().replace(' ', '_'))
+    run_logger.info(f"Update {company_obj.name} Jobs Ended", extra={'event': 'end', 'company': company_obj.name})
+    print(
         f"---------------------Update {company_obj.name} Jobs Ended {timezone.datetime.now()}----------------------\n\n")
-    logging_file.close()
-    f"---------------------Update {company_obj.name} Jobs Ended {timezone.datetime.now()}----------------------\n\n"
-    driver.close()
+    release_driver(driver)
 
 
-def startup():
+def startup(resume=False):
     print(f"---------------------Update Jobs Command Started {timezone.datetime.now()}----------------------\n")
 
-    try:
-        logging_file = open('logging/start_up_end/daily_startup_and_close.txt', mode='a')
-    except:
-        path = str(settings.BASE_DIR) + '/logging/start_up_end'
-        isExist = os.path.exists(path)
-
-        if not isExist:
-            os.makedirs(path)
-            print(f"The new directory is created!: {path}")
-
-        logging_file = open('logging/start_up_end/daily_startup_and_close.txt', mode='a')
-
-    logging_file.write(
-        f"---------------------Update Jobs Command Started {timezone.datetime.now()}----------------------\n")
-    logging_file.close()
+    run_logger = get_run_logger('update_jobs_data')
+    run_logger.info("Update Jobs Command Started", extra={'event': 'start'})
 
     companies = Company.objects.all()
 
     for i in companies:
         try:
-            globals()[(i.name.lower()).replace(' ', '_')](i.career_page, i)
+            globals()[(i.name.lower()).replace(' ', '_')](i.career_page, i, resume)
         except:
             print(" Error Inside i.name.lower()).replace(' ', '_') ")
-            logging_file = open('logging/start_up_end/daily_startup_and_close.txt', mode='a')
-            logging_file.write(
-                f"--------------------- Error Inside i.name.lower()).replace(' ', '_') {timezone.datetime.now()}----------------------\n")
-            logging_file.close()
-
-    new_jobs_status = JobsStats.objects.filter(date__gt=timezone.datetime.today()).first()
-
-    if not new_jobs_status:
-        new_jobs_status = JobsStats()
-
-    new_jobs_status.total_available = Jobs.objects.filter(available=True).count()
-    new_jobs_status.total_unavailable = Jobs.objects.filter(available=False).count()
-    new_jobs_status.save()
+            run_logger.exception(f"Error while updating jobs of {i.name}", extra={'event': 'company_error', 'company': i.name})
+        finally:
+            driver_pool.release_all()
 
+    log_cache_metrics(run_logger)
     print(f"---------------------Update Jobs Command Ended {timezone.datetime.now()}----------------------")
 
-    logging_file = open('logging/start_up_end/daily_startup_and_close.txt', mode='a')
-    logging_file.write(
-        f"---------------------Update Jobs Command Ended {timezone.datetime.now()}----------------------\n")
-    logging_file.close()
-
-    sleep_time = random.randint(50400, 82800)
-    print(f'Waiting for {sleep_time % (24 * 3600)}')
-    time.sleep(sleep_time)
-
-    startup()
+    run_logger.info("Update Jobs Command Ended", extra={'event': 'end'})
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--resume', action='store_true',
+                            help="Pick each company up from today's checkpoint instead of starting over")
+
     def handle(self, *args, **options):
-        startup()
+        startup(resume=options['resume'])
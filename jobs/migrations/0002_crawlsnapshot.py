@@ -0,0 +1,33 @@
+# Generated by Django 4.1.2 on 2026-10-19 15:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('source', models.CharField(max_length=100)),
+                ('complete', models.BooleanField(default=False)),
+                ('job_count', models.IntegerField(default=0)),
+                ('job_ids', models.JSONField(default=list)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crawl_snapshots', to='companies.company')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='crawlsnapshot',
+            index=models.Index(fields=['company', 'complete', 'created'], name='jobs_crawls_company_c75167_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.2 on 2026-10-19 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0002_crawlsnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobs',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
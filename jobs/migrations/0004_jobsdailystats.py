@@ -0,0 +1,36 @@
+# Generated by Django 4.1.2 on 2026-10-19 16:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+        ('jobs', '0003_jobs_next_check_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobsDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('country', models.CharField(default='', max_length=50)),
+                ('category', models.CharField(default='', max_length=300)),
+                ('new', models.IntegerField(default=0)),
+                ('closed', models.IntegerField(default=0)),
+                ('open', models.IntegerField(default=0)),
+                ('company', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='companies.company')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='jobsdailystats',
+            index=models.Index(fields=['company', 'country', 'category', 'date'], name='jobs_jobsda_company_87dbbb_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='jobsdailystats',
+            unique_together={('date', 'company', 'country', 'category')},
+        ),
+    ]
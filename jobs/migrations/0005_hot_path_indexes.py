@@ -0,0 +1,25 @@
+# Generated by Django 4.1.2 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_jobsdailystats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobs',
+            index=models.Index(condition=models.Q(('available', True)), fields=['date'], name='jobs_open_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobs',
+            index=models.Index(condition=models.Q(('available', True)), fields=['next_check_at'], name='jobs_open_next_check_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobs',
+            index=models.Index(fields=['company', 'available'], name='jobs_jobs_company_a5b614_idx'),
+        ),
+    ]
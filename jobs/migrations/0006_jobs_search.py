@@ -0,0 +1,93 @@
+from django.db import migrations
+
+# Full text search on jobs, see jobs.search. PostgreSQL keeps a weighted tsvector column on jobs_jobs with a GIN
+# index, SQLite an external content FTS5 table. Both are maintained by triggers, existing rows are filled in by
+# the backfill_jobs_search command.
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE jobs_jobs ADD COLUMN search_vector tsvector",
+    "CREATE INDEX jobs_jobs_search_vector_idx ON jobs_jobs USING GIN (search_vector)",
+    """
+    CREATE FUNCTION jobs_jobs_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.category, '') || ' ' || coalesce(NEW.sub_category, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.post, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER jobs_jobs_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, category, sub_category, post ON jobs_jobs
+    FOR EACH ROW EXECUTE PROCEDURE jobs_jobs_search_vector_update()
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    "DROP TRIGGER IF EXISTS jobs_jobs_search_vector_trigger ON jobs_jobs",
+    "DROP FUNCTION IF EXISTS jobs_jobs_search_vector_update()",
+    "ALTER TABLE jobs_jobs DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE jobs_jobs_fts USING fts5(
+        title, category, post, content='jobs_jobs', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER jobs_jobs_fts_insert AFTER INSERT ON jobs_jobs BEGIN
+        INSERT INTO jobs_jobs_fts(rowid, title, category, post)
+        VALUES (new.id, new.title, new.category || ' ' || new.sub_category, new.post);
+    END
+    """,
+    """
+    CREATE TRIGGER jobs_jobs_fts_delete AFTER DELETE ON jobs_jobs BEGIN
+        INSERT INTO jobs_jobs_fts(jobs_jobs_fts, rowid, title, category, post)
+        VALUES ('delete', old.id, old.title, old.category || ' ' || old.sub_category, old.post);
+    END
+    """,
+    """
+    CREATE TRIGGER jobs_jobs_fts_update AFTER UPDATE OF title, category, sub_category, post ON jobs_jobs BEGIN
+        INSERT INTO jobs_jobs_fts(jobs_jobs_fts, rowid, title, category, post)
+        VALUES ('delete', old.id, old.title, old.category || ' ' || old.sub_category, old.post);
+        INSERT INTO jobs_jobs_fts(rowid, title, category, post)
+        VALUES (new.id, new.title, new.category || ' ' || new.sub_category, new.post);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS jobs_jobs_fts_insert",
+    "DROP TRIGGER IF EXISTS jobs_jobs_fts_delete",
+    "DROP TRIGGER IF EXISTS jobs_jobs_fts_update",
+    "DROP TABLE IF EXISTS jobs_jobs_fts",
+]
+
+
+def run_statements(schema_editor, statements):
+    statements = statements.get(schema_editor.connection.vendor, [])
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def forward(apps, schema_editor):
+    run_statements(schema_editor, {'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD})
+
+
+def backward(apps, schema_editor):
+    run_statements(schema_editor, {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forward, backward),
+    ]
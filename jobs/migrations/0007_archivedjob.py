@@ -0,0 +1,44 @@
+# Generated by Django 4.1.2 on 2026-10-19 16:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+        ('jobs', '0006_jobs_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('original_id', models.BigIntegerField(unique=True)),
+                ('job_id', models.CharField(max_length=300)),
+                ('title', models.CharField(max_length=300)),
+                ('category', models.CharField(default='', max_length=300)),
+                ('sub_category', models.CharField(default='', max_length=300)),
+                ('post', models.TextField()),
+                ('job_url', models.CharField(max_length=1000)),
+                ('required_experience', models.IntegerField(blank=True, null=True)),
+                ('reviewed', models.BooleanField(default=False)),
+                ('remote', models.BooleanField(default=False)),
+                ('in_office', models.BooleanField(default=True)),
+                ('date', models.DateTimeField()),
+                ('unavailable_date', models.DateTimeField(blank=True, null=True)),
+                ('locations', models.JSONField(default=list)),
+                ('skills', models.JSONField(default=list)),
+                ('company', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_jobs', to='companies.company')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedjob',
+            index=models.Index(fields=['company', 'job_id'], name='jobs_archiv_company_7338ab_idx'),
+        ),
+    ]
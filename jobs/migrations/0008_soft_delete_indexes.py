@@ -0,0 +1,37 @@
+# Generated by Django 4.1.2 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0007_archivedjob'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='jobs',
+            name='jobs_open_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='jobs',
+            name='jobs_open_next_check_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='jobs',
+            name='jobs_jobs_company_a5b614_idx',
+        ),
+        migrations.AddIndex(
+            model_name='jobs',
+            index=models.Index(condition=models.Q(('available', True), ('is_deleted', False)), fields=['date'], name='jobs_open_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobs',
+            index=models.Index(condition=models.Q(('available', True), ('is_deleted', False)), fields=['next_check_at'], name='jobs_open_next_check_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobs',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['company', 'available'], name='jobs_live_company_idx'),
+        ),
+    ]
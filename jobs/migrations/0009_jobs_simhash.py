@@ -0,0 +1,44 @@
+# Generated by Django 4.1.2 on 2026-10-19 16:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0008_soft_delete_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobs',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='jobs.jobs'),
+        ),
+        migrations.AddField(
+            model_name='jobs',
+            name='simhash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobs',
+            name='simhash_band_0',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobs',
+            name='simhash_band_1',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobs',
+            name='simhash_band_2',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobs',
+            name='simhash_band_3',
+            field=models.IntegerField(blank=True, db_index=True, null=True),
+        ),
+    ]
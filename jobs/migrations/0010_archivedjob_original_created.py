@@ -0,0 +1,29 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_job_date(apps, schema_editor):
+    # The creation time of jobs archived so far is lost, their job date is the closest we have
+    ArchivedJob = apps.get_model('jobs', 'ArchivedJob')
+    ArchivedJob._base_manager.filter(original_created__isnull=True).update(original_created=F('date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0009_jobs_simhash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedjob',
+            name='original_created',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_job_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='archivedjob',
+            name='original_created',
+            field=models.DateTimeField(),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def set_day(apps, schema_editor):
+    # Concurrent first writes of a day could each create a row, the updates went to the first one
+    JobsStats = apps.get_model('jobs', 'JobsStats')
+    days = set()
+
+    for totals in JobsStats.objects.order_by('id'):
+        day = timezone.localtime(totals.date).date()
+        if day in days:
+            totals.delete()
+        else:
+            days.add(day)
+            JobsStats.objects.filter(id=totals.id).update(day=day)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0010_archivedjob_original_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobsstats',
+            name='day',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(set_day, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='jobsstats',
+            name='day',
+            field=models.DateField(unique=True),
+        ),
+    ]
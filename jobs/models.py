@@ -3,7 +3,7 @@ from skills.models import Skills
 from companies.models import Company
 from locations.models import Locations
 
-from talent_bridge_cron.models import AbstractBaseModel
+from talent_bridge_cron.models import AbstractBaseModel, BaseManager, BaseQuerySet
 
 class JobLocation(AbstractBaseModel):
     job = models.ForeignKey('jobs.Jobs', on_delete=models.CASCADE, db_column='jobs_id')
@@ -18,6 +18,18 @@ class JobLocation(AbstractBaseModel):
 
         db_table = 'jobs_jobs_locations'  # Explicitly set the table name
 
+class JobsQuerySet(BaseQuerySet):
+    def search(self, text, **kwargs):
+        """Ranked full text search, see jobs.search.search for the filters and paging."""
+        from jobs.search import search
+
+        return search(self, text, **kwargs)
+
+    def originals(self):
+        """Jobs that are not a near duplicate of an older one."""
+        return self.filter(duplicate_of__isnull=True)
+
+
 class Jobs(AbstractBaseModel):
     title = models.CharField(max_length=300, null=False)
     category = models.CharField(max_length=300, default='')
@@ -33,14 +45,112 @@ class Jobs(AbstractBaseModel):
     reviewed = models.BooleanField(default=False)
     available = models.BooleanField(default=True)
     unavailable_date = models.DateTimeField(null=True, blank=True)
+    next_check_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Near duplicate detection, see jobs.dedupe
+    simhash = models.BigIntegerField(null=True, blank=True)
+    simhash_band_0 = models.IntegerField(null=True, blank=True, db_index=True)
+    simhash_band_1 = models.IntegerField(null=True, blank=True, db_index=True)
+    simhash_band_2 = models.IntegerField(null=True, blank=True, db_index=True)
+    simhash_band_3 = models.IntegerField(null=True, blank=True, db_index=True)
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, related_name='duplicates', null=True,
+                                     blank=True)
+
+    objects = BaseManager.from_queryset(JobsQuerySet)()
     remote = models.BooleanField(default=False)
     in_office = models.BooleanField(default=True)
 
     class Meta:
+        # Also serves lookups by job_id alone, it is the leading column
         unique_together = ('job_id', 'company')
+        indexes = [
+            # Availability checks only ever look at open, live jobs, partial where the database supports it
+            models.Index(fields=['date'], condition=models.Q(available=True, is_deleted=False),
+                         name='jobs_open_date_idx'),
+            models.Index(fields=['next_check_at'], condition=models.Q(available=True, is_deleted=False),
+                         name='jobs_open_next_check_idx'),
+            models.Index(fields=['company', 'available'], condition=models.Q(is_deleted=False),
+                         name='jobs_live_company_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # New jobs are signed and linked to the cluster they duplicate before they are written
+        if self._state.adding and self.simhash is None:
+            from jobs.dedupe import find_duplicate_of, set_signature
+
+            if set_signature(self):
+                self.duplicate_of_id = find_duplicate_of(self)
+
+        return super().save(*args, **kwargs)
 
 
 class JobsStats(models.Model):
     total_available = models.IntegerField()
     total_unavailable = models.IntegerField()
-    date = models.DateTimeField(auto_now_add=True, blank=True)
\ No newline at end of file
+    date = models.DateTimeField(auto_now_add=True, blank=True)
+    day = models.DateField(unique=True)  # One row per day, see jobs.stats.get_totals
+
+class CrawlSnapshot(AbstractBaseModel):
+    """
+    Job ids a crawl of a company listed. Jobs missing from enough consecutive complete snapshots are
+    marked unavailable without visiting them, see jobs.listing_diff.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='crawl_snapshots')
+    source = models.CharField(max_length=100)
+    complete = models.BooleanField(default=False)
+    job_count = models.IntegerField(default=0)
+    job_ids = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'complete', 'created']),
+        ]
+
+
+class JobsDailyStats(models.Model):
+    """
+    Jobs opened, closed and still open per day, company, country and category. Kept up to date by
+    jobs.stats as jobs are saved and closed, the reconcile_jobs_stats command rebuilds a day from the jobs table.
+    """
+    date = models.DateField()
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='daily_stats', null=True)
+    country = models.CharField(max_length=50, default='')
+    category = models.CharField(max_length=300, default='')
+    new = models.IntegerField(default=0)
+    closed = models.IntegerField(default=0)
+    open = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'company', 'country', 'category')
+        indexes = [
+            models.Index(fields=['company', 'country', 'category', 'date']),
+        ]
+
+
+class ArchivedJob(AbstractBaseModel):
+    """
+    A job closed long enough ago to be moved out of the jobs table by the archive_jobs command, with its
+    locations and skills kept inline. ``original_id`` and ``original_created`` are the id and creation time it had
+    in the jobs table.
+    """
+    original_id = models.BigIntegerField(unique=True)
+    original_created = models.DateTimeField()
+    company = models.ForeignKey(Company, on_delete=models.SET_NULL, related_name='archived_jobs', null=True)
+    job_id = models.CharField(max_length=300)
+    title = models.CharField(max_length=300)
+    category = models.CharField(max_length=300, default='')
+    sub_category = models.CharField(max_length=300, default='')
+    post = models.TextField()
+    job_url = models.CharField(max_length=1000)
+    required_experience = models.IntegerField(blank=True, null=True)
+    reviewed = models.BooleanField(default=False)
+    remote = models.BooleanField(default=False)
+    in_office = models.BooleanField(default=True)
+    date = models.DateTimeField()
+    unavailable_date = models.DateTimeField(null=True, blank=True)
+    locations = models.JSONField(default=list)
+    skills = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'job_id']),
+        ]
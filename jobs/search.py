@@ -0,0 +1,149 @@
+import re
+from functools import reduce
+from operator import add, and_
+
+from django.db import connections
+from django.db.models import BooleanField, Case, Exists, FloatField, OuterRef, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from talent_bridge_cron.routers import replica_db
+
+# Index maintained by the triggers of migration jobs 0006, see backfill_jobs_search for existing rows
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '') || ' ' || coalesce(sub_category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(post, '')), 'C')"
+)
+POSTGRES_QUERY = "websearch_to_tsquery('english', %s)"
+# bm25 weights per column of jobs_jobs_fts: title, category, post
+SQLITE_WEIGHTS = '10.0, 5.0, 1.0'
+# Other databases have no index, words are matched with icontains and ranked by the fields they are found in
+FALLBACK_WEIGHTS = {'title': 10.0, 'category': 5.0, 'sub_category': 5.0, 'post': 1.0}
+
+
+def fts5_query(text):
+    # Every word as a quoted FTS5 string, so user input can't be read as query syntax, all words must match
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def no_results(queryset):
+    # Input without a single word matches nothing, still annotated so it can be ordered and paged like a match
+    return queryset.annotate(rank=Value(0.0, output_field=FloatField())).none()
+
+
+def annotate_unindexed_search(queryset, text):
+    words = re.findall(r'\w+', text)
+
+    if not words:
+        return no_results(queryset)
+
+    matches = [reduce(Q.__or__, [Q(**{f'{field}__icontains': word}) for field in FALLBACK_WEIGHTS]) for word in words]
+    rank = reduce(add, [
+        Case(When(Q(**{f'{field}__icontains': word}), then=Value(weight)), default=Value(0.0),
+             output_field=FloatField())
+        for word in words for field, weight in FALLBACK_WEIGHTS.items()
+    ])
+
+    return queryset.filter(reduce(and_, matches)).annotate(rank=rank)
+
+
+def annotate_search(queryset, text):
+    """Filters ``queryset`` to jobs matching ``text`` and annotates them with ``rank``, higher is better."""
+    vendor = connections[queryset.db].vendor
+
+    if vendor == 'postgresql':
+        matches = RawSQL(f'"jobs_jobs"."search_vector" @@ {POSTGRES_QUERY}', [text], output_field=BooleanField())
+        rank = RawSQL(f'ts_rank_cd("jobs_jobs"."search_vector", {POSTGRES_QUERY})', [text], output_field=FloatField())
+
+    elif vendor == 'sqlite':
+        query = fts5_query(text)
+
+        if not query:
+            return no_results(queryset)
+
+        matches = RawSQL('"jobs_jobs"."id" IN (SELECT rowid FROM jobs_jobs_fts WHERE jobs_jobs_fts MATCH %s)',
+                         [query], output_field=BooleanField())
+        rank = RawSQL(f'(SELECT -bm25(jobs_jobs_fts, {SQLITE_WEIGHTS}) FROM jobs_jobs_fts '
+                      f'WHERE jobs_jobs_fts MATCH %s AND jobs_jobs_fts.rowid = "jobs_jobs"."id")',
+                      [query], output_field=FloatField())
+
+    else:
+        return annotate_unindexed_search(queryset, text)
+
+    return queryset.annotate(search_match=matches, rank=rank).filter(search_match=True)
+
+
+def search(queryset, text, company=None, country=None, city=None, available=True, after=None, limit=20):
+    """
+    Ranked full text search over title, category and post.
+
+    * company: Company instance or id, country/city: location of the job, available: None for both open and closed
+    * after: ``(rank, id)`` of the last job of the previous page, pages are keyed on rank instead of offset
+    """
+    from jobs.models import JobLocation
+
+    queryset = annotate_search(queryset.using(replica_db()), text)
+
+    if company is not None:
+        queryset = queryset.filter(company=company)
+
+    if available is not None:
+        queryset = queryset.filter(available=available)
+
+    if country or city:
+        locations = JobLocation.objects.filter(job=OuterRef('pk'))
+
+        if country:
+            locations = locations.filter(location__country=country)
+        if city:
+            locations = locations.filter(location__city=city)
+
+        queryset = queryset.filter(Exists(locations))
+
+    if after:
+        last_rank, last_id = after
+        queryset = queryset.filter(Q(rank__lt=last_rank) | Q(rank=last_rank, id__lt=last_id))
+
+    return queryset.order_by('-rank', '-id')[:limit]
+
+
+def backfill(batch_size=1000, using='default'):
+    """
+    Indexes existing jobs in id order, one batch per statement so memory and locks stay bounded.
+    Yields the last id done after each batch.
+    """
+    vendor = connections[using].vendor
+    last_id = 0
+
+    if not is_supported(using):
+        return
+
+    with connections[using].cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute("INSERT INTO jobs_jobs_fts(jobs_jobs_fts) VALUES ('delete-all')")
+
+        while True:
+            cursor.execute('SELECT MAX(id) FROM (SELECT id FROM jobs_jobs WHERE id > %s ORDER BY id LIMIT %s) AS batch',
+                           [last_id, batch_size])
+            batch_end = cursor.fetchone()[0]
+
+            if batch_end is None:
+                return
+
+            if vendor == 'postgresql':
+                cursor.execute(f'UPDATE jobs_jobs SET search_vector = {POSTGRES_VECTOR} WHERE id > %s AND id <= %s',
+                               [last_id, batch_end])
+            else:
+                cursor.execute("INSERT INTO jobs_jobs_fts(rowid, title, category, post) "
+                               "SELECT id, title, category || ' ' || sub_category, post FROM jobs_jobs "
+                               "WHERE id > %s AND id <= %s", [last_id, batch_end])
+
+            last_id = batch_end
+            yield last_id
+
+
+def is_supported(using='default'):
+    # Whether ``using`` has a full text index, search works everywhere but falls back to icontains without one
+    return connections[using].vendor in ('postgresql', 'sqlite')
+
@@ -0,0 +1,180 @@
+import datetime
+from collections import Counter, defaultdict
+
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Value
+from django.db.models.fields.json import KeyTextTransform, KeyTransform
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from jobs.models import ArchivedJob, JobLocation, Jobs, JobsDailyStats, JobsStats
+from talent_bridge_cron.routers import replica_db_before
+
+
+def with_country(queryset):
+    # A job counts towards the country of its first location, so per country numbers add up to the company total
+    first_country = JobLocation.objects.filter(job=OuterRef('pk')).order_by('id').values('location__country')[:1]
+    return queryset.annotate(stats_country=Coalesce(Subquery(first_country), Value('')))
+
+
+def archived_with_country(queryset):
+    # Archived jobs keep their locations inline in the order they were added, see jobs.archive
+    first_country = KeyTextTransform('country', KeyTransform('0', 'locations'))
+    return queryset.annotate(stats_country=Coalesce(first_country, Value(''), output_field=models.CharField()))
+
+
+def group_counts(job_ids):
+    jobs = with_country(Jobs.objects.filter(id__in=job_ids))
+    return jobs.values('company_id', 'stats_country', 'category').annotate(jobs_count=Count('id')).order_by()
+
+
+def get_day_stats(day, company_id, country, category):
+    stats, created = JobsDailyStats.objects.get_or_create(
+        date=day, company_id=company_id, country=country, category=category,
+        defaults={'open': previous_open(day, company_id, country, category)})
+
+    return stats
+
+
+def previous_open(day, company_id, country, category):
+    return JobsDailyStats.objects.filter(date__lt=day, company_id=company_id, country=country,
+                                         category=category).order_by('-date').values_list('open', flat=True).first() or 0
+
+
+def create_totals(day):
+    """
+    Creates the JobsStats row of ``day`` unless there is one, carrying the previous totals and the groups still
+    open over. Concurrent first writes of a day race on the unique day, the inserts of the losers do nothing.
+    """
+    previous = JobsStats.objects.filter(day__lt=day).order_by('-day').first()
+    JobsStats.objects.bulk_create([
+        JobsStats(day=day, total_available=previous.total_available if previous else 0,
+                  total_unavailable=previous.total_unavailable if previous else 0)
+    ], ignore_conflicts=True)
+    carry_over_open(day)
+
+
+def carry_over_open(day):
+    """
+    Copies the groups with open jobs on the last day with stats to ``day``, so the incremental updates leave a row
+    per open group like reconcile_day does, and not only for the groups with jobs opened or closed that day.
+    """
+    last_day = JobsDailyStats.objects.filter(date__lt=day).order_by('-date').values('date')[:1]
+    # Nothing to copy once the day has rows, the unique constraint does not cover rows without a company
+    open_groups = JobsDailyStats.objects.filter(date=Subquery(last_day), open__gt=0).exclude(
+        Exists(JobsDailyStats.objects.filter(date=day)))
+
+    JobsDailyStats.objects.bulk_create([
+        JobsDailyStats(date=day, company_id=row['company_id'], country=row['country'], category=row['category'],
+                       open=row['open'])
+        for row in open_groups.values('company_id', 'country', 'category', 'open')
+    ])
+
+
+def get_totals(day):
+    totals = JobsStats.objects.filter(day=day).first()
+
+    if totals is None:
+        create_totals(day)
+        totals = JobsStats.objects.get(day=day)
+
+    return totals
+
+
+def lock_totals(day):
+    """
+    Locks the JobsStats row of ``day`` until the end of the transaction. The incremental updates and a rebuild of
+    the same day both take it first, so a rebuild never drops the jobs recorded while it runs.
+    """
+    totals = JobsStats.objects.select_for_update().filter(day=day).first()
+
+    if totals is None:
+        create_totals(day)
+        totals = JobsStats.objects.select_for_update().get(day=day)
+
+    return totals
+
+
+@transaction.atomic
+def record_jobs_event(job_ids, new=0, closed=0):
+    day = timezone.localdate()
+    totals = lock_totals(day)
+    total = 0
+
+    for row in group_counts(job_ids):
+        stats = get_day_stats(day, row['company_id'], row['stats_country'], row['category'])
+        count = row['jobs_count']
+        JobsDailyStats.objects.filter(id=stats.id).update(new=F('new') + count * new,
+                                                          closed=F('closed') + count * closed,
+                                                          open=F('open') + count * (new - closed))
+        total += count
+
+    if total:
+        JobsStats.objects.filter(id=totals.id).update(
+            total_available=F('total_available') + total * (new - closed),
+            total_unavailable=F('total_unavailable') + total * closed)
+
+
+def record_new_jobs(job_ids):
+    """Counts freshly saved jobs, call once their locations are added."""
+    record_jobs_event(job_ids, new=1)
+
+
+def record_closed_jobs(job_ids):
+    record_jobs_event(job_ids, closed=1)
+
+
+def day_counts(queryset, created_today, closed_today, open_at_end):
+    return queryset.filter(created_today | closed_today | open_at_end).values(
+        'company_id', 'stats_country', 'category').annotate(
+        new_count=Count('id', filter=created_today),
+        closed_count=Count('id', filter=closed_today),
+        open_count=Count('id', filter=open_at_end),
+    ).order_by()
+
+
+@transaction.atomic
+def reconcile_day(day):
+    """
+    Rebuilds the JobsDailyStats rows of ``day`` from the jobs table and the archive with a single grouped query
+    each, fixing whatever the incremental updates missed. Today's rows are rebuilt holding today's totals lock,
+    jobs saved or closed meanwhile are recorded once the rebuild commits. Returns the number of rows written.
+    """
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    end = start + datetime.timedelta(days=1)
+
+    # Only today's rows still get incremental updates
+    if day >= timezone.localdate():
+        lock_totals(day)
+
+    closed_today = Q(unavailable_date__gte=start, unavailable_date__lt=end)
+
+    # The heavy grouped reads go to the replica once it surely has the whole day, the rows are written to the primary
+    db = replica_db_before(end)
+    jobs = day_counts(
+        with_country(Jobs.objects.using(db)),
+        created_today=Q(created__gte=start, created__lt=end),
+        closed_today=Q(available=False) & closed_today,
+        open_at_end=Q(created__lt=end) & (Q(available=True) | Q(unavailable_date__gte=end)),
+    )
+    # Archived jobs are closed, they were open at the end of the day if they closed after it
+    archived = day_counts(
+        archived_with_country(ArchivedJob.objects.using(db)),
+        created_today=Q(original_created__gte=start, original_created__lt=end),
+        closed_today=closed_today,
+        open_at_end=Q(original_created__lt=end, unavailable_date__gte=end),
+    )
+
+    counts = defaultdict(Counter)
+    for row in [*jobs, *archived]:
+        counts[row['company_id'], row['stats_country'], row['category']].update(
+            new=row['new_count'], closed=row['closed_count'], open=row['open_count'])
+
+    JobsDailyStats.objects.filter(date=day).delete()
+    JobsDailyStats.objects.bulk_create([
+        JobsDailyStats(date=day, company_id=company_id, country=country, category=category, new=row['new'],
+                       closed=row['closed'], open=row['open'])
+        for (company_id, country, category), row in counts.items()
+    ])
+
+    return len(counts)
@@ -0,0 +1,25 @@
+from celery import shared_task
+import logging
+
+from talent_bridge_cron.scheduling import ExclusiveTask
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, base=ExclusiveTask)
+def update_jobs_data(self, resume=False):
+    # Imported here so the worker only loads selenium/spaCy while a crawl is actually running
+    from jobs.management.commands.update_jobs_data import startup
+
+    logger.info("Starting update_jobs_data")
+    startup(resume=resume)
+    return 'update_jobs_data finished'
+
+
+@shared_task(bind=True, base=ExclusiveTask)
+def check_unavailable_jobs(self):
+    from jobs.management.commands.check_unavailable_jobs import startup
+
+    logger.info("Starting check_unavailable_jobs")
+    startup()
+    return 'check_unavailable_jobs finished'
@@ -1,3 +1,881 @@
-from django.test import TestCase
+import datetime
+import json
+import math
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
 
-# Create your tests here.
+from django.core.exceptions import ValidationError
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+
+from companies.models import Company
+from jobs.availability import CLOSED, OPEN, UNKNOWN, company_closure_rates, due_jobs, get_rule, next_check_at
+from jobs.archive import archivable_jobs, archive_jobs, get_job, job_seen
+from jobs.dedupe import backfill, cluster
+from jobs.listing_diff import record_crawl
+from jobs.models import ArchivedJob, JobLocation, Jobs, JobsDailyStats, JobsStats
+from jobs.search import search
+from jobs.stats import create_totals, lock_totals, reconcile_day, record_new_jobs
+from jobs.utility import (DriverPool, JsonlSnapshotWriter, ScrapeCheckpoint, apply_browser_profile, block_urls,
+                          get_company_log_file, load_page, log_page_load_summary, page_loads)
+from jobs.waits import element_count_stable, log_wait_summary, wait_for, wait_timings
+from locations.models import Locations
+from skills.models import Skills
+from talent_bridge_cron.testing import local_services
+
+
+def explain(queryset):
+    """Query plan of ``queryset`` as text, with sequential scans made a last resort on PostgreSQL."""
+    sql, params = queryset.query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Tiny test tables are always cheaper to scan, only fall back to a scan when no index applies
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+        else:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def full_scans(plan, table):
+    if connection.vendor == 'postgresql':
+        return f'Seq Scan on {table}' in plan
+
+    # SQLite reports "SCAN <table>" for a full scan, "SEARCH <table> USING INDEX" or "SCAN <table> USING INDEX"
+    return any(line.strip().startswith(f'SCAN {table}') and 'USING' not in line for line in plan.splitlines())
+
+
+@local_services
+@override_settings(RUN_LOGS_DIR=tempfile.mkdtemp())
+class HotPathQueryTests(TestCase):
+    """
+    Query counts and plans of the lookups the scrapers and checkers run per job, so a lost index or an
+    N+1 shows up as a failing test.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme', career_page='https://acme.example/careers')
+        Locations.objects.bulk_create([
+            Locations(city=f'City {index}', state=f'State {index}', country=f'Country {index % 10}',
+                      country_code_iso2=f'{index % 10}X', country_code_iso3=f'{index % 10}XX')
+            for index in range(200)
+        ])
+        Jobs.objects.bulk_create([
+            Jobs(title=f'Job {index}', post='post', company=cls.company, job_id=str(index),
+                 job_url=f'https://acme.example/jobs/{index}', category='Engineering')
+            for index in range(200)
+        ])
+        Jobs.objects.update(date=timezone.now() - datetime.timedelta(days=10))
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        with CaptureQueriesContext(connection) as queries:
+            yield queries
+
+        self.assertLessEqual(len(queries), budget, '\n'.join(query['sql'] for query in queries.captured_queries))
+
+    def test_location_lookups_use_indexes(self):
+        lookups = [
+            {'city': 'City 1'},
+            {'state': 'State 1'},
+            {'country': 'Country 1'},
+            {'country_code_iso2': '1X'},
+            {'country_code_iso3': '1XX'},
+        ]
+
+        for lookup in lookups:
+            with self.subTest(lookup=lookup):
+                plan = explain(Locations.objects.filter(**lookup))
+                self.assertFalse(full_scans(plan, Locations._meta.db_table), plan)
+
+    def test_job_id_lookup_uses_index(self):
+        plan = explain(Jobs.objects.filter(job_id='42'))
+        self.assertFalse(full_scans(plan, Jobs._meta.db_table), plan)
+
+    def test_open_jobs_lookup_uses_index(self):
+        queryset = Jobs.objects.filter(date__lt=timezone.now() - datetime.timedelta(days=5), available=True)
+        plan = explain(queryset)
+        self.assertFalse(full_scans(plan, Jobs._meta.db_table), plan)
+
+    def test_check_unavailable_jobs_query_budget(self):
+        from jobs.management.commands import check_unavailable_jobs
+
+        def fake_check(jobs):
+            return [(job_pk, [OPEN, CLOSED, UNKNOWN][job_pk % 3], 200) for job_pk, job_url, company_name in jobs]
+
+        # A few reads up front, then one bulk update and the stats updates per chunk, whatever the number of jobs
+        chunks = 4
+        with override_settings(AVAILABILITY_CHUNK_SIZE=200 // chunks), \
+                mock.patch.object(check_unavailable_jobs, 'check_availability', fake_check), \
+                self.assertQueryBudget(8 + 10 * chunks):
+            check_unavailable_jobs.startup()
+
+        self.assertEqual(Jobs.objects.filter(available=False).count(), len([pk for pk in range(1, 201) if pk % 3 == 1]))
+
+    def test_listing_diff_query_budget(self):
+        listed = [str(index) for index in range(150)]
+        record_crawl(self.company, listed, complete=True, source='test')
+
+        # The jobs missing from both crawls are closed with one UPDATE, however many there are
+        with self.assertQueryBudget(20):
+            marked = record_crawl(self.company, listed, complete=True, source='test')
+
+        self.assertEqual(marked, 50)
+        self.assertFalse(Jobs.objects.filter(job_id__in=listed, available=False).exists())
+
+    def test_record_new_jobs_query_budget(self):
+        job_ids = list(Jobs.objects.values_list('id', flat=True))
+
+        # One grouped read, then a handful of queries per (company, country, category) group and for the totals
+        with self.assertQueryBudget(15):
+            record_new_jobs(job_ids)
+
+
+class AvailabilityRuleTests(SimpleTestCase):
+    meta_url = 'https://www.metacareers.com/jobs/1234567890/'
+
+    def test_meta_posting_is_open_while_its_page_has_the_job_posting(self):
+        rule = get_rule('Meta')
+        page = '<script type="application/ld+json">{"@context": "http://schema.org/", "@type": "JobPosting"}</script>'
+
+        self.assertTrue(rule.needs_body)
+        self.assertEqual(rule.status(self.meta_url, 200, body=page), OPEN)
+
+    def test_meta_posting_is_closed_when_the_page_is_the_bare_shell(self):
+        page = '<div id="careersContentContainer"></div><script>window.location.replace("/jobs/")</script>'
+
+        self.assertEqual(get_rule('Meta').status(self.meta_url, 200, body=page), CLOSED)
+        self.assertEqual(get_rule('Meta').status(self.meta_url, 404), CLOSED)
+        self.assertEqual(get_rule('Meta').status(self.meta_url, 503), UNKNOWN)
+
+
+@local_services
+@override_settings(AVAILABILITY_RECHECK_PROBABILITY=0.2, AVAILABILITY_DEFAULT_CLOSURE_RATE=0.02,
+                   AVAILABILITY_CLOSURE_RATE_WINDOW_DAYS=30, AVAILABILITY_AGE_SCALE_DAYS=30,
+                   AVAILABILITY_MIN_RECHECK_HOURS=12, AVAILABILITY_MAX_RECHECK_DAYS=14)
+class AvailabilitySchedulingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.company = Company.objects.create(name='Acme', career_page='https://acme.example/careers')
+        cls.steady = Company.objects.create(name='Steady', career_page='https://steady.example/careers')
+
+        def job(job_id, company=None, next_check_days=None, closed_days_ago=None, age_days=0):
+            job = Jobs.objects.create(title=f'Job {job_id}', post=f'post {job_id}', company=company or cls.company,
+                                      job_id=job_id, job_url=f'https://acme.example/jobs/{job_id}')
+            changes = {'date': cls.now - datetime.timedelta(days=age_days)}
+            if next_check_days is not None:
+                changes['next_check_at'] = cls.now + datetime.timedelta(days=next_check_days)
+            if closed_days_ago is not None:
+                changes.update(available=False, unavailable_date=cls.now - datetime.timedelta(days=closed_days_ago))
+            Jobs.objects.filter(id=job.id).update(**changes)
+            return Jobs.objects.get(id=job.id)
+
+        cls.never_checked_new = job('never-checked-new', age_days=1)
+        cls.never_checked_old = job('never-checked-old', age_days=20)
+        cls.overdue = job('overdue', next_check_days=-3)
+        cls.just_due = job('just-due', next_check_days=-0.1)
+        cls.not_due = job('not-due', next_check_days=2)
+        job('closed-recently', closed_days_ago=5)
+        job('closed-long-ago', closed_days_ago=90)
+        job('steady-open', company=cls.steady)
+
+    def interval_days(self, job, closure_rates):
+        return (next_check_at(job, closure_rates, now=self.now) - self.now).total_seconds() / 86400
+
+    def test_interval_bounds(self):
+        job = Jobs(company_id=self.company.id, date=self.now)
+
+        self.assertAlmostEqual(self.interval_days(job, {self.company.id: 100}), 0.5)
+        self.assertAlmostEqual(self.interval_days(job, {self.company.id: 0.0001}), 14)
+
+    def test_companies_without_history_use_the_default_rate(self):
+        job = Jobs(company_id=self.company.id, date=self.now)
+
+        self.assertAlmostEqual(self.interval_days(job, {}), -math.log(0.8) / 0.02)
+
+    def test_older_jobs_are_checked_sooner(self):
+        new = Jobs(company_id=self.company.id, date=self.now)
+        old = Jobs(company_id=self.company.id, date=self.now - datetime.timedelta(days=60))
+
+        self.assertAlmostEqual(self.interval_days(old, {}), self.interval_days(new, {}) / 3)
+
+    def test_closure_rates_over_the_window(self):
+        # 1 job closed in the window out of 6 counted, over 30 days
+        self.assertEqual(company_closure_rates(), {self.company.id: 1 / (6 * 30)})
+
+    def test_never_checked_jobs_come_first_then_the_most_overdue(self):
+        open_jobs = Jobs.objects.filter(company=self.company, available=True)
+
+        self.assertEqual(list(due_jobs(open_jobs, now=self.now)),
+                         [self.never_checked_old, self.never_checked_new, self.overdue, self.just_due])
+
+    def test_due_jobs_budget(self):
+        open_jobs = Jobs.objects.filter(company=self.company, available=True)
+
+        self.assertEqual(list(due_jobs(open_jobs, budget=3, now=self.now)),
+                         [self.never_checked_old, self.never_checked_new, self.overdue])
+
+
+@override_settings(RUN_LOGS_DIR=tempfile.mkdtemp())
+class ScrapeCheckpointTests(SimpleTestCase):
+
+    def test_listing_failures_survive_a_resume(self):
+        company = Company(name='Acme')
+        checkpoint = ScrapeCheckpoint(company)
+        checkpoint.page_read(1, [{'job_id': '1'}, {'job_id': '2'}])
+        checkpoint.listing_failed()
+
+        resumed = ScrapeCheckpoint(company, resume=True)
+
+        self.assertEqual(resumed.failures, 1)
+        self.assertEqual(resumed.pending_rows(), [{'job_id': '1'}, {'job_id': '2'}])
+        self.assertEqual(ScrapeCheckpoint(company).failures, 0)
+
+
+@local_services
+class DailyStatsRebuildTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme', career_page='https://acme.example/careers')
+        india = Locations.objects.create(city='Mumbai', state='Maharashtra', country='India')
+        ireland = Locations.objects.create(city='Dublin', state='Dublin', country='Ireland')
+
+        cls.day = timezone.localdate() - datetime.timedelta(days=200)
+        cls.noon = timezone.make_aware(datetime.datetime.combine(cls.day, datetime.time(12)))
+
+        for index, (created_days, closed_days, location) in enumerate([
+            (0, None, india),  # opened that day, still open
+            (0, 0, india),  # opened and closed that day
+            (-5, 0, ireland),  # closed that day
+            (-5, 100, ireland),  # open at the end of the day, closed since
+            (-5, -1, india),  # closed before the day
+            (3, None, india),  # opened after the day
+        ]):
+            job = Jobs.objects.create(title=f'Job {index}', post='post', company=cls.company, job_id=str(index),
+                                      job_url=f'https://acme.example/jobs/{index}', category='Engineering')
+            job.location.add(location)
+            Jobs.objects.filter(id=job.id).update(
+                created=cls.noon + datetime.timedelta(days=created_days),
+                available=closed_days is None,
+                unavailable_date=None if closed_days is None else cls.noon + datetime.timedelta(days=closed_days))
+
+    def day_rows(self):
+        return {(row.country, row.new, row.closed, row.open) for row in JobsDailyStats.objects.filter(date=self.day)}
+
+    def test_rebuild_counts_archived_jobs(self):
+        self.assertEqual(reconcile_day(self.day), 2)
+        expected = {('India', 2, 1, 1), ('Ireland', 0, 1, 1)}
+        self.assertEqual(self.day_rows(), expected)
+
+        # Every job closed more than 90 days ago moves to the archive, the day's numbers must not change
+        self.assertEqual(sum(archive_jobs(days=90)), 4)
+        self.assertEqual(ArchivedJob.objects.count(), 4)
+
+        self.assertEqual(reconcile_day(self.day), 2)
+        self.assertEqual(self.day_rows(), expected)
+
+    def test_rebuild_of_today_waits_for_the_totals_lock(self):
+        JobsStats.objects.create(total_available=0, total_unavailable=0, day=timezone.localdate())
+
+        with mock.patch('jobs.stats.lock_totals', wraps=lock_totals) as locked:
+            reconcile_day(timezone.localdate())
+            reconcile_day(self.day)
+
+        locked.assert_called_once_with(timezone.localdate())
+
+
+@local_services
+class DailyTotalsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        cls.company = Company.objects.create(name='Acme', career_page='https://acme.example/careers')
+        cls.india = Locations.objects.create(city='Mumbai', state='Maharashtra', country='India')
+
+        for index, category in enumerate(['Engineering', 'Engineering', 'Sales']):
+            job = Jobs.objects.create(title=f'Job {index}', post=f'post {index}', company=cls.company,
+                                      job_id=str(index), job_url=f'https://acme.example/jobs/{index}',
+                                      category=category)
+            job.location.add(cls.india)
+            Jobs.objects.filter(id=job.id).update(created=timezone.now() - datetime.timedelta(days=3))
+
+        # The only Sales job closed two days ago
+        Jobs.objects.filter(category='Sales').update(available=False,
+                                                     unavailable_date=timezone.now() - datetime.timedelta(days=2))
+        JobsStats.objects.create(day=cls.today - datetime.timedelta(days=2), total_available=2, total_unavailable=1)
+        reconcile_day(cls.today - datetime.timedelta(days=2))
+
+    def day_rows(self, day):
+        return {(row.country, row.category, row.new, row.closed, row.open)
+                for row in JobsDailyStats.objects.filter(date=day)}
+
+    def test_first_write_of_the_day_carries_the_totals_over(self):
+        totals = lock_totals(self.today)
+
+        self.assertEqual((totals.day, totals.total_available, totals.total_unavailable), (self.today, 2, 1))
+
+    def test_concurrent_first_writes_keep_one_row(self):
+        create_totals(self.today)
+        create_totals(self.today)
+
+        self.assertEqual(JobsStats.objects.filter(day=self.today).count(), 1)
+        self.assertEqual(JobsDailyStats.objects.filter(date=self.today).count(), 1)
+
+    def test_incremental_rows_match_the_rebuild(self):
+        job = Jobs.objects.create(title='New job', post='new post', company=self.company, job_id='new',
+                                  job_url='https://acme.example/jobs/new', category='Marketing')
+        job.location.add(self.india)
+        record_new_jobs([job.id])
+
+        incremental = self.day_rows(self.today)
+        self.assertEqual(incremental, {('India', 'Engineering', 0, 0, 2), ('India', 'Marketing', 1, 0, 1)})
+
+        reconcile_day(self.today)
+        self.assertEqual(self.day_rows(self.today), incremental)
+        self.assertEqual(JobsStats.objects.get(day=self.today).total_available, 3)
+
+
+@local_services
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme', career_page='https://acme.example/careers')
+
+        def job(title, post, category='Engineering'):
+            return Jobs.objects.create(title=title, post=post, category=category, company=cls.company,
+                                       job_id=title, job_url=f'https://acme.example/jobs/{title}')
+
+        cls.title_match = job('Python Developer', 'Build internal tools')
+        cls.post_match = job('Data Engineer', 'Pipelines in Python and SQL')
+        cls.ties = [job(f'Golang Engineer {index}', 'Write golang services') for index in range(5)]
+        job('Recruiter', 'Hire engineers', category='People')
+
+    def ids(self, jobs):
+        return [job.id for job in jobs]
+
+    def test_title_matches_rank_above_post_matches(self):
+        results = list(search(Jobs.objects.all(), 'python'))
+
+        self.assertEqual(self.ids(results), [self.title_match.id, self.post_match.id])
+        self.assertGreater(results[0].rank, results[1].rank)
+        self.assertEqual(self.ids(search(Jobs.objects.all(), 'python developer')), [self.title_match.id])
+        self.assertEqual(list(search(Jobs.objects.all(), '"(*')), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.title_match.title = 'Rust Developer'
+        self.title_match.save()
+
+        self.assertEqual(self.ids(search(Jobs.objects.all(), 'python')), [self.post_match.id])
+        self.assertEqual(self.ids(search(Jobs.objects.all(), 'rust')), [self.title_match.id])
+
+        Jobs.all_with_deleted.filter(id=self.post_match.id).delete()
+
+        self.assertEqual(list(search(Jobs.objects.all(), 'python')), [])
+
+    def test_pages_split_equal_ranks_without_gaps_or_repeats(self):
+        everything = self.ids(search(Jobs.objects.all(), 'golang', limit=100))
+        pages, after = [], None
+
+        while True:
+            page = list(search(Jobs.objects.all(), 'golang', after=after, limit=2))
+            if not page:
+                break
+            pages.append(self.ids(page))
+            after = (page[-1].rank, page[-1].id)
+
+        self.assertEqual(len({job.rank for job in search(Jobs.objects.all(), 'golang', limit=100)}), 1)
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), everything)
+        self.assertEqual(sorted(everything), sorted(self.ids(self.ties)))
+
+    def test_databases_without_an_index_fall_back_to_icontains(self):
+        with mock.patch.object(connections['default'], 'vendor', 'mysql'):
+            results = list(search(Jobs.objects.all(), 'python'))
+            self.assertEqual(list(search(Jobs.objects.all(), 'python golang')), [])
+
+        self.assertEqual(self.ids(results), [self.title_match.id, self.post_match.id])
+        self.assertEqual([job.rank for job in results], [10.0, 1.0])
+
+
+@local_services
+class ArchiveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme', career_page='https://acme.example/careers')
+        cls.mumbai = Locations.objects.create(city='Mumbai', state='Maharashtra', country='India')
+        cls.dublin = Locations.objects.create(city='Dublin', state='Dublin', country='Ireland')
+        cls.python = Skills.objects.create(name='Python')
+        cls.cobol = Skills.objects.create(name='COBOL')
+
+        def job(job_id, closed_days_ago=None, company=None):
+            job = Jobs.objects.create(title=f'Job {job_id}', post='post', company=company or cls.company,
+                                      job_id=job_id, job_url=f'https://acme.example/jobs/{job_id}')
+            if closed_days_ago is not None:
+                Jobs.objects.filter(id=job.id).update(
+                    available=False, unavailable_date=timezone.now() - datetime.timedelta(days=closed_days_ago))
+            return job
+
+        cls.old = job('old', closed_days_ago=120)
+        cls.recent = job('recent', closed_days_ago=10)
+        cls.open = job('open')
+        cls.original = job('original', closed_days_ago=120)
+        cls.duplicate = job('duplicate', company=Company.objects.create(name='Acme Resellers'))
+        Jobs.objects.filter(id=cls.duplicate.id).update(duplicate_of=cls.original)
+
+        cls.old.location.add(cls.mumbai, cls.dublin)
+        cls.old.required_skills.add(cls.python, cls.cobol)
+
+    def test_archives_closed_jobs_with_soft_deleted_links(self):
+        JobLocation.objects.filter(job=self.old, location=self.dublin).soft_delete()
+        Locations.objects.filter(id=self.mumbai.id).soft_delete()
+        Skills.objects.filter(id=self.cobol.id).soft_delete()
+
+        self.assertEqual(sum(archive_jobs()), 1)
+
+        archived = ArchivedJob.objects.get(original_id=self.old.id)
+        self.assertEqual([(location['city'], location['country']) for location in archived.locations],
+                         [('Mumbai', 'India'), ('Dublin', 'Ireland')])
+        self.assertEqual(sorted(skill['name'] for skill in archived.skills), ['COBOL', 'Python'])
+        self.assertEqual(archived.original_created, self.old.created)
+        self.assertFalse(Jobs.all_with_deleted.filter(id=self.old.id).exists())
+        self.assertIsInstance(get_job(self.old.id), ArchivedJob)
+        self.assertEqual(get_job(self.recent.id), self.recent)
+
+    def test_jobs_with_live_duplicates_stay(self):
+        self.assertEqual(set(archivable_jobs().values_list('job_id', flat=True)), {'old'})
+
+        list(archive_jobs())
+        self.duplicate.refresh_from_db()
+        self.assertEqual(self.duplicate.duplicate_of, self.original)
+
+        # Once the duplicates are gone the original is archived as well
+        Jobs.all_with_deleted.filter(id=self.duplicate.id).delete()
+        self.assertEqual(sum(archive_jobs()), 1)
+        self.assertTrue(ArchivedJob.objects.filter(original_id=self.original.id).exists())
+
+    def test_archived_jobs_are_not_new_to_the_scrapers(self):
+        list(archive_jobs())
+
+        self.assertTrue(job_seen(job_id='old', company=self.company))
+        self.assertTrue(job_seen(job_id='old', company__name='Acme'))
+        self.assertTrue(job_seen(job_id='open', company=self.company))
+        self.assertFalse(job_seen(job_id='old', company__name='Acme Resellers'))
+        self.assertFalse(job_seen(job_id='relisted', company=self.company))
+
+
+@local_services
+class DedupeTests(TestCase):
+    post = ("We are looking for a backend engineer to design, build and run the services behind our payments "
+            "platform. You will work with Python, Django and PostgreSQL, own features from the first design review "
+            "to production, and take part in the on call rotation of the team. Experience with message queues, "
+            "caching and observability tools is a plus, as is having shipped APIs used by other teams.")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme', career_page='https://acme.example/careers')
+        cls.agency = Company.objects.create(name='Acme Recruiting', career_page='https://recruiting.example/jobs')
+
+        cls.original = cls.job('original', post=cls.post)
+        # The agency copy comes with its own markup, then a repost with a line added
+        cls.agency_copy = cls.job('agency-copy', post=f'<p>{cls.post.upper()}</p>', company=cls.agency)
+        cls.repost = cls.job('repost', post=f'{cls.post} Apply today.')
+        cls.analyst = cls.job('analyst', title='Data Analyst', post=(
+            "Our data team is hiring an analyst to build dashboards and reports for the sales and marketing teams. "
+            "You will write SQL against the warehouse, model metrics with dbt and present findings to leadership "
+            "every month. Strong communication skills and two years of experience with Looker are required."))
+
+    @classmethod
+    def job(cls, job_id, title='Backend Engineer', post='', company=None):
+        return Jobs.objects.create(title=title, post=post, company=company or cls.company, job_id=job_id,
+                                   job_url=f'https://acme.example/jobs/{job_id}')
+
+    def duplicate_of(self):
+        return dict(Jobs.all_with_deleted.values_list('job_id', 'duplicate_of__job_id'))
+
+    def test_new_near_duplicates_join_the_oldest_job(self):
+        self.assertEqual(self.duplicate_of(), {'original': None, 'agency-copy': 'original', 'repost': 'original',
+                                               'analyst': None})
+        self.assertEqual(list(Jobs.objects.originals().order_by('id')), [self.original, self.analyst])
+
+    def test_cluster_links_to_the_oldest_job(self):
+        Jobs.objects.update(duplicate_of=None)
+
+        self.assertEqual(cluster(), 2)
+        self.assertEqual(self.duplicate_of(), {'original': None, 'agency-copy': 'original', 'repost': 'original',
+                                               'analyst': None})
+
+    def test_cluster_is_idempotent(self):
+        cluster()
+        first = self.duplicate_of()
+
+        # One read per band and one of the current links, nothing left to write
+        with self.assertNumQueries(5):
+            self.assertEqual(cluster(), 2)
+        self.assertEqual(self.duplicate_of(), first)
+
+    def test_backfill_signs_jobs_without_a_signature(self):
+        short = self.job('short', post='Apply on our site.')
+        Jobs.objects.exclude(id=self.analyst.id).update(simhash=None, simhash_band_0=None, simhash_band_1=None,
+                                                        simhash_band_2=None, simhash_band_3=None)
+
+        self.assertEqual(list(backfill(batch_size=2)), [2, 3])
+        self.assertEqual(Jobs.objects.filter(simhash__isnull=True).get(), short)
+        self.assertEqual(Jobs.objects.get(id=self.repost.id).simhash, self.repost.simhash)
+
+    def test_jobs_without_enough_text_are_not_signed(self):
+        first = self.job('title-only', post='')
+        second = self.job('title-only-again', post='')
+
+        self.assertIsNone(first.simhash)
+        self.assertIsNone(second.duplicate_of_id)
+        cluster()
+        self.assertIsNone(Jobs.objects.get(id=second.id).duplicate_of_id)
+
+    def test_soft_deleted_jobs_do_not_head_a_cluster(self):
+        Jobs.objects.filter(id=self.original.id).soft_delete()
+
+        cluster()
+        self.assertEqual(Jobs.objects.get(id=self.repost.id).duplicate_of, self.agency_copy)
+        self.assertIsNone(Jobs.objects.get(id=self.agency_copy.id).duplicate_of_id)
+        self.assertEqual(self.job('again', post=self.post).duplicate_of, self.agency_copy)
+
+    @override_settings(DUPLICATE_MAX_BUCKET=2)
+    def test_full_buckets_stop_taking_jobs(self):
+        Jobs.objects.update(duplicate_of=None)
+
+        with self.assertLogs('jobs.dedupe', 'WARNING'):
+            self.assertEqual(cluster(), 1)
+        self.assertEqual(self.duplicate_of()['repost'], None)
+
+
+@local_services
+class SoftDeleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme', career_page='https://acme.example/careers')
+        cls.jobs = [Jobs.objects.create(title=f'Job {job_id}', post='post', company=cls.company, job_id=job_id,
+                                        job_url=f'https://acme.example/jobs/{job_id}') for job_id in ('a', 'b')]
+
+    def test_soft_delete_and_restore(self):
+        self.assertEqual(Jobs.objects.filter(job_id='a').soft_delete(), 1)
+
+        self.assertEqual(list(Jobs.objects.values_list('job_id', flat=True)), ['b'])
+        self.assertEqual(sorted(Jobs.all_with_deleted.values_list('job_id', flat=True)), ['a', 'b'])
+        self.assertEqual(self.company.company.count(), 1)
+
+        self.assertEqual(Jobs.all_with_deleted.filter(job_id='a').restore(), 1)
+        self.assertEqual(Jobs.objects.count(), 2)
+
+    def test_nothing_changed(self):
+        self.assertEqual(Jobs.objects.filter(job_id='missing').soft_delete(), 0)
+
+    def test_unique_check_sees_deleted_rows(self):
+        Jobs.objects.filter(job_id='a').soft_delete()
+        Company.objects.filter(id=self.company.id).soft_delete()
+
+        job = Jobs(title='Job a', post='post', company=self.company, job_id='a', job_url='https://acme.example/a')
+        with self.assertRaises(ValidationError) as raised:
+            job.validate_unique()
+        self.assertIn('__all__', raised.exception.message_dict)
+
+        company = Company(name='Acme', career_page='https://acme.example/careers')
+        with self.assertRaises(ValidationError) as raised:
+            company.validate_unique()
+        self.assertIn('name', raised.exception.message_dict)
+
+    def test_unique_check_excludes_self(self):
+        job = Jobs.objects.get(job_id='a')
+        Jobs.objects.filter(id=job.id).soft_delete()
+
+        job.validate_unique()
+
+
+@local_services
+@override_settings(LISTING_DIFF_MISSES=2)
+class ListingSnapshotTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Walmart', career_page='https://walmart.example/careers')
+        for job_id in 'abcd':
+            Jobs.objects.create(title=f'Job {job_id}', post='post', company=cls.company, job_id=job_id,
+                                job_url=f'https://walmart.example/jobs/{job_id}')
+        Jobs.objects.update(date=timezone.now() - datetime.timedelta(days=2))
+
+    def setUp(self):
+        # A fresh day's snapshot file for every test
+        logs_dir = self.settings(RUN_LOGS_DIR=tempfile.mkdtemp())
+        logs_dir.enable()
+        self.addCleanup(logs_dir.disable)
+
+    def crawl(self, job_ids, complete):
+        """Writes a run's rows like the scrapers do, then diffs the ids read back from the snapshot."""
+        file_name = get_company_log_file(self.company, 'daily_jobs', 'jsonl')
+        snapshot = JsonlSnapshotWriter(file_name)
+        for job_id in job_ids:
+            snapshot.write({'job_id': job_id, 'title': f'Job {job_id}'})
+        snapshot.close()
+
+        with open(file_name) as snapshot_file:
+            rows = [json.loads(line) for line in snapshot_file]
+
+        # Runs of the same day append to the day's file
+        listed = [row['job_id'] for row in rows[-len(job_ids):]]
+        self.assertEqual(listed, list(job_ids))
+
+        return record_crawl(self.company, listed, complete=complete, source='selenium'), len(rows)
+
+    def open_job_ids(self):
+        return set(Jobs.objects.filter(available=True).values_list('job_id', flat=True))
+
+    def test_jobs_missing_from_complete_crawls_are_closed(self):
+        self.assertEqual(self.crawl('abc', complete=True), (0, 3))
+        # Broke off after one row, must not count as a miss of b, c and d
+        self.assertEqual(self.crawl('a', complete=False), (0, 4))
+        self.assertEqual(self.open_job_ids(), set('abcd'))
+
+        self.assertEqual(self.crawl('abc', complete=True), (1, 7))
+        self.assertEqual(self.open_job_ids(), set('abc'))
+
+    def test_incomplete_crawls_never_close_jobs(self):
+        for _ in range(3):
+            self.assertEqual(self.crawl('ab', complete=False)[0], 0)
+
+        self.assertEqual(self.open_job_ids(), set('abcd'))
+
+
+class StubDriver:
+    """Stands in for a Chrome webdriver, records what is asked of it."""
+
+    def __init__(self, profile_dir=None):
+        self.profile_dir = profile_dir
+        self.healthy = True
+        self.quit_count = 0
+        self.elements = []
+        self.script_result = 'complete'
+        self.visited = []
+        self.cdp_commands = []
+
+    @property
+    def window_handles(self):
+        return ['main'] if self.healthy else []
+
+    def execute_script(self, script):
+        if not self.healthy:
+            raise WebDriverException('chrome not reachable')
+        return self.script_result
+
+    def execute_cdp_cmd(self, cmd, cmd_args):
+        self.cdp_commands.append((cmd, cmd_args))
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def find_elements(self, by, locator):
+        return list(self.elements)
+
+    def quit(self):
+        self.quit_count += 1
+
+
+@override_settings(SELENIUM_PROFILES_DIR='/profiles')
+class DriverPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.created = []
+        self.pool = DriverPool(2, factory=self.create_driver)
+
+    def create_driver(self, profile_dir):
+        driver = StubDriver(profile_dir)
+        self.created.append(driver)
+        return driver
+
+    def test_released_driver_is_reused(self):
+        driver = self.pool.acquire()
+        self.pool.release(driver)
+
+        self.assertIs(self.pool.acquire(), driver)
+        self.assertEqual(len(self.created), 1)
+
+    def test_every_slot_has_its_own_profile(self):
+        drivers = [self.pool.acquire(), self.pool.acquire()]
+
+        self.assertEqual(sorted(driver.profile_dir for driver in drivers), ['/profiles/0', '/profiles/1'])
+
+    def test_unhealthy_driver_is_quit_and_replaced(self):
+        driver = self.pool.acquire()
+        self.pool.release(driver)
+        driver.healthy = False
+
+        replacement = self.pool.acquire()
+
+        self.assertIsNot(replacement, driver)
+        self.assertEqual(driver.quit_count, 1)
+        self.assertEqual(replacement.profile_dir, driver.profile_dir)
+
+    def test_failed_start_gives_the_slot_back(self):
+        self.pool.factory = mock.Mock(side_effect=WebDriverException('chromedriver missing'))
+
+        with self.assertRaises(WebDriverException):
+            self.pool.acquire()
+
+        self.pool.factory = self.create_driver
+        self.pool.acquire()
+        self.pool.acquire()
+        self.assertEqual(len(self.created), 2)
+
+    def test_release_all_after_a_scraper_failed(self):
+        def scraper():
+            self.pool.acquire()
+            raise ValueError('page layout changed')
+
+        for _ in range(3):
+            try:
+                scraper()
+            except ValueError:
+                pass
+            finally:
+                self.pool.release_all()
+
+        # Without release_all the third run would block on an empty pool
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(self.pool.in_use, {})
+        self.assertEqual(self.pool.drivers, {})
+
+    def test_close_quits_every_driver(self):
+        drivers = [self.pool.acquire(), self.pool.acquire()]
+        self.pool.release_all()
+
+        self.pool.close()
+
+        self.assertEqual([driver.quit_count for driver in drivers], [1, 1])
+
+
+class WaitTests(SimpleTestCase):
+
+    def setUp(self):
+        self.driver = StubDriver()
+        wait_timings.clear()
+
+    def test_wait_for_returns_the_condition_value(self):
+        self.assertEqual(wait_for(self.driver, lambda d: 'ready', description='page'), 'ready')
+        self.assertEqual(wait_timings[('default', 'page')]['timeouts'], 0)
+
+    def test_wait_for_returns_false_on_timeout_and_records_it(self):
+        self.assertFalse(wait_for(self.driver, lambda d: False, description='page', timeout=0))
+
+        timings = wait_timings[('default', 'page')]
+        self.assertEqual((timings['count'], timings['timeouts']), (1, 1))
+        self.assertGreaterEqual(timings['max'], 0)
+
+    def test_summary_starts_the_totals_over(self):
+        wait_for(self.driver, lambda d: True, site='meta', description='page')
+        wait_for(self.driver, lambda d: True, site='meta', description='page')
+        run_logger = mock.Mock()
+
+        log_wait_summary(run_logger, 'meta')
+
+        self.assertEqual(run_logger.info.call_args.kwargs['extra']['count'], 2)
+        self.assertNotIn(('meta', 'page'), wait_timings)
+
+    def test_element_count_stable_waits_for_the_count_to_settle(self):
+        condition = element_count_stable('class name', 'result', settle=0)
+        self.driver.elements = ['a', 'b']
+
+        self.assertFalse(condition(self.driver))
+        self.assertEqual(condition(self.driver), ['a', 'b'])
+
+        self.driver.elements = ['a', 'b', 'c']
+        self.assertFalse(condition(self.driver))
+
+    def test_element_count_stable_needs_min_count(self):
+        condition = element_count_stable('class name', 'result', min_count=3, settle=0)
+        self.driver.elements = ['a', 'b']
+
+        condition(self.driver)
+        self.assertFalse(condition(self.driver))
+
+    def test_element_count_stable_needs_the_settle_time(self):
+        condition = element_count_stable('class name', 'result', settle=60)
+        self.driver.elements = ['a']
+
+        condition(self.driver)
+        self.assertFalse(condition(self.driver))
+
+
+class BrowserProfileTests(SimpleTestCase):
+    profile = {
+        'block_images': True,
+        'block_media': False,
+        'blocked_urls': ['*.woff2', '*doubleclick.net*'],
+        'disabled_features': ['Translate', 'MediaRouter'],
+        'extra_arguments': ['--no-first-run'],
+    }
+
+    def setUp(self):
+        self.driver = StubDriver()
+        page_loads.clear()
+
+    def test_profile_options(self):
+        chrome_options = Options()
+
+        apply_browser_profile(chrome_options, self.profile)
+
+        self.assertEqual(chrome_options.experimental_options['prefs'],
+                         {'profile.managed_default_content_settings.images': 2})
+        self.assertIn('--blink-settings=imagesEnabled=false', chrome_options.arguments)
+        self.assertIn('--disable-features=Translate,MediaRouter', chrome_options.arguments)
+        self.assertIn('--no-first-run', chrome_options.arguments)
+        self.assertNotIn('--mute-audio', chrome_options.arguments)
+
+    def test_blocked_urls_are_sent_over_cdp(self):
+        block_urls(self.driver, self.profile)
+
+        self.assertEqual(self.driver.cdp_commands, [
+            ('Network.enable', {}),
+            ('Network.setBlockedURLs', {'urls': ['*.woff2', '*doubleclick.net*']}),
+        ])
+
+    def test_nothing_to_block(self):
+        block_urls(self.driver, {**self.profile, 'blocked_urls': []})
+
+        self.assertEqual(self.driver.cdp_commands, [])
+
+    def test_load_page_records_the_page_load(self):
+        self.driver.script_result = [2048, 300]
+        load_page(self.driver, 'https://careers.example.com/1', 'meta')
+        self.driver.script_result = [1024, 100]
+        load_page(self.driver, 'https://careers.example.com/2', 'meta')
+
+        self.assertEqual(self.driver.visited, ['https://careers.example.com/1', 'https://careers.example.com/2'])
+        self.assertEqual(page_loads['meta'], {'pages': 2, 'bytes': 3072, 'load_ms': 400})
+
+        run_logger = mock.Mock()
+        log_page_load_summary(run_logger, 'meta')
+
+        extra = run_logger.info.call_args.kwargs['extra']
+        self.assertEqual((extra['pages'], extra['bytes_transferred'], extra['average_load_ms']), (2, 3072, 200))
+        self.assertNotIn('meta', page_loads)
+
+    def test_load_page_without_timing_stats(self):
+        self.driver.healthy = False
+
+        load_page(self.driver, 'https://careers.example.com/1', 'meta')
+
+        self.assertEqual(self.driver.visited, ['https://careers.example.com/1'])
+        self.assertNotIn('meta', page_loads)
@@ -1,17 +1,148 @@
+import atexit
 import os
+import json
+import queue
+import threading
 import time
+from collections import defaultdict
+from functools import lru_cache
 
 codeList = ["TR", "US-C", "US", "US-W", "CA", "CA-W", "FR", "DE", "NL", "NO", "RO", "CH", "GB", "HK"]
 import random
 
 from django.conf import settings
+from django.utils import timezone
 
 from webdriver_manager.chrome import ChromeDriverManager
 from webdriver_manager.utils import ChromeType
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.chrome.options import Options
 
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+
+from jobs.waits import wait_for, element_count_stable
+
+
+def get_company_log_file(company_obj, folder, extension):
+    path = os.path.join(settings.RUN_LOGS_DIR, company_obj.name.lower(), folder)
+    os.makedirs(path, exist_ok=True)
+
+    return os.path.join(path, f'{company_obj.name.lower()}_{str(timezone.datetime.today().date())}.{extension}')
+
+
+class JsonlSnapshotWriter:
+    """
+    Writes the daily listing snapshot as append-only JSON lines from a background thread,
+    so the scraping thread never waits on disk.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.rows = queue.Queue()
+        self.thread = threading.Thread(target=self._write_rows, daemon=True)
+        self.thread.start()
+
+    def _write_rows(self):
+        with open(self.file_name, mode='a') as snapshot_file:
+            row = self.rows.get()
+            while row is not None:
+                snapshot_file.write(json.dumps(row) + '\n')
+                row = self.rows.get()
+
+    def write(self, row):
+        self.rows.put(row)
+
+    def close(self):
+        self.rows.put(None)
+        self.thread.join()
+
+
+class ScrapeCheckpoint:
+    """
+    Progress of a company's scrape for the day, saved as compact JSON after every listing page and every
+    ``batch_size`` processed jobs, so a crashed or interrupted run can be resumed with ``--resume``.
+
+    * position: where the listing walk got to, any JSON value the scraper understands (page number, sections done)
+    * processed: job ids whose detail stage is done
+    * pending: rows of the last listing page read that still need their detail stage
+    * failures: listing locations, pages or rows that could not be read, a crawl with any is not complete
+    """
+
+    batch_size = 10
+
+    def __init__(self, company_obj, resume=False):
+        self.file_name = get_company_log_file(company_obj, 'checkpoints', 'json')
+        self.position = None
+        self.listing_done = False
+        self.complete = False
+        self.processed = set()
+        self.pending = []
+        self.unsaved = 0
+        self.failures = 0
+        self.resumed = False
+
+        if resume and os.path.exists(self.file_name):
+            with open(self.file_name) as checkpoint_file:
+                state = json.load(checkpoint_file)
+
+            self.position = state['position']
+            self.listing_done = state['listing_done']
+            self.complete = state['complete']
+            self.processed = set(state['processed'])
+            self.pending = state['pending']
+            self.failures = state.get('failures', 0)
+            self.resumed = True
+
+    def save(self):
+        state = {
+            'position': self.position,
+            'listing_done': self.listing_done,
+            'complete': self.complete,
+            'processed': sorted(self.processed),
+            'pending': self.pending,
+            'failures': self.failures,
+        }
+
+        # Written next to the checkpoint and swapped in, a crash mid write leaves the previous checkpoint intact
+        with open(self.file_name + '.tmp', 'w') as checkpoint_file:
+            json.dump(state, checkpoint_file, separators=(',', ':'))
+
+        os.replace(self.file_name + '.tmp', self.file_name)
+        self.unsaved = 0
+
+    def page_read(self, position, rows, last=False):
+        """Records a fully read listing page and returns its rows that still need the detail stage."""
+        self.position = position
+        self.listing_done = last
+        self.pending = [row for row in rows if row['job_id'] not in self.processed]
+        self.save()
+
+        return list(self.pending)
+
+    def pending_rows(self):
+        # Rows of the page the previous run was working on when it stopped
+        return list(self.pending) if self.resumed else []
+
+    def listing_failed(self):
+        # Saved right away, a resumed run must not forget that an earlier part of the listing was missed
+        self.failures += 1
+        self.save()
+
+    def job_done(self, job_id):
+        self.processed.add(job_id)
+        self.pending = [row for row in self.pending if row['job_id'] != job_id]
+        self.unsaved += 1
+
+        if self.unsaved >= self.batch_size:
+            self.save()
+
+    def finish(self):
+        self.complete = True
+        self.listing_done = True
+        self.pending = []
+        self.save()
 
 
 def connect_to_vpn():
@@ -35,28 +166,154 @@ def disconnect_to_vpn():
     os.system("windscribe disconnect")
 
 
-def get_driver_with_vpn():
+WINDSCRIBE_POPUP_URL = 'chrome-extension://hnmpcagpplmpfojmgmnngilcnanddlhb/popup.html'
+
+
+@lru_cache(maxsize=None)
+def get_chromedriver_path():
+    """
+    Resolves the chromedriver binary once and remembers its path on disk, ChromeDriverManager().install()
+    looks up the latest version over the network on every call.
+    """
+    try:
+        with open(settings.SELENIUM_DRIVER_PATH_CACHE) as cache_file:
+            driver_path = cache_file.read().strip()
+
+        if os.path.exists(driver_path):
+            return driver_path
+    except OSError:
+        pass
+
+    driver_path = ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install()
+
+    os.makedirs(os.path.dirname(settings.SELENIUM_DRIVER_PATH_CACHE), exist_ok=True)
+    with open(settings.SELENIUM_DRIVER_PATH_CACHE, mode='w') as cache_file:
+        cache_file.write(driver_path)
+
+    return driver_path
+
+
+def apply_browser_profile(chrome_options, profile):
+    """
+    We only read text and a few attributes from careers pages, so images, media and unneeded Chrome
+    features are switched off. See SELENIUM_BROWSER_PROFILE in settings.
+    """
+    prefs = {}
+
+    if profile['block_images']:
+        prefs['profile.managed_default_content_settings.images'] = 2
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+
+    if profile['block_media']:
+        prefs['profile.managed_default_content_settings.media_stream'] = 2
+        chrome_options.add_argument('--autoplay-policy=user-gesture-required')
+        chrome_options.add_argument('--mute-audio')
+
+    chrome_options.add_experimental_option('prefs', prefs)
+
+    if profile['disabled_features']:
+        chrome_options.add_argument(f"--disable-features={','.join(profile['disabled_features'])}")
+
+    for argument in profile['extra_arguments']:
+        chrome_options.add_argument(argument)
+
+
+def block_urls(driver, profile):
+    # Fonts, media files and third party trackers, matched by Chrome's URL patterns
+    if profile['blocked_urls']:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': profile['blocked_urls']})
+
+
+# site -> totals of the pages loaded since the site's last summary, see log_page_load_summary
+page_loads = defaultdict(lambda: {'pages': 0, 'bytes': 0, 'load_ms': 0})
+
+PAGE_LOAD_STATS_SCRIPT = """
+const navigation = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+return [
+    (navigation ? navigation.transferSize : 0) + resources.reduce((total, entry) => total + entry.transferSize, 0),
+    navigation ? navigation.loadEventEnd - navigation.startTime : 0,
+];
+"""
+
+
+def load_page(driver, url, site):
+    """
+    driver.get plus a record of the bytes the page pulled and its load time. Cross-origin resources without
+    Timing-Allow-Origin report a transfer size of 0, so the byte count is a lower bound.
+    """
+    driver.get(url)
+
+    try:
+        transferred, load_time = driver.execute_script(PAGE_LOAD_STATS_SCRIPT)
+        loads = page_loads[site]
+        loads['pages'] += 1
+        loads['bytes'] += transferred
+        loads['load_ms'] += load_time
+    except WebDriverException:
+        pass
+
+
+def log_page_load_summary(run_logger, site):
+    """Logs the pages loaded on ``site`` since its last summary and starts its totals over."""
+    loads = page_loads.pop(site, None)
+
+    if not loads:
+        return
+
+    average = loads['load_ms'] / loads['pages']
+    run_logger.info(f"Loaded {loads['pages']} pages on {site}: {loads['bytes'] / 1024 / 1024:.1f}MB transferred, "
+                    f"{average:.0f}ms average load time",
+                    extra={'event': 'page_load_summary', 'site': site, 'pages': loads['pages'],
+                           'bytes_transferred': loads['bytes'], 'average_load_ms': round(average)})
+
+
+def create_driver(profile_dir):
     chrome_options = Options()
-    # chrome_options.add_argument("--headless")
+
+    if settings.SELENIUM_HEADLESS:
+        # The new headless mode still runs extensions, the old one does not
+        chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--window-size=1920,1080")
     # chrome_options.add_argument("--no-sandbox")
     # chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_extension('windscribe.crx')
+
+    # Persistent profile, the Windscribe extension stays logged in between runs
+    chrome_options.add_argument(f'--user-data-dir={profile_dir}')
+    chrome_options.add_extension(os.path.join(settings.BASE_DIR, 'windscribe.crx'))
     chrome_options.add_argument('--dns-prefetch-disable')
     chrome_options.add_argument("enable-features=NetworkServiceInProcess")
-    driver = webdriver.Chrome(ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install(), options=chrome_options)
-    driver.maximize_window()
+    apply_browser_profile(chrome_options, settings.SELENIUM_BROWSER_PROFILE)
+    driver = webdriver.Chrome(get_chromedriver_path(), options=chrome_options)
+
+    if not settings.SELENIUM_HEADLESS:
+        driver.maximize_window()
+
+    block_urls(driver, settings.SELENIUM_BROWSER_PROFILE)
+    login_to_windscribe(driver)
+    return driver
+
 
+def login_to_windscribe(driver):
     cond_ext = True
     while cond_ext:
         try:
-            time.sleep(5)
-            driver.get('chrome-extension://hnmpcagpplmpfojmgmnngilcnanddlhb/popup.html')
+            driver.get(WINDSCRIBE_POPUP_URL)
             cond_ext = False
         except:
             print('Blocked Extension by Chromium')
+            # The extension is still being installed, give it a moment before asking again
+            time.sleep(1)
 
-    time.sleep(5)
+    wait_for(driver, element_count_stable(By.XPATH, '//*[@id="app-frame"]//button', site='windscribe'),
+             site='windscribe', description='extension popup')
     body = driver.find_elements(By.TAG_NAME, 'body')
+
+    if 'Login' not in body[0].text:
+        print('Already Logged in WindScribe')
+        return
+
     login = body[0].find_element(By.XPATH, '//*[@id="app-frame"]/div/button[2]')
     login.click()
 
@@ -69,11 +326,9 @@ def get_driver_with_vpn():
             username = body[0].find_element(By.XPATH, '//*[@id="app-frame"]/div/div/form/div[1]/div[2]/input')
             username.clear()
             username.send_keys(settings.WINDSCRIBE_USERNAME)
-            time.sleep(2)
             password = body[0].find_element(By.XPATH, '//*[@id="app-frame"]/div/div/form/div[2]/div[2]/input')
             password.clear()
             password.send_keys(settings.WINDSCRIBE_PASSWORD)
-            time.sleep(2)
             final_login = body[0].find_element(By.XPATH, '//*[@id="app-frame"]/div/div/form/div[3]/button')
             final_login.click()
         except:
@@ -81,12 +336,11 @@ def get_driver_with_vpn():
             if retry_login_cond > 50:
                 print('Something is Wrong')
                 exit()
-            driver.get('chrome-extension://hnmpcagpplmpfojmgmnngilcnanddlhb/popup.html')
+            driver.get(WINDSCRIBE_POPUP_URL)
         try:
-
-            skip = driver.find_elements(By.TAG_NAME, 'body')
-            time.sleep(3)
-            if 'Login' in skip[0].text:
+            logged_in = wait_for(driver, lambda d: 'Login' not in d.find_element(By.TAG_NAME, 'body').text,
+                                 site='windscribe', description='login')
+            if not logged_in:
                 cond = True
             else:
                 cond = False
@@ -94,19 +348,101 @@ def get_driver_with_vpn():
 
         except Exception as e:
             print('Failed to Login in WindScribe Trying Again')
-    return driver
+
+
+def is_driver_healthy(driver):
+    try:
+        driver.execute_script('return document.readyState')
+        return len(driver.window_handles) > 0
+    except WebDriverException:
+        return False
+
+
+class DriverPool:
+    """
+    Small pool of logged-in drivers made by ``factory`` (create_driver), called with the slot's profile directory.
+    Every slot has its own persistent profile directory since two running browsers can't share one. Drivers are
+    health checked when handed out and replaced if dead.
+    """
+
+    def __init__(self, size, factory=None):
+        self.slots = queue.LifoQueue()  # LIFO so the most recently used, warm driver is handed out first
+        self.in_use = {}
+        self.drivers = {}
+        self.factory = factory or create_driver
+
+        for slot in range(size):
+            self.slots.put((slot, None))
+
+    def acquire(self):
+        slot, driver = self.slots.get()
+
+        if driver is not None and not is_driver_healthy(driver):
+            print(f'Driver in slot {slot} is not responding, starting a new one')
+            self.quit_driver(driver)
+            driver = None
+
+        try:
+            if driver is None:
+                driver = self.factory(os.path.join(settings.SELENIUM_PROFILES_DIR, str(slot)))
+        except:
+            self.slots.put((slot, None))
+            raise
+
+        self.in_use[id(driver)] = slot
+        self.drivers[id(driver)] = driver
+        return driver
+
+    def release(self, driver):
+        slot = self.in_use.pop(id(driver))
+        self.drivers.pop(id(driver))
+        self.slots.put((slot, driver))
+
+    def release_all(self):
+        # Hands back drivers a failed scraper never released, they are health checked on the next acquire
+        for driver_id in list(self.in_use):
+            slot = self.in_use.pop(driver_id)
+            self.slots.put((slot, self.drivers.pop(driver_id)))
+
+    def close(self):
+        while not self.slots.empty():
+            slot, driver = self.slots.get_nowait()
+            if driver is not None:
+                self.quit_driver(driver)
+
+    @staticmethod
+    def quit_driver(driver):
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
+driver_pool = DriverPool(settings.SELENIUM_POOL_SIZE)
+atexit.register(driver_pool.close)
+
+
+def get_driver_with_vpn():
+    return driver_pool.acquire()
+
+
+def release_driver(driver):
+    driver_pool.release(driver)
 
 
 def change_vpn_location(driver):
-    driver.get('chrome-extension://hnmpcagpplmpfojmgmnngilcnanddlhb/popup.html')
-    time.sleep(3)
+    driver.get(WINDSCRIBE_POPUP_URL)
+    wait_for(driver, EC.element_to_be_clickable((By.XPATH, '//*[@id="app-frame"]/div/div[4]/div[1]/div[1]/div[1]/div/div['
+                                                           '2]/button/div/div[1]')),
+             site='windscribe', description='location button')
 
     body = driver.find_elements(By.TAG_NAME, 'body')
     location_button = body[0].find_element(By.XPATH,
                                            '//*[@id="app-frame"]/div/div[4]/div[1]/div[1]/div[1]/div/div['
                                            '2]/button/div/div[1]')
     location_button.click()
-    time.sleep(2)
+    wait_for(driver, element_count_stable(By.XPATH, '//*[@id="app-frame"]/div/div[2]/div/div/div', site='windscribe'),
+             site='windscribe', description='region list')
 
     len_of_regions = 1
 
@@ -143,7 +479,9 @@ def change_vpn_location(driver):
     random_index_location = random.randint(1, location_count)
     print(location_count, random_index_location)
 
-    time.sleep(2)
+    wait_for(driver, EC.element_to_be_clickable(
+        (By.XPATH, f'//*[@id="app-frame"]/div/div[2]/div/div/div[{random_index_region}]/div[2]/div[{random_index_location}]')),
+             site='windscribe', description='location entry')
 
     selected_location = body[0].find_element(By.XPATH,
                                              f'//*[@id="app-frame"]/div/div[2]/div/div/div[{random_index_region}]/div[2]/div[{random_index_location}]')
@@ -0,0 +1,129 @@
+import time
+from collections import defaultdict
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from talent_bridge_cron.run_logging import get_run_logger
+
+# timeout: give up after this many seconds, poll: seconds between checks,
+# settle: seconds a page must stay unchanged to count as stable
+SITE_WAIT_DEFAULTS = {
+    'default': {'timeout': 10, 'poll': 0.25, 'settle': 0.75},
+    'windscribe': {'timeout': 15, 'poll': 0.25, 'settle': 0.5},
+    'browserstack': {'timeout': 10, 'poll': 0.2, 'settle': 0.5},
+    'meta': {'timeout': 20, 'poll': 0.25, 'settle': 1.0},
+    'walmart_global_tech_india': {'timeout': 15, 'poll': 0.25, 'settle': 1.0},
+    'availability': {'timeout': 8, 'poll': 0.2, 'settle': 0.5},
+}
+
+# (site, description) -> totals of the waits since the site's last summary, see log_wait_summary
+wait_timings = defaultdict(lambda: {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+
+
+def get_site_defaults(site):
+    return SITE_WAIT_DEFAULTS.get(site, SITE_WAIT_DEFAULTS['default'])
+
+
+def wait_for(driver, condition, site='default', description='', timeout=None):
+    """
+    Blocks until ``condition(driver)`` is truthy and returns its value, or returns False on timeout.
+    Every wait is timed so slow pages and bad defaults show up in the run logs.
+    """
+    defaults = get_site_defaults(site)
+    timeout = timeout if timeout is not None else defaults['timeout']
+
+    started = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=defaults['poll']).until(condition)
+        timed_out = False
+    except TimeoutException:
+        result = False
+        timed_out = True
+
+    elapsed = time.monotonic() - started
+    timings = wait_timings[(site, description)]
+    timings['count'] += 1
+    timings['total'] += elapsed
+    timings['max'] = max(timings['max'], elapsed)
+    timings['timeouts'] += timed_out
+    get_run_logger('selenium_waits').debug(f"Waited {elapsed:.2f}s for {description} on {site}",
+                                           extra={'event': 'wait', 'site': site, 'description': description,
+                                                  'elapsed': round(elapsed, 3), 'timed_out': timed_out})
+    return result
+
+
+def log_wait_summary(run_logger, site):
+    """Logs the waits on ``site`` since its last summary and starts its totals over."""
+    for wait_site, description in [key for key in wait_timings if key[0] == site]:
+        timings = wait_timings.pop((wait_site, description))
+        average = timings['total'] / timings['count']
+
+        run_logger.info(f"Waits for {description} on {site}: {timings['count']} waits, "
+                        f"{average:.2f}s average, {timings['max']:.2f}s max",
+                        extra={'event': 'wait_summary', 'site': site, 'description': description,
+                               'count': timings['count'], 'total': round(timings['total'], 3),
+                               'average': round(average, 3), 'max': round(timings['max'], 3),
+                               'timeouts': timings['timeouts']})
+
+
+def url_reached(url):
+    return EC.url_to_be(url)
+
+
+class element_count_stable:
+    """
+    Satisfied once at least ``min_count`` elements match and the count has not changed for ``settle``
+    seconds, the point where a client rendered list has finished filling in. Returns the elements.
+    """
+
+    def __init__(self, by, locator, min_count=1, settle=None, site='default'):
+        self.by = by
+        self.locator = locator
+        self.min_count = min_count
+        self.settle = settle if settle is not None else get_site_defaults(site)['settle']
+        self.last_count = None
+        self.changed_at = None
+
+    def __call__(self, driver):
+        elements = driver.find_elements(self.by, self.locator)
+        now = time.monotonic()
+
+        if len(elements) != self.last_count:
+            self.last_count = len(elements)
+            self.changed_at = now
+            return False
+
+        if len(elements) >= self.min_count and now - self.changed_at >= self.settle:
+            return elements
+
+        return False
+
+
+class network_idle:
+    """
+    Satisfied once the document has loaded and no new resource request has started for ``settle`` seconds,
+    based on the Resource Timing entries of the page.
+    """
+
+    def __init__(self, settle=None, site='default'):
+        self.settle = settle if settle is not None else get_site_defaults(site)['settle']
+        self.last_count = None
+        self.changed_at = None
+
+    def __call__(self, driver):
+        try:
+            ready_state, resource_count = driver.execute_script(
+                "return [document.readyState, performance.getEntriesByType('resource').length]")
+        except WebDriverException:
+            return False
+
+        now = time.monotonic()
+
+        if ready_state != 'complete' or resource_count != self.last_count:
+            self.last_count = resource_count
+            self.changed_at = now
+            return False
+
+        return now - self.changed_at >= self.settle
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class LocationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'locations'
+
+    def ready(self):
+        from talent_bridge_cron.cache import connect_invalidation
+
+        connect_invalidation(self.get_model('Locations'))
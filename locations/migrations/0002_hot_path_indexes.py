@@ -0,0 +1,29 @@
+# Generated by Django 4.1.2 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='locations',
+            index=models.Index(fields=['state'], name='locations_l_state_566812_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locations',
+            index=models.Index(fields=['country'], name='locations_l_country_ae8f38_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locations',
+            index=models.Index(fields=['country_code_iso2'], name='locations_l_country_f220a3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locations',
+            index=models.Index(fields=['country_code_iso3'], name='locations_l_country_3958ef_idx'),
+        ),
+    ]
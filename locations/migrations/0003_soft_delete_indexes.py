@@ -0,0 +1,45 @@
+# Generated by Django 4.1.2 on 2026-10-19 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0002_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='locations',
+            name='locations_l_state_566812_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='locations',
+            name='locations_l_country_ae8f38_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='locations',
+            name='locations_l_country_f220a3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='locations',
+            name='locations_l_country_3958ef_idx',
+        ),
+        migrations.AddIndex(
+            model_name='locations',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['state'], name='locations_live_state_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locations',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['country'], name='locations_live_country_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locations',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['country_code_iso2'], name='locations_live_iso2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='locations',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['country_code_iso3'], name='locations_live_iso3_idx'),
+        ),
+    ]
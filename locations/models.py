@@ -15,4 +15,12 @@ class Locations(AbstractBaseModel):
         unique_together = ('city', 'country', 'state')
         indexes = [
             models.Index(fields=['city', 'country', 'state']),  # Adding an index for frequent lookups
+            # process_locations matches each part of a location string against every column on its own,
+            # city lookups are served by the index above. Only live rows, like the default manager
+            models.Index(fields=['state'], condition=models.Q(is_deleted=False), name='locations_live_state_idx'),
+            models.Index(fields=['country'], condition=models.Q(is_deleted=False), name='locations_live_country_idx'),
+            models.Index(fields=['country_code_iso2'], condition=models.Q(is_deleted=False),
+                         name='locations_live_iso2_idx'),
+            models.Index(fields=['country_code_iso3'], condition=models.Q(is_deleted=False),
+                         name='locations_live_iso3_idx'),
         ]
\ No newline at end of file
@@ -2,12 +2,13 @@
 import logging
 from scrapy import signals
 from scrapy.exceptions import NotConfigured
+from django.conf import settings
 from django.utils import timezone
-from django.core.files.base import ContentFile
-from scrapy_manager.models import ScrapyJob
-from django.db import transaction
+from scrapy_manager.models import CrawlStats, ScrapyJob
+from scraper.pipelines import STATS_PREFIX
+from scrapy_manager.tasks import dispatch_spider_runs, upload_crawl_log
+from talent_bridge_cron.run_logging import flush_run_logging
 from asgiref.sync import sync_to_async
-import os
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +20,22 @@ class SaveCrawlStatsExtension:
 
         ext = cls()
         crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
         return ext
 
+    def __init__(self):
+        self.latency_total = 0
+        self.latency_count = 0
+        self.latency_max = None
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get('download_latency')
+
+        if latency is not None:
+            self.latency_total += latency
+            self.latency_count += 1
+            self.latency_max = max(self.latency_max or 0, latency)
+
     async def spider_closed(self, spider):
         try:
             await sync_to_async(self.update_job)(spider)
@@ -34,29 +49,55 @@ class SaveCrawlStatsExtension:
             log_file = spider.settings.get('LOG_FILE')
 
             if job_id:
-                try:
-                    with open(log_file, 'r', encoding='utf-8') as new_log_file:
-                        log_content = new_log_file.read()
-                except Exception as e:
-                    logger.error(f"Failed to read log file: {e}")
-                    return
-
-                with transaction.atomic():
-                    job = ScrapyJob.objects.get(job_id=job_id)
-                    
-                    # Save log content to a file field in Django model
-                    log_content_encoded = log_content.encode('utf-8')  # Ensure encoding is handled
-                    job.log_file.save(f'{spider.name}_{timezone.now().strftime("%Y%m%d_%H%M%S")}_{job_id}.log', ContentFile(log_content_encoded))
-                    job.end_time = timezone.now()  # Update end time
-                    job.status = 'finished' if spider.crawler.stats.get_value('finish_reason') == 'finished' else 'failed'
-                    job.save()
-                    logger.info(f"Updated ScrapyJob Object {spider.crawler.stats.get_value('finish_reason')}")
-                
-                logger.info(f"Updated ScrapyJob Object Now its time to delete local log file {log_file}")
-                os.remove(str(log_file))
+                # Records still queued for the log file listener have to hit the disk before it is uploaded
+                flush_run_logging()
+
+                finish_reason = spider.crawler.stats.get_value('finish_reason')
+                ScrapyJob.objects.filter(job_id=job_id).update(
+                    end_time=timezone.now(),
+                    status='finished' if finish_reason == 'finished' else 'failed',
+                    modified=timezone.now(),
+                )
+                logger.info(f"Updated ScrapyJob Object {finish_reason}")
+
+                # This run's slot is free, start the next queued one
+                dispatch_spider_runs.delay()
+
+                self.save_stats(job_id, spider.crawler.stats.get_stats())
+
+                # Compressing and uploading a large log is left to a worker so the spider closes right away. The
+                # process still logs its shutdown, the worker waits for it to exit and removes the log once stored
+                if log_file:
+                    name = f'{spider.name}_{timezone.now().strftime("%Y%m%d_%H%M%S")}_{job_id}.log'
+                    upload_crawl_log.apply_async((job_id, str(log_file), name),
+                                                 countdown=settings.CRAWL_LOG_WAIT_SECONDS)
+                    logger.info(f"Queued upload of log file {log_file}")
 
             else:
                 logger.info(f"Not Updated ScrapyJob Object Since job_id is not present, may be this spider is started manually.")
             
         except Exception as e:
-            logger.error(f"Error updating ScrapyJob Object : {e} for {job_id}")
\ No newline at end of file
+            logger.error(f"Error updating ScrapyJob Object : {e} for {job_id}")
+
+    def save_stats(self, job_id, stats):
+        job = ScrapyJob.objects.filter(job_id=job_id).first()
+
+        if job is None:
+            return
+
+        CrawlStats.objects.update_or_create(job=job, defaults={
+            'stats': stats,
+            'finish_reason': stats.get('finish_reason') or '',
+            'elapsed_seconds': stats.get('elapsed_time_seconds'),
+            'request_count': stats.get('downloader/request_count', 0),
+            'response_count': stats.get('downloader/response_count', 0),
+            'response_bytes': stats.get('downloader/response_bytes', 0),
+            'item_scraped_count': stats.get('item_scraped_count', 0),
+            'item_dropped_count': sum(value for key, value in stats.items()
+                                      if key.startswith(f'{STATS_PREFIX}/items_dropped/')),
+            'avg_latency_seconds': self.latency_total / self.latency_count if self.latency_count else None,
+            'max_latency_seconds': self.latency_max,
+            'db_write_seconds': stats.get(f'{STATS_PREFIX}/db_write_seconds', 0),
+            'location_seconds': stats.get(f'{STATS_PREFIX}/location_seconds', 0),
+        })
+        logger.info(f"Saved crawl stats of {job_id}")
@@ -2,12 +2,17 @@ import logging
 from unidecode import unidecode
 from asgiref.sync import sync_to_async
 from django.db import transaction
-from django.db.models import Q
-from companies.models import Company
 from locations.models import Locations
+from jobs.archive import job_seen
 from jobs.models import Jobs, JobLocation
+from jobs.stats import record_new_jobs
+from talent_bridge_cron.cache import cache_metrics, find_location, get_company, get_country_for_code, get_location_values
 from scrapy.exceptions import IgnoreRequest
 import asyncio 
+import time
+
+# Our own timings and drop reasons, added to the crawler stats and saved with them in CrawlStats
+STATS_PREFIX = 'talent_bridge'
 
 class JobsPipeline:
 
@@ -25,9 +30,16 @@ class JobsPipeline:
         return item
 
     async def write_item(self, item, spider):
+        stats = spider.crawler.stats
+        started = time.monotonic()
+
         try:
-            await write_item_to_db(item, self.logger)
+            await write_item_to_db(item, self.logger, stats)
+        except IgnoreRequest as e:
+            stats.inc_value(f'{STATS_PREFIX}/items_dropped/location_not_found')
+            self.logger.warning("Dropped item: %s", e)
         finally:
+            stats.inc_value(f'{STATS_PREFIX}/db_write_seconds', time.monotonic() - started)
             spider.progress_bar.update(1)  # Ensure progress bar updates regardless of success or failure
             self.log_progress(spider)
             
@@ -37,32 +49,37 @@ class JobsPipeline:
 
     def close_spider(self, spider):
         self.logger.info("Pipeline closing for spider: %s", spider.name)
+        self.logger.info("Reference cache: %s", cache_metrics())
 
 @sync_to_async
 @transaction.atomic
-def write_item_to_db(item, logger):
+def write_item_to_db(item, logger, stats):
     logger.info("Processing item with job id %s", item['locations'])
 
-    # Check if the job already exists
-    if not Jobs.objects.filter(company__name=item['company'], job_id=item['job_id']).exists():
+    # Check if the job already exists, soft deleted and archived jobs included so they are not scraped back in
+    if not job_seen(company__name=item['company'], job_id=item['job_id']):
         logger.info(f"JOB url: {item['job_url']}")
         logger.info(f"JOB locations: {item['locations']}")
 
+        started = time.monotonic()
         locations_objects_array = process_locations(item['locations'], logger,item['job_url'])
+        stats.inc_value(f'{STATS_PREFIX}/location_seconds', time.monotonic() - started)
         
         logger.info(f"==============Locations are processed successfully {locations_objects_array}=============")
 
         any_remote = any(obj['remote'] for obj in locations_objects_array)
         any_non_remote = any(not obj['remote'] for obj in locations_objects_array)
 
-        try:
-            # Retrieve the company object
-            company = Company.objects.get(name=item['company'])
-            logger.info(f"Company {item['company']} found")
-        except Company.DoesNotExist:
+        # Retrieve the company object
+        company = get_company(item['company'])
+
+        if company is None:
             logger.error("Company %s does not exist, cannot process job %s", item['company'], item['job_id'])
+            stats.inc_value(f'{STATS_PREFIX}/items_dropped/company_missing')
             return
 
+        logger.info(f"Company {item['company']} found")
+
         # Ensure category and sub_category have values
         category = item.get('category', '') or ''
         sub_category = item.get('sub_category', '') or ''
@@ -100,8 +117,10 @@ def write_item_to_db(item, logger):
             )
 
         logger.info("Updated Locations for job id %s", job_instance.job_id)
+        record_new_jobs([job_instance.id])
     else:
         logger.info("Job with job id %s already exists", item['job_id'])
+        stats.inc_value(f'{STATS_PREFIX}/items_dropped/job_exists')
 
 def process_locations(locations, logger, job_url):
     logger.info(f"Processing locations {locations}")
@@ -110,15 +129,15 @@ def process_locations(locations, logger, job_url):
     logger.info("Calling For loop")
     for loc in locations:
         try:
-            logger.info("checkpoint 1")
+            logger.debug("checkpoint 1")
             loc_element = loc['location']
             loc_remote = loc['remote']    
-            logger.info("checkpoint 2")
+            logger.debug("checkpoint 2")
             loc_dict = {
                 'location_object': None,
                 'remote': loc_remote,
             }
-            logger.info("checkpoint 3")
+            logger.debug("checkpoint 3")
             parts = [unidecode(part) for part in loc_element.split(', ')]
             logger.debug(f"Processing parts: {parts}")
 
@@ -129,24 +148,24 @@ def process_locations(locations, logger, job_url):
             for part in parts:
                 logger.debug(f"Processing part: {part}")
                 # Check if this part matches a city
-                if not city and Locations.objects.filter(city=part).exists():
+                if not city and part in get_location_values('city'):
                     city = part
                     logger.info(f"Matched as city: {city}")
                 # Check if this part matches a state
-                elif not state and Locations.objects.filter(state=part).exists():
+                elif not state and part in get_location_values('state'):
                     state = part
                     logger.info(f"Matched as state: {state}")
                 # Check if this part matches a country
-                elif not country and Locations.objects.filter(country=part).exists():
+                elif not country and part in get_location_values('country'):
                     country = part
                     logger.info(f"Matched as country: {country}")
 
                 # Check if this part matches an ISO code (iso2 or iso3)
-                elif not country and Locations.objects.filter(country_code_iso2=part).exists():
-                    country = Locations.objects.filter(country_code_iso2=part).first().country
+                elif not country and part in get_location_values('country_code_iso2'):
+                    country = get_country_for_code(part)
                     logger.info(f"Matched as ISO2 country: {country}")
-                elif not country and Locations.objects.filter(country_code_iso3=part).exists():
-                    country = Locations.objects.filter(country_code_iso3=part).first().country
+                elif not country and part in get_location_values('country_code_iso3'):
+                    country = get_country_for_code(part)
                     logger.info(f"Matched as ISO3 country: {country}")
             
             logger.info(f"Final location: city={city}, state={state}, country={country}")
@@ -179,17 +198,6 @@ def process_locations(locations, logger, job_url):
 
     return locations_objects_array
 
-def find_location(city=None, state=None, country=None):
-    filters = Q()
-    if city:
-        filters &= Q(city=city)
-    if state:
-        filters &= Q(state=state)
-    if country:
-        filters &= Q(country=country)
-
-    return Locations.objects.filter(filters).first()
-
 def save_unknown_location(city, country_or_state, logger):
     logger.warning(f"Unknown location: city={city}, state/country={country_or_state}")
 
@@ -124,7 +124,7 @@ AUTOTHROTTLE_ENABLED = True
 AUTOTHROTTLE_START_DELAY = 15  # Initial delay (in seconds) before making the next request
 AUTOTHROTTLE_MAX_DELAY = 300  # Maximum delay (in seconds) in case of high latencies
 AUTOTHROTTLE_TARGET_CONCURRENCY = 4.0  # Average number of requests to send in parallel
-AUTOTHROTTLE_DEBUG = True  # Enable for debugging
+AUTOTHROTTLE_DEBUG = False  # Logs every response at INFO, only enable while debugging throttling
 
 DOWNLOAD_DELAY = random.uniform(30, 80)  # Random delay between requests
 
@@ -138,6 +138,7 @@ HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
 LOG_ENABLED = True
 LOG_LEVEL = 'DEBUG'
 LOG_FILE = None  # Disable Scrapy's default log file creation
+LOG_DEBUG_SAMPLE_RATE = settings.RUN_LOG_DEBUG_SAMPLE_RATE  # Per-request DEBUG records are sampled, see talent_bridge_cron.run_logging
 
 # settings.py
 EXTENSIONS = {
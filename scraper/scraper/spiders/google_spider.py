@@ -6,10 +6,15 @@ from datetime import datetime
 import boto3
 from scrapy.utils.project import get_project_settings
 from scrapy import signals
+from scrapy.utils.defer import deferred_from_coro
 import re
-from jobs.models import Jobs, JobLocation
+from jobs.archive import job_seen
+from jobs.models import JobLocation
+from talent_bridge_cron.cache import get_company
+from jobs.listing_diff import record_crawl
 from asgiref.sync import sync_to_async
 from tqdm import tqdm
+from talent_bridge_cron.run_logging import configure_spider_logging
 
 class GoogleJobsSpider(scrapy.Spider):
     name = 'google_spider'
@@ -28,6 +33,9 @@ class GoogleJobsSpider(scrapy.Spider):
         self.logger.info(f"self.job_id: {self.job_id}")
         self.company_name = "Google"  # Set the company name here
 
+        # Every job id listed during the crawl, recorded when the spider closes
+        self.seen_job_ids = set()
+
         # Progress bar initialization
         self.progress_bar = tqdm(total=0, desc='Processing Jobs', unit='job')
 
@@ -39,38 +47,31 @@ class GoogleJobsSpider(scrapy.Spider):
         # Access settings through the crawler instance
         log_file = crawler.settings.get('LOG_FILE')
         log_level = crawler.settings.get('LOG_LEVEL')
+        sample_rate = crawler.settings.getfloat('LOG_DEBUG_SAMPLE_RATE', 1.0)
 
         # Set up logging
-        spider.setup_logging(log_file, log_level)
+        spider.setup_logging(log_file, log_level, sample_rate)
         
         crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
         return spider
 
-    def setup_logging(self, log_file, log_level):
-        logger = logging.getLogger()
-        logger.setLevel(log_level)
-
-        # File handler for logging to a file
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(log_level)
-        file_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+    def setup_logging(self, log_file, log_level, sample_rate):
+        # File and console handlers run behind a queue, so logging never blocks the reactor
+        configure_spider_logging(log_file, log_level, sample_rate)
 
-        # Console handler for logging to the console
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(log_level)
-        console_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+    def spider_closed(self, spider, reason):
+        # Close the progress bar
+        self.progress_bar.close()
 
-        # Clear existing handlers, if any
-        if logger.hasHandlers():
-            logger.handlers.clear()
+        # The ORM can't be used from the reactor's event loop, the snapshot is saved from a worker thread
+        return deferred_from_coro(sync_to_async(self.save_crawl_snapshot)(reason))
 
-        # Add handlers to the logger
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+    def save_crawl_snapshot(self, reason):
+        company = get_company(self.company_name)
 
-    def spider_closed(self, spider):
-        # Close the progress bar
-        self.progress_bar.close()
+        if company:
+            # Only a crawl that ran out of pages saw every open job, not one closed by an error or shutdown
+            record_crawl(company, self.seen_job_ids, complete=reason == 'finished', source=self.name)
 
     async def parse(self, response):
         self.logger.info("Parsing jobs list from %s", response.url)
@@ -85,9 +86,10 @@ class GoogleJobsSpider(scrapy.Spider):
 
             self.logger.info("Found job link: %s", full_link)
             self.logger.info("Found job id: %s", job_id)
+            self.seen_job_ids.add(job_id)
 
             # Check if the job is already in the database asynchronously
-            job_exists = await sync_to_async(Jobs.objects.filter(job_id=job_id).exists)()
+            job_exists = await sync_to_async(job_seen)(job_id=job_id)
 
             if not job_exists:
                 self.logger.info("New job found, scraping: %s", full_link)
@@ -6,6 +6,7 @@ import boto3
 from scrapy.utils.project import get_project_settings
 from scrapy import signals
 from tqdm import tqdm
+from talent_bridge_cron.run_logging import configure_spider_logging
 
 class ProgressBarSpider(scrapy.Spider):
     name = 'progress_bar_spider'
@@ -53,34 +54,17 @@ class ProgressBarSpider(scrapy.Spider):
         # Access settings through the crawler instance
         log_file = crawler.settings.get('LOG_FILE')
         log_level = crawler.settings.get('LOG_LEVEL')
+        sample_rate = crawler.settings.getfloat('LOG_DEBUG_SAMPLE_RATE', 1.0)
 
         # Set up logging
-        spider.setup_logging(log_file, log_level)
+        spider.setup_logging(log_file, log_level, sample_rate)
         
         crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
         return spider
 
-    def setup_logging(self, log_file, log_level):
-        logger = logging.getLogger()
-        logger.setLevel(log_level)
-
-        # File handler for logging to a file
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(log_level)
-        file_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
-
-        # Console handler for logging to the console
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(log_level)
-        console_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
-
-        # Clear existing handlers, if any
-        if logger.hasHandlers():
-            logger.handlers.clear()
-
-        # Add handlers to the logger
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+    def setup_logging(self, log_file, log_level, sample_rate):
+        # File and console handlers run behind a queue, so logging never blocks the reactor
+        configure_spider_logging(log_file, log_level, sample_rate)
 
     def spider_closed(self, spider):
         # Close the progress bar
@@ -0,0 +1,175 @@
+import json
+from datetime import datetime
+
+import scrapy
+from asgiref.sync import sync_to_async
+from scrapy import signals
+from scrapy.http import JsonRequest
+from scrapy.utils.defer import deferred_from_coro
+from tqdm import tqdm
+
+from jobs.archive import job_seen
+from jobs.listing_diff import record_crawl
+from talent_bridge_cron.cache import get_company
+from talent_bridge_cron.run_logging import configure_spider_logging
+
+
+class WorkableJobsSpider(scrapy.Spider):
+    """
+    Crawls companies whose careers board is hosted on Workable through the board's own JSON API, the same data
+    the apply.workable.com pages render from, so no browser is needed.
+
+        scrapy crawl workable_spider -a company=BrowserStack
+    """
+    name = 'workable_spider'
+    allowed_domains = ['apply.workable.com']
+
+    # Company name as in the companies table -> Workable account slug
+    accounts = {
+        'BrowserStack': 'browserstack-2',
+    }
+
+    list_url = 'https://apply.workable.com/api/v3/accounts/{account}/jobs'
+    detail_url = 'https://apply.workable.com/api/v2/accounts/{account}/jobs/{shortcode}'
+    job_url = 'https://apply.workable.com/{account}/j/{shortcode}'
+
+    # Custom settings specific to this spider
+    custom_settings = {
+        "LOG_FILE": f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log",
+        # A single JSON host, the project wide 30-80 second delay is meant for the HTML sites
+        "DOWNLOAD_DELAY": 0.25,
+        "AUTOTHROTTLE_START_DELAY": 1,
+        "AUTOTHROTTLE_MAX_DELAY": 30,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 8.0,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+        "HTTPCACHE_ENABLED": False,
+    }
+
+    def __init__(self, job_id=None, company='BrowserStack', *args, **kwargs):
+        super(WorkableJobsSpider, self).__init__(*args, **kwargs)
+        self.job_id = job_id  # Set the job ID here
+        self.logger.info(f"self.job_id: {self.job_id}")
+        self.company_name = company
+        self.account = self.accounts[company]
+
+        # Every job id listed during the crawl, recorded when the spider closes
+        self.seen_job_ids = set()
+
+        # Progress bar initialization
+        self.progress_bar = tqdm(total=0, desc='Processing Jobs', unit='job')
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super(WorkableJobsSpider, cls).from_crawler(crawler, *args, **kwargs)
+
+        # Access settings through the crawler instance
+        log_file = crawler.settings.get('LOG_FILE')
+        log_level = crawler.settings.get('LOG_LEVEL')
+        sample_rate = crawler.settings.getfloat('LOG_DEBUG_SAMPLE_RATE', 1.0)
+
+        # Set up logging
+        spider.setup_logging(log_file, log_level, sample_rate)
+
+        crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
+        return spider
+
+    def setup_logging(self, log_file, log_level, sample_rate):
+        # File and console handlers run behind a queue, so logging never blocks the reactor
+        configure_spider_logging(log_file, log_level, sample_rate)
+
+    def spider_closed(self, spider, reason):
+        # Close the progress bar
+        self.progress_bar.close()
+
+        # The ORM can't be used from the reactor's event loop, the snapshot is saved from a worker thread
+        return deferred_from_coro(sync_to_async(self.save_crawl_snapshot)(reason))
+
+    def save_crawl_snapshot(self, reason):
+        company = get_company(self.company_name)
+
+        if company:
+            # Only a crawl that ran out of pages saw every open job, not one closed by an error or shutdown
+            record_crawl(company, self.seen_job_ids, complete=reason == 'finished', source=self.name)
+
+    def start_requests(self):
+        yield self.list_request()
+
+    def list_request(self, token=None):
+        data = {'query': '', 'location': [], 'department': [], 'worktype': [], 'remote': []}
+
+        if token:
+            data['token'] = token
+
+        return JsonRequest(self.list_url.format(account=self.account), data=data, callback=self.parse,
+                           dont_filter=True)
+
+    async def parse(self, response):
+        listing = json.loads(response.text)
+        self.logger.info("Parsing %s of %s jobs from %s", len(listing['results']), listing.get('total'), response.url)
+
+        for result in listing['results']:
+            shortcode = result['shortcode']
+            self.seen_job_ids.add(shortcode)
+
+            # Check if the job is already in the database asynchronously
+            job_exists = await sync_to_async(job_seen)(job_id=shortcode, company__name=self.company_name)
+
+            if not job_exists:
+                self.logger.info("New job found, scraping: %s", shortcode)
+                self.progress_bar.total += 1  # Increment the total count in the progress bar
+
+                yield scrapy.Request(self.detail_url.format(account=self.account, shortcode=shortcode),
+                                     callback=self.parse_job_details)
+            else:
+                self.logger.debug("Job already scraped, skipping: %s", shortcode)
+
+        # The listing is paginated with a cursor, absent on the last page
+        if listing.get('nextPage'):
+            yield self.list_request(listing['nextPage'])
+        else:
+            self.logger.info("No more pages to navigate.")
+
+    def parse_job_details(self, response):
+        job = json.loads(response.text)
+        departments = job.get('department') or []
+
+        post = (
+            f"{job.get('description') or ''}"
+            f"{job.get('requirements') or ''}"
+            f"{job.get('benefits') or ''}"
+        )
+
+        self.logger.info("Scraped job: %s", job['title'])
+
+        yield {
+            'title': job['title'].strip(),
+            'category': departments[0] if departments else None,
+            'sub_category': departments[1] if len(departments) > 1 else None,
+            'locations': self.process_locations(job),
+            'job_url': self.job_url.format(account=self.account, shortcode=job['shortcode']),
+            'job_id': job['shortcode'],
+            'company': self.company_name,
+            'post': post,
+        }
+
+    def process_locations(self, job):
+        """
+        Workable locations in the ``{'location': 'City, State, Country', 'remote': bool}`` form JobsPipeline
+        resolves, remote roles become ``Remote, Remote, <country>`` like in the Google spider.
+        """
+        remote = bool(job.get('remote')) or job.get('workplace') == 'remote'
+        processed_locations = []
+
+        for location in job.get('locations') or [job.get('location') or {}]:
+            if remote:
+                location_str = f"Remote, Remote, {location.get('country')}"
+            else:
+                location_str = ', '.join(part for part in (location.get('city'), location.get('region'),
+                                                           location.get('country')) if part)
+
+            new_location = {'location': location_str, 'remote': remote}
+
+            if location.get('country') and new_location not in processed_locations:
+                processed_locations.append(new_location)
+
+        return processed_locations
@@ -1,18 +1,41 @@
 from django.contrib import admin
-from .models import ScrapyProject, ScrapySpider, ScrapyJob
-from .tasks import run_spider
+from .models import CrawlStats, ScrapyProject, ScrapySpider, ScrapyJob, SpiderRun
+from .tasks import run_spiders
+from talent_bridge_cron.routers import ReplicaChangeListMixin
 
-class ScrapySpiderAdmin(admin.ModelAdmin):
-    list_display = ('name', 'project')
+class ScrapySpiderAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = ('name', 'project', 'domain')
     actions = ['trigger_spider']
 
     def trigger_spider(self, request, queryset):
-        for spider in queryset:
-            run_spider.delay(spider.id)
-            self.message_user(request, f'Spider {spider.name} has been scheduled to run.')
+        spiders = list(queryset)
+        run_spiders.delay([spider.id for spider in spiders])
+        self.message_user(request, f"Spiders {', '.join(spider.name for spider in spiders)} have been queued to run.")
 
     trigger_spider.short_description = "Run selected spiders"
 
+
+class ScrapyJobAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    pass
+
+
 admin.site.register(ScrapyProject)
 admin.site.register(ScrapySpider, ScrapySpiderAdmin)
-admin.site.register(ScrapyJob)
\ No newline at end of file
+admin.site.register(ScrapyJob, ScrapyJobAdmin)
+admin.site.register(CrawlStats)
+
+
+class SpiderRunAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
+    list_display = ('spider', 'status', 'priority', 'attempts', 'not_before', 'dispatched_at', 'job')
+    list_filter = ('status',)
+    actions = ['cancel_runs']
+
+    def cancel_runs(self, request, queryset):
+        self.pin_to_primary(request)
+        cancelled = queryset.filter(status='queued').update(status='cancelled')
+        self.message_user(request, f'{cancelled} queued runs cancelled.')
+
+    cancel_runs.short_description = "Cancel selected queued runs"
+
+
+admin.site.register(SpiderRun, SpiderRunAdmin)
\ No newline at end of file
@@ -0,0 +1,170 @@
+import datetime
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ScrapyJob, SpiderRun
+from .reconcile import ACTIVE
+from .scrapyd import get_client
+
+logger = logging.getLogger(__name__)
+
+# Runs not handed to scrapyd yet, a spider has at most one of them
+WAITING = ('queued', 'starting')
+
+# Spider runs are queued as SpiderRun rows and handed to scrapyd by dispatch() while there are free slots:
+# SPIDER_MAX_RUNNING in total, SPIDER_MAX_RUNNING_PER_PROJECT per scrapyd project, SPIDER_MAX_RUNNING_PER_DOMAIN
+# per crawled domain, and never two runs of the same spider. Runs being started and pending or running ScrapyJobs
+# hold the slots, the reconciler frees the slots of runs that died without telling us.
+
+
+def schedule_spiders(spiders):
+    """
+    Schedules ``spiders`` on scrapyd in one batch. Returns an unsaved ScrapyJob for every run scrapyd accepted.
+    """
+    runs = [{'project': spider.project.name, 'spider': spider.name} for spider in spiders]
+    results = get_client().schedule_many(runs)
+    jobs = []
+
+    for spider, (run, job_id, error) in zip(spiders, results):
+        if error:
+            logger.error(f"Failed to start spider {spider.name}: {error}")
+            continue
+
+        jobs.append(ScrapyJob(spider=spider, job_id=job_id, status='pending', start_time=timezone.now()))
+        logger.info(f"Spider {spider.name} scheduled with job_id: {job_id}")
+
+    return jobs
+
+
+def enqueue(spiders, priority=0):
+    """
+    Queues a run of every spider. A spider already queued, or being started, keeps its one run at the higher
+    priority.
+    """
+    queued = {run.spider_id: run for run in SpiderRun.objects.filter(spider__in=spiders, status__in=WAITING)}
+    new, bumped = [], []
+
+    for spider in spiders:
+        run = queued.get(spider.id)
+
+        if run is None:
+            new.append(SpiderRun(spider=spider, priority=priority))
+        elif priority > run.priority:
+            run.priority = priority
+            bumped.append(run)
+
+    # A run queued meanwhile by someone else wins, see the spider_runs_one_queued constraint
+    SpiderRun.objects.bulk_create(new, ignore_conflicts=True)
+    SpiderRun.objects.bulk_update(bumped, ['priority'])
+
+    return len(new)
+
+
+def domain_key(spider_name, domain):
+    """Key of the per domain cap. A spider whose domain is not filled in counts on its own, under its name."""
+    return domain or f'spider:{spider_name}'
+
+
+def free_slots():
+    """Counts of the active runs and the runs being started: total, by spider, by project and by domain."""
+    fields = ('spider_id', 'spider__project_id', 'spider__name', 'spider__domain')
+    active = [*ScrapyJob.objects.filter(status__in=ACTIVE).values_list(*fields),
+              *SpiderRun.objects.filter(status='starting').values_list(*fields)]
+
+    return (len(active), {spider_id for spider_id, project_id, name, domain in active},
+            Counter(project_id for spider_id, project_id, name, domain in active),
+            Counter(domain_key(name, domain) for spider_id, project_id, name, domain in active))
+
+
+@transaction.atomic
+def claim_runs(now):
+    """
+    Marks the highest priority queued runs that fit under the caps as starting and returns them. Queued runs are
+    locked with SKIP LOCKED, a second dispatcher picks other runs instead of waiting.
+    """
+    # A dispatcher that died between claiming and recording its runs left them starting
+    stale = SpiderRun.objects.filter(
+        status='starting', modified__lt=now - datetime.timedelta(seconds=settings.SPIDER_RUN_START_TIMEOUT))
+    if stale.update(status='queued', modified=now):
+        logger.warning("Requeued spider runs left starting by a dispatcher that stopped")
+
+    runs = list(SpiderRun.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+        status='queued', not_before__lte=now).select_related('spider__project').order_by(
+        '-priority', 'created')[:settings.SPIDER_DISPATCH_BATCH])
+
+    if not runs:
+        return [], 0
+
+    total, active_spiders, per_project, per_domain = free_slots()
+    chosen = []
+
+    for run in runs:
+        spider = run.spider
+        domain = domain_key(spider.name, spider.domain)
+
+        if total >= settings.SPIDER_MAX_RUNNING:
+            break
+
+        if spider.id in active_spiders or per_project[spider.project_id] >= settings.SPIDER_MAX_RUNNING_PER_PROJECT:
+            continue
+
+        if per_domain[domain] >= settings.SPIDER_MAX_RUNNING_PER_DOMAIN:
+            continue
+
+        if not spider.domain:
+            logger.warning(f"Spider {spider.name} has no domain, it is capped on its own")
+
+        chosen.append(run)
+        total += 1
+        active_spiders.add(spider.id)
+        per_project[spider.project_id] += 1
+        per_domain[domain] += 1
+
+    for run in chosen:
+        run.status, run.attempts, run.modified = 'starting', run.attempts + 1, now
+
+    SpiderRun.objects.bulk_update(chosen, ['status', 'attempts', 'modified'])
+
+    return chosen, len(runs)
+
+
+def dispatch():
+    """
+    Hands the highest priority queued runs that fit under the caps to scrapyd. The runs are claimed in one short
+    transaction and their results recorded in another. Scrapyd is called outside of both, so no transaction or
+    row lock is held while it answers. Returns the dispatched runs.
+    """
+    now = timezone.now()
+    chosen, looked_at = claim_runs(now)
+
+    if not chosen:
+        return []
+
+    jobs = {job.spider_id: job for job in schedule_spiders([run.spider for run in chosen])}
+    now = timezone.now()
+
+    for run in chosen:
+        run.modified = now
+        job = jobs.get(run.spider_id)
+
+        if job:
+            run.status, run.job, run.dispatched_at = 'dispatched', job, now
+        elif run.attempts >= settings.SPIDER_RUN_MAX_ATTEMPTS:
+            run.status = 'failed'
+            logger.error(f"Giving up on run of spider {run.spider.name} after {run.attempts} attempts")
+        else:
+            retry_in = settings.SPIDER_RUN_RETRY_SECONDS * 2 ** (run.attempts - 1)
+            run.status, run.not_before = 'queued', now + datetime.timedelta(seconds=retry_in)
+
+    with transaction.atomic():
+        ScrapyJob.objects.bulk_create(jobs.values())
+        SpiderRun.objects.bulk_update(chosen, ['status', 'job', 'dispatched_at', 'not_before', 'modified'])
+
+    dispatched = [run for run in chosen if run.status == 'dispatched']
+    logger.info(f"Dispatched {len(dispatched)} of {looked_at} queued spider runs")
+
+    return dispatched
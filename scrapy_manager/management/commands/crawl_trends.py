@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from scrapy_manager.models import CrawlStats, ScrapySpider
+
+
+def per_item(value, items):
+    return value / items if items else None
+
+
+def fmt(value, digits=2):
+    return '-' if value is None else f'{value:.{digits}f}'
+
+
+def recent_runs(spider=None, runs=10):
+    """
+    {spider name: CrawlStats of its last ``runs`` runs, newest first}. One sliced query per spider, a spider's older
+    runs are never loaded.
+    """
+    spiders = ScrapySpider.objects.filter(jobs__crawl_stats__isnull=False).distinct().order_by('name')
+
+    if spider:
+        spiders = spiders.filter(name=spider)
+
+    return {
+        scrapy_spider.name: list(CrawlStats.objects.filter(job__spider=scrapy_spider).select_related('job').defer(
+            'stats').order_by('-job__start_time')[:runs])
+        for scrapy_spider in spiders
+    }
+
+
+def speed_trend(spider_runs):
+    """
+    Seconds per item of the newest of ``spider_runs`` and of the older ones together, None when fewer than two runs
+    have both a duration and items.
+    """
+    timed = [crawl_stats for crawl_stats in spider_runs
+             if crawl_stats.elapsed_seconds and crawl_stats.item_scraped_count]
+
+    if len(timed) < 2:
+        return None
+
+    latest = timed[0].elapsed_seconds / timed[0].item_scraped_count
+    previous = sum(run.elapsed_seconds for run in timed[1:]) / sum(run.item_scraped_count for run in timed[1:])
+
+    return latest, previous
+
+
+def startup(spider=None, runs=10):
+    by_spider = recent_runs(spider=spider, runs=runs)
+
+    header = (f"{'started':<17} {'reason':<12} {'items':>6} {'dropped':>7} {'elapsed s':>9} {'items/min':>9} "
+              f"{'s/item':>7} {'db s/item':>9} {'loc s/item':>10} {'latency s':>9}")
+
+    for spider_name, spider_runs in by_spider.items():
+        print(f"\n{spider_name}, last {len(spider_runs)} runs")
+        print(header)
+
+        for crawl_stats in reversed(spider_runs):
+            items = crawl_stats.item_scraped_count
+            elapsed = crawl_stats.elapsed_seconds
+            print(f"{timezone.localtime(crawl_stats.job.start_time):%Y-%m-%d %H:%M} {crawl_stats.finish_reason[:12]:<12} {items:>6} "
+                  f"{crawl_stats.item_dropped_count:>7} {fmt(elapsed, 0):>9} "
+                  f"{fmt(per_item(items * 60, elapsed)):>9} {fmt(per_item(elapsed or 0, items)):>7} "
+                  f"{fmt(per_item(crawl_stats.db_write_seconds, items), 3):>9} "
+                  f"{fmt(per_item(crawl_stats.location_seconds, items), 3):>10} "
+                  f"{fmt(crawl_stats.avg_latency_seconds, 3):>9}")
+
+        trend = speed_trend(spider_runs)
+
+        if trend:
+            latest, previous = trend
+            print(f"Latest run {fmt(latest)} s/item against {fmt(previous)} s/item before it "
+                  f"({(latest - previous) / previous:+.0%})")
+
+
+class Command(BaseCommand):
+    help = 'Prints per spider crawl speed (items/min, seconds per item, DB and location time) across recent runs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spider', help='Only this spider')
+        parser.add_argument('--runs', type=int, default=10, help='Number of most recent runs per spider')
+
+    def handle(self, *args, **options):
+        startup(spider=options['spider'], runs=options['runs'])
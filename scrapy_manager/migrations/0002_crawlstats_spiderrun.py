@@ -0,0 +1,70 @@
+# Generated by Django 4.1.2 on 2026-10-19 16:59
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scrapy_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scrapyspider',
+            name='domain',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='CrawlStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('stats', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('finish_reason', models.CharField(blank=True, default='', max_length=100)),
+                ('elapsed_seconds', models.FloatField(blank=True, null=True)),
+                ('request_count', models.IntegerField(default=0)),
+                ('response_count', models.IntegerField(default=0)),
+                ('response_bytes', models.BigIntegerField(default=0)),
+                ('item_scraped_count', models.IntegerField(default=0)),
+                ('item_dropped_count', models.IntegerField(default=0)),
+                ('avg_latency_seconds', models.FloatField(blank=True, null=True)),
+                ('max_latency_seconds', models.FloatField(blank=True, null=True)),
+                ('db_write_seconds', models.FloatField(default=0)),
+                ('location_seconds', models.FloatField(default=0)),
+                ('job', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='crawl_stats', to='scrapy_manager.scrapyjob')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SpiderRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('priority', models.IntegerField(default=0)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('starting', 'Starting'), ('dispatched', 'Dispatched'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('not_before', models.DateTimeField(default=django.utils.timezone.now)),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+                ('job', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='run', to='scrapy_manager.scrapyjob')),
+                ('spider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='scrapy_manager.scrapyspider')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='spiderrun',
+            index=models.Index(condition=models.Q(('status', 'queued')), fields=['-priority', 'created'], name='spider_runs_queue_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='spiderrun',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'starting'])), fields=('spider',), name='spider_runs_one_queued'),
+        ),
+    ]
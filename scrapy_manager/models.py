@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils import timezone
 from talent_bridge_cron.models import AbstractBaseModel
@@ -10,6 +11,9 @@ class ScrapyProject(AbstractBaseModel):
 class ScrapySpider(AbstractBaseModel):
     project = models.ForeignKey(ScrapyProject, on_delete=models.CASCADE, related_name='spiders')
     name = models.CharField(max_length=100)
+    # Host the spider crawls, runs of spiders on the same domain count against one cap, see scrapy_manager.dispatch.
+    # A spider without one is capped on its own.
+    domain = models.CharField(max_length=255, blank=True, default='')
 
     def __str__(self):
         return self.name
@@ -29,4 +33,61 @@ class ScrapyJob(AbstractBaseModel):
 
 
     def __str__(self):
-        return f"{self.spider.name} - {self.job_id}"
\ No newline at end of file
+        return f"{self.spider.name} - {self.job_id}"
+
+
+class CrawlStats(AbstractBaseModel):
+    """
+    Stats of one finished run, saved by SaveCrawlStatsExtension: Scrapy's whole stats dict plus our own timings.
+    The columns are copied out of ``stats`` for the trends, see the crawl_trends command.
+    """
+    job = models.OneToOneField(ScrapyJob, on_delete=models.CASCADE, related_name='crawl_stats')
+    stats = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    finish_reason = models.CharField(max_length=100, blank=True, default='')
+    elapsed_seconds = models.FloatField(null=True, blank=True)
+    request_count = models.IntegerField(default=0)
+    response_count = models.IntegerField(default=0)
+    response_bytes = models.BigIntegerField(default=0)
+    item_scraped_count = models.IntegerField(default=0)
+    item_dropped_count = models.IntegerField(default=0)
+    avg_latency_seconds = models.FloatField(null=True, blank=True)
+    max_latency_seconds = models.FloatField(null=True, blank=True)
+    db_write_seconds = models.FloatField(default=0)
+    location_seconds = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.job} stats"
+
+
+
+class SpiderRun(AbstractBaseModel):
+    """
+    A requested run of a spider, waiting in a priority queue until scrapy_manager.dispatch finds a free slot.
+    A spider has at most one run queued or starting, starting while dispatch hands it to scrapyd.
+    """
+    spider = models.ForeignKey(ScrapySpider, on_delete=models.CASCADE, related_name='runs')
+    priority = models.IntegerField(default=0)  # higher runs first
+    status = models.CharField(max_length=20, default='queued', choices=[
+        ('queued', 'Queued'),
+        ('starting', 'Starting'),
+        ('dispatched', 'Dispatched'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ])
+    attempts = models.IntegerField(default=0)
+    not_before = models.DateTimeField(default=timezone.now)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    job = models.OneToOneField(ScrapyJob, on_delete=models.SET_NULL, null=True, blank=True, related_name='run')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-priority', 'created'], condition=models.Q(status='queued'),
+                         name='spider_runs_queue_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['spider'], condition=models.Q(status__in=['queued', 'starting']),
+                                    name='spider_runs_one_queued'),
+        ]
+
+    def __str__(self):
+        return f"{self.spider.name} ({self.status}, priority {self.priority})"
@@ -0,0 +1,100 @@
+import datetime
+import logging
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ScrapyJob, ScrapyProject
+from .scrapyd import get_client
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = ('pending', 'running')
+# A row is written around its schedule.json call, a listing taken meanwhile may not have the job yet
+ORPHAN_GRACE = datetime.timedelta(minutes=2)
+
+
+def parse_time(value):
+    # scrapyd reports naive times in its own local time, taken to be TIME_ZONE
+    if not value:
+        return None
+
+    return timezone.make_aware(datetime.datetime.fromisoformat(value))
+
+
+def reconcile_project(project, client=None):
+    """
+    Brings the ScrapyJob rows of ``project`` in line with scrapyd with one listjobs.json call and one bulk update.
+
+    * pending and running jobs take scrapyd's state and real start time
+    * finished jobs still marked pending or running never reached SaveCrawlStatsExtension (killed process), they
+      are failed with scrapyd's end time
+    * active rows scrapyd doesn't know at all are orphans (lost queue, deleted job storage), failed as of now once
+      they are older than ORPHAN_GRACE
+
+    Returns a dict of counts, orphans are counted in ``orphaned`` only.
+    """
+    client = client or get_client()
+    listed_at = timezone.now()
+    listing = client.list_jobs(project.name)
+
+    scrapyd_jobs = {}
+    for state in ('pending', 'running', 'finished'):
+        for job in listing.get(state, []):
+            scrapyd_jobs[job['id']] = (state, job)
+
+    rows = ScrapyJob.objects.filter(Q(status__in=ACTIVE) | Q(job_id__in=list(scrapyd_jobs)), spider__project=project)
+    changed = []
+    known = set()
+    counts = {'pending': 0, 'running': 0, 'failed': 0, 'orphaned': 0}
+
+    for row in rows.only('id', 'job_id', 'status', 'start_time', 'end_time', 'created'):
+        known.add(row.job_id)
+        state, job = scrapyd_jobs.get(row.job_id, (None, {}))
+        status, start_time, end_time = row.status, row.start_time, row.end_time
+
+        if state in ACTIVE:
+            status = state
+            start_time = parse_time(job.get('start_time')) or start_time
+        elif state == 'finished':
+            if row.status in ACTIVE:
+                status = 'failed'
+                end_time = parse_time(job.get('end_time')) or listed_at
+            start_time = parse_time(job.get('start_time')) or start_time
+        elif row.status in ACTIVE and row.created < listed_at - ORPHAN_GRACE:
+            status = 'failed'
+            end_time = listed_at
+            counts['orphaned'] += 1
+
+        if (status, start_time, end_time) != (row.status, row.start_time, row.end_time):
+            # Orphans are only known to us, they were counted above
+            if status in counts and status != row.status and state is not None:
+                counts[status] += 1
+
+            row.status, row.start_time, row.end_time, row.modified = status, start_time, end_time, listed_at
+            changed.append(row)
+
+    ScrapyJob.objects.bulk_update(changed, ['status', 'start_time', 'end_time', 'modified'])
+
+    counts['unknown'] = len(set(scrapyd_jobs) - known)
+    counts['updated'] = len(changed)
+
+    if counts['unknown']:
+        logger.warning(f"{counts['unknown']} scrapyd jobs of {project.name} have no ScrapyJob, started outside "
+                       f"scrapy_manager")
+
+    return counts
+
+
+def reconcile_all(client=None):
+    """Reconciles every project, one failing project doesn't stop the others. Returns the counts per project."""
+    results = {}
+
+    for project in ScrapyProject.objects.all():
+        try:
+            results[project.name] = reconcile_project(project, client)
+        except Exception as e:
+            logger.error(f"Failed to reconcile scrapy jobs of {project.name}: {e}")
+            results[project.name] = {'error': str(e)}
+
+    return results
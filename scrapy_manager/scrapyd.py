@@ -0,0 +1,105 @@
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapydError(Exception):
+    """scrapyd answered with ``"status": "error"`` or a response that is not JSON."""
+
+
+class ScrapydClient:
+    """
+    Client for the scrapyd JSON API sharing one pooled session.
+
+    * every call has a (connect, read) timeout, a slow scrapyd raises instead of hanging the worker
+    * GETs are retried with backoff on connection errors and 502/503/504. POSTs are retried on connection
+      errors only, a POST that reached scrapyd is never sent twice
+    """
+
+    def __init__(self, url=None, timeout=None, retries=None, backoff=None, pool_size=None):
+        self.url = (url or settings.SCRAPYD_URL).rstrip('/')
+        self.timeout = timeout or settings.SCRAPYD_TIMEOUT
+        self.pool_size = pool_size or settings.SCRAPYD_POOL_SIZE
+
+        retry = Retry(
+            total=settings.SCRAPYD_RETRIES if retries is None else retries,
+            backoff_factor=settings.SCRAPYD_BACKOFF if backoff is None else backoff,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _request(self, method, endpoint, **kwargs):
+        response = self.session.request(method, f'{self.url}/{endpoint}', timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+
+        try:
+            data = response.json()
+        except ValueError:
+            raise ScrapydError(f'{endpoint} returned a response that is not JSON: {response.text[:200]}')
+
+        if data.get('status') != 'ok':
+            raise ScrapydError(f"{endpoint} failed: {data.get('message', data)}")
+
+        return data
+
+    def schedule(self, project, spider, job_id=None, **spider_args):
+        """
+        Schedules one run and returns its job id. The id is also passed to the spider as its ``job_id``
+        argument, SaveCrawlStatsExtension finds the ScrapyJob with it.
+        """
+        job_id = job_id or str(uuid.uuid4())
+        data = self._request('POST', 'schedule.json', data={
+            'project': project, 'spider': spider, 'jobid': job_id, 'job_id': job_id, **spider_args,
+        })
+
+        return data.get('jobid', job_id)
+
+    def schedule_many(self, runs):
+        """
+        Schedules ``runs``, dicts of schedule() arguments, in parallel over the pooled connections.
+        Returns ``(run, job id, error)`` per run in order, one failed run doesn't stop the others.
+        """
+        def schedule_run(run):
+            try:
+                return run, self.schedule(**run), None
+            except (requests.RequestException, ScrapydError) as e:
+                logger.error(f"Failed to schedule spider {run.get('spider')}: {e}")
+                return run, None, e
+
+        if not runs:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.pool_size, len(runs))) as executor:
+            return list(executor.map(schedule_run, runs))
+
+    def list_jobs(self, project):
+        """``{'pending': [...], 'running': [...], 'finished': [...]}`` of ``project`` as returned by scrapyd."""
+        return self._request('GET', 'listjobs.json', params={'project': project})
+
+    def cancel(self, project, job_id):
+        return self._request('POST', 'cancel.json', data={'project': project, 'job': job_id})
+
+
+_client = None
+
+
+def get_client():
+    """Process wide client, the session and its connections are reused across tasks."""
+    global _client
+
+    if _client is None:
+        _client = ScrapydClient()
+
+    return _client
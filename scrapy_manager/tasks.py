@@ -1,50 +1,128 @@
+import gzip
+import os
+import shutil
+import tempfile
+
 from celery import shared_task
-import requests
+from django.conf import settings
+from django.core.files import File
 from django.utils import timezone
+from .dispatch import dispatch, enqueue
 from .models import ScrapyJob, ScrapySpider
+from .reconcile import reconcile_all
+from .scrapyd import get_client
+from talent_bridge_cron.scheduling import ExclusiveTask
 import logging
-import uuid
 
 logger = logging.getLogger(__name__)
 
+
+@shared_task
+def run_spiders(spider_ids, priority=0):
+    """Queues a run of every spider, they start as soon as the concurrency caps allow, see scrapy_manager.dispatch."""
+    spiders = list(ScrapySpider.objects.filter(id__in=spider_ids))
+    logger.info(f"Queueing spiders: {[spider.name for spider in spiders]}")
+
+    queued = enqueue(spiders, priority=priority)
+    dispatch_spider_runs.delay()
+
+    return f'Queued {queued} of {len(spiders)} spiders'
+
+
 @shared_task
-def run_spider(spider_id):
+def run_spider(spider_id, priority=0):
     try:
         # Retrieve the spider instance
         spider = ScrapySpider.objects.get(id=spider_id)
-        logger.info(f"Starting spider: {spider.name} with spider_id: {spider_id}")
-
-        # Generate a random UUID for the job
-        job_id = str(uuid.uuid4())
-
-        # Schedule the spider with the generated UUID
-        response = requests.post(f'http://localhost:6800/schedule.json', data={
-            'project': spider.project.name,
-            'spider': spider.name,
-            'job_id': job_id  # Pass the generated UUID here
-        })
-
-        if response.status_code == 200:
-            # Check if the job ID was returned by the scheduling request
-            response_job_id = response.json().get('jobid')
-            if response_job_id:
-                # Create a ScrapyJob entry in the database with the job ID and status
-                job = ScrapyJob.objects.create(
-                    spider=spider,
-                    job_id=job_id,  # Use the generated UUID here
-                    status='running',
-                    start_time=timezone.now()
-                )
-                logger.info(f"ScrapyJob created with job_id: {job_id}")
-                
-                return f'Spider {spider.name} started with job ID {job_id}'
-
-            else:
-                logger.error(f"Failed to retrieve job ID for spider {spider.name}")
-                return f'Failed to retrieve job ID for spider {spider.name}'
-        else:
-            logger.error(f"Failed to start spider {spider.name}. Response status: {response.status_code}")
-            return f'Failed to start spider {spider.name}'
+        logger.info(f"Queueing spider: {spider.name} with spider_id: {spider_id}")
+
+        enqueue([spider], priority=priority)
+        dispatch_spider_runs.delay()
+
+        return f'Spider {spider.name} queued'
     except Exception as e:
         logger.error(f"Unexpected error in run_spider task: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+@shared_task(bind=True, base=ExclusiveTask)
+def dispatch_spider_runs(self):
+    """Starts queued spider runs while slots are free. Runs every minute, after every enqueue and spider close."""
+    runs = dispatch()
+
+    return f'Dispatched {len(runs)} spider runs'
+
+
+@shared_task
+def reconcile_scrapy_jobs():
+    """Syncs ScrapyJob statuses with scrapyd, one listjobs.json call per project."""
+    results = reconcile_all()
+    logger.info(f"Reconciled scrapy jobs: {results}")
+
+    # Failed and orphaned runs free their slots
+    dispatch_spider_runs.delay()
+
+    return results
+
+
+def compress_log(path):
+    """
+    gzip of the file at ``path`` in an anonymous temporary file, read and compressed CRAWL_LOG_CHUNK_SIZE bytes
+    at a time.
+    """
+    compressed = tempfile.TemporaryFile()
+
+    with open(path, 'rb') as log_file, gzip.GzipFile(fileobj=compressed, mode='wb') as gzip_file:
+        shutil.copyfileobj(log_file, gzip_file, settings.CRAWL_LOG_CHUNK_SIZE)
+
+    compressed.seek(0)
+    return compressed
+
+
+def crawl_finished(job):
+    """Whether scrapyd lists ``job`` as finished, meaning its crawl process has exited and closed its log."""
+    listing = get_client().list_jobs(job.spider.project.name)
+
+    return any(finished['id'] == job.job_id for finished in listing.get('finished', []))
+
+
+@shared_task(bind=True, max_retries=settings.CRAWL_LOG_WAIT_RETRIES + 3, default_retry_delay=60)
+def upload_crawl_log(self, job_id, path, name):
+    """
+    Uploads the spider log at ``path`` gzipped to the ScrapyJob's log_file and removes it from disk. The storage
+    reads the compressed file in chunks, S3/MinIO as a multipart upload for large logs.
+
+    Queued from spider_closed, but the crawl process logs its stats and shutdown after that. The upload waits
+    until scrapyd reports the job finished, checking every CRAWL_LOG_WAIT_SECONDS. After CRAWL_LOG_WAIT_RETRIES
+    checks it uploads the log as it is.
+    """
+    try:
+        job = ScrapyJob.objects.select_related('spider__project').get(job_id=job_id)
+        finished = crawl_finished(job)
+    except Exception as e:
+        logger.error(f"Failed to check whether job {job_id} finished: {e}")
+        raise self.retry(exc=e)
+
+    if not finished:
+        if self.request.retries < settings.CRAWL_LOG_WAIT_RETRIES:
+            raise self.retry(countdown=settings.CRAWL_LOG_WAIT_SECONDS)
+
+        logger.warning(f"Job {job_id} is still not finished according to scrapyd, uploading its log as it is")
+
+    try:
+        with compress_log(path) as compressed:
+            job.log_file.save(f'{name}.gz', File(compressed, name=f'{name}.gz'), save=False)
+
+        # Only the file field, the status is owned by the extension and the reconciler
+        ScrapyJob.objects.filter(id=job.id).update(log_file=job.log_file.name, modified=timezone.now())
+    except FileNotFoundError:
+        logger.error(f"Log file {path} of job {job_id} is gone, nothing to upload")
+        return
+    except Exception as e:
+        logger.error(f"Failed to upload log of job {job_id}: {e}")
+        raise self.retry(exc=e)
+
+    os.remove(path)
+    logger.info(f"Uploaded log of job {job_id} as {job.log_file.name}")
+
+    return job.log_file.name
@@ -1,3 +1,535 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import requests
+from asgiref.sync import async_to_sync
+from celery.exceptions import Retry
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from scrapy.http import JsonRequest, Request, TextResponse
+from tqdm import tqdm
+
+from companies.models import Company
+from jobs.models import Jobs
+from scrapy_manager.dispatch import dispatch, enqueue, free_slots
+from scrapy_manager.management.commands.crawl_trends import recent_runs, speed_trend
+from scrapy_manager.models import CrawlStats, ScrapyJob, ScrapyProject, ScrapySpider, SpiderRun
+from scrapy_manager.reconcile import reconcile_project
+from scrapy_manager.scrapyd import ScrapydClient, ScrapydError
+from scrapy_manager.tasks import run_spider, run_spiders, upload_crawl_log
+from talent_bridge_cron.testing import local_services
+
+# The scrapy project's packages are imported from its own directory, as scrapyd does from the deployed egg
+sys.path.append(os.path.join(settings.BASE_DIR, 'scraper'))
+
+from scraper.extensions import SaveCrawlStatsExtension  # noqa: E402
+from scraper.pipelines import STATS_PREFIX  # noqa: E402
+from scraper.spiders.workable_spider import WorkableJobsSpider  # noqa: E402
+
+TESTDATA_DIR = os.path.join(os.path.dirname(__file__), 'testdata')
+
+
+def saved_response(path, url):
+    """A response with the body of the saved ``testdata/<path>``, as the spider got it from ``url``."""
+    with open(os.path.join(TESTDATA_DIR, path), 'rb') as saved:
+        return TextResponse(url, body=saved.read(), encoding='utf-8', request=Request(url))
+
+
+class StubScrapyd(ThreadingHTTPServer):
+    """Local stand-in for scrapyd's JSON API, records the requests it gets."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubScrapydHandler)
+        self.requests = []
+        self.delay = 0
+        self.failing_spiders = set()
+        self.jobs = {'pending': [], 'running': [], 'finished': []}
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+
+class StubScrapydHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.requests.append(('GET', url.path, {key: value[0] for key, value in parse_qs(url.query).items()}))
+
+        if url.path == '/listjobs.json':
+            self.reply({'status': 'ok', **self.server.jobs})
+        else:
+            self.reply({'status': 'error', 'message': 'not found'}, status=404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        data = {key: value[0] for key, value in parse_qs(body).items()}
+        self.server.requests.append(('POST', self.path, data))
+        time.sleep(self.server.delay)
+
+        if self.path == '/schedule.json' and data['spider'] not in self.server.failing_spiders:
+            self.reply({'status': 'ok', 'jobid': data['jobid']})
+        else:
+            self.reply({'status': 'error', 'message': f"spider '{data['spider']}' not found"})
+
+    def reply(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@local_services
+class StubScrapydTestCase(TestCase):
+    """Runs against a StubScrapyd, also used by the tasks through the process wide client."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.scrapyd = StubScrapyd()
+        threading.Thread(target=cls.scrapyd.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.scrapyd.shutdown()
+        cls.scrapyd.server_close()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.project = ScrapyProject.objects.create(name='scraper')
+        cls.spiders = [ScrapySpider.objects.create(project=cls.project, name=f'spider_{index}') for index in range(5)]
+
+    def setUp(self):
+        self.scrapyd.requests.clear()
+        self.scrapyd.delay = 0
+        self.scrapyd.failing_spiders = set()
+        self.client = ScrapydClient(url=self.scrapyd.url, timeout=(1, 1), retries=1, backoff=0)
+
+        # The tasks use the process wide client
+        from scrapy_manager import scrapyd
+        scrapyd._client = self.client
+        self.addCleanup(setattr, scrapyd, '_client', None)
+
+
+class ScrapydClientTests(StubScrapydTestCase):
+
+    def test_schedule_passes_job_id_to_scrapyd_and_spider(self):
+        job_id = self.client.schedule('scraper', 'spider_0', job_id='abc')
+
+        self.assertEqual(job_id, 'abc')
+        method, path, data = self.scrapyd.requests[0]
+        self.assertEqual((method, path), ('POST', '/schedule.json'))
+        self.assertEqual((data['jobid'], data['job_id'], data['project']), ('abc', 'abc', 'scraper'))
+
+    def test_error_status_raises(self):
+        self.scrapyd.failing_spiders = {'spider_0'}
+
+        with self.assertRaises(ScrapydError):
+            self.client.schedule('scraper', 'spider_0')
+
+    def test_slow_scrapyd_times_out(self):
+        self.scrapyd.delay = 2
+
+        with self.assertRaises(requests.Timeout):
+            self.client.schedule('scraper', 'spider_0')
+
+        # The POST reached scrapyd, it must not be sent again
+        self.assertEqual(len(self.scrapyd.requests), 1)
+
+    def test_schedule_many_runs_in_parallel(self):
+        self.scrapyd.delay = 0.5
+        runs = [{'project': 'scraper', 'spider': f'spider_{index}'} for index in range(5)]
+
+        started = time.monotonic()
+        results = self.client.schedule_many(runs)
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual([run for run, job_id, error in results], runs)
+        self.assertTrue(all(job_id and error is None for run, job_id, error in results))
+
+    def test_list_jobs(self):
+        self.scrapyd.jobs = {'pending': [{'id': 'a'}], 'running': [], 'finished': []}
+
+        self.assertEqual(self.client.list_jobs('scraper')['pending'], [{'id': 'a'}])
+        self.assertEqual(self.scrapyd.requests[0][2], {'project': 'scraper'})
+
+    def test_reconcile_project(self):
+        statuses = ['pending', 'pending', 'running', 'running', 'finished']
+        ScrapyJob.objects.bulk_create([
+            ScrapyJob(spider=spider, job_id=f'job_{index}', status=status)
+            for index, (spider, status) in enumerate(zip(self.spiders, statuses))
+        ])
+        ScrapyJob.objects.update(created=timezone.now() - timezone.timedelta(minutes=5))
+        self.scrapyd.jobs = {
+            'pending': [],
+            'running': [{'id': 'job_0', 'spider': 'spider_0', 'start_time': '2026-01-01 10:00:00.000001'}],
+            'finished': [
+                {'id': job_id, 'start_time': '2026-01-01 09:00:00', 'end_time': '2026-01-01 09:30:00'}
+                for job_id in ('job_2', 'job_4', 'manual')
+            ],
+        }
+
+        # One read of the rows and one bulk update, whatever the number of jobs
+        with CaptureQueriesContext(connection) as queries:
+            counts = reconcile_project(self.project, self.client)
+
+        self.assertEqual(len(queries), 2, [query['sql'] for query in queries.captured_queries])
+        self.assertEqual(len(self.scrapyd.requests), 1)
+        self.assertEqual(counts, {'pending': 0, 'running': 1, 'failed': 1, 'orphaned': 2, 'unknown': 1, 'updated': 5})
+
+        jobs = {job.job_id: job for job in ScrapyJob.objects.all()}
+        self.assertEqual({job_id: job.status for job_id, job in jobs.items()},
+                         {'job_0': 'running', 'job_1': 'failed', 'job_2': 'failed', 'job_3': 'failed',
+                          'job_4': 'finished'})
+        self.assertEqual(timezone.localtime(jobs['job_0'].start_time).hour, 10)
+        self.assertEqual(timezone.localtime(jobs['job_2'].end_time).minute, 30)
+
+
+    def test_reconcile_leaves_just_scheduled_jobs_alone(self):
+        ScrapyJob.objects.create(spider=self.spiders[0], job_id='new', status='pending')
+        self.scrapyd.jobs = {'pending': [], 'running': [], 'finished': []}
+
+        counts = reconcile_project(self.project, self.client)
+
+        self.assertEqual(counts['orphaned'], 0)
+        self.assertEqual(ScrapyJob.objects.get(job_id='new').status, 'pending')
+
+class SpiderDispatchTests(StubScrapydTestCase):
+
+    @mock.patch('scrapy_manager.tasks.dispatch_spider_runs.delay')
+    def test_run_spiders_queues_then_dispatches(self, dispatch_delay):
+        self.scrapyd.failing_spiders = {'spider_1'}
+
+        run_spiders([spider.id for spider in self.spiders])
+
+        dispatch_delay.assert_called_once()
+        self.assertEqual(SpiderRun.objects.filter(status='queued').count(), 5)
+
+        dispatched = dispatch()
+
+        scheduled = {data['spider'] for method, path, data in self.scrapyd.requests}
+        self.assertEqual(scheduled, {spider.name for spider in self.spiders})
+        self.assertEqual({run.spider.name for run in dispatched}, {'spider_0', 'spider_2', 'spider_3', 'spider_4'})
+        self.assertEqual(set(ScrapyJob.objects.values_list('spider__name', flat=True)),
+                         {'spider_0', 'spider_2', 'spider_3', 'spider_4'})
+
+        # Refused by scrapyd, retried later
+        refused = SpiderRun.objects.get(spider__name='spider_1')
+        self.assertEqual((refused.status, refused.attempts), ('queued', 1))
+        self.assertGreater(refused.not_before, timezone.now())
+
+    @mock.patch('scrapy_manager.tasks.dispatch_spider_runs.delay')
+    def test_run_spider(self, dispatch_delay):
+        self.assertEqual(run_spider(self.spiders[0].id), 'Spider spider_0 queued')
+        self.assertEqual(SpiderRun.objects.get().spider, self.spiders[0])
+
+    def test_enqueue_keeps_one_queued_run_per_spider(self):
+        enqueue(self.spiders[:2])
+        enqueue(self.spiders[:1], priority=5)
+        enqueue(self.spiders[:1], priority=1)
+
+        self.assertEqual(dict(SpiderRun.objects.values_list('spider__name', 'priority')),
+                         {'spider_0': 5, 'spider_1': 0})
+
+    @override_settings(SPIDER_MAX_RUNNING=3, SPIDER_MAX_RUNNING_PER_DOMAIN=1)
+    def test_dispatch_respects_caps(self):
+        ScrapySpider.objects.filter(name__in=['spider_0', 'spider_1']).update(domain='careers.google.com')
+        ScrapyJob.objects.create(spider=self.spiders[2], job_id='active', status='running')
+        enqueue(self.spiders[:4])
+        enqueue(self.spiders[4:], priority=5)
+
+        # spider_2 is already running, spider_4 goes first, the total cap leaves room for one google spider
+        self.assertEqual([run.spider.name for run in dispatch()], ['spider_4', 'spider_0'])
+        self.assertEqual(dispatch(), [])
+
+        ScrapyJob.objects.filter(spider__name='spider_0').update(status='finished')
+        self.assertEqual([run.spider.name for run in dispatch()], ['spider_1'])
+        self.assertEqual(set(SpiderRun.objects.filter(status='queued').values_list('spider__name', flat=True)),
+                         {'spider_2', 'spider_3'})
+
+    def test_dispatch_claims_runs_before_calling_scrapyd(self):
+        enqueue(self.spiders[:2])
+        statuses = []
+
+        def schedule_many(runs):
+            # Committed as starting before scrapyd is called, and holding their slots
+            statuses.extend(SpiderRun.objects.values_list('status', flat=True))
+            self.assertEqual(free_slots()[0], 2)
+            return [(run, f"job_{run['spider']}", None) for run in runs]
+
+        with mock.patch.object(self.client, 'schedule_many', side_effect=schedule_many), \
+                CaptureQueriesContext(connection) as queries:
+            dispatched = dispatch()
+
+        self.assertEqual(statuses, ['starting', 'starting'])
+        self.assertEqual(len(dispatched), 2)
+        self.assertEqual(set(SpiderRun.objects.values_list('status', flat=True)), {'dispatched'})
+        self.assertEqual(sorted(ScrapyJob.objects.values_list('job_id', flat=True)), ['job_spider_0', 'job_spider_1'])
+        # Two transactions, the first claims the runs, the second records the jobs
+        self.assertEqual(sum(query['sql'].startswith('SAVEPOINT') for query in queries.captured_queries), 2)
+
+    def test_enqueue_keeps_a_starting_run(self):
+        enqueue(self.spiders[:1])
+        SpiderRun.objects.update(status='starting')
+
+        self.assertEqual(enqueue(self.spiders[:1], priority=5), 0)
+        self.assertEqual(list(SpiderRun.objects.values_list('status', 'priority')), [('starting', 5)])
+
+    @override_settings(SPIDER_RUN_START_TIMEOUT=60)
+    def test_runs_left_starting_are_queued_again(self):
+        enqueue(self.spiders[:1])
+        SpiderRun.objects.update(status='starting', modified=timezone.now() - datetime.timedelta(minutes=5))
+
+        with self.assertLogs('scrapy_manager.dispatch', 'WARNING'):
+            self.assertEqual([run.spider.name for run in dispatch()], ['spider_0'])
+
+    @override_settings(SPIDER_MAX_RUNNING_PER_DOMAIN=1)
+    def test_spiders_without_a_domain_are_capped_on_their_own(self):
+        ScrapyJob.objects.create(spider=self.spiders[0], job_id='active', status='running')
+        ScrapyJob.objects.create(spider=self.spiders[1], job_id='other', status='running')
+
+        self.assertEqual(free_slots()[3], {'spider:spider_0': 1, 'spider:spider_1': 1})
+
+        enqueue(self.spiders[2:3])
+        with self.assertLogs('scrapy_manager.dispatch', 'WARNING'):
+            self.assertEqual([run.spider.name for run in dispatch()], ['spider_2'])
+
+
+@local_services
+class CrawlLogUploadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        spider = ScrapySpider.objects.create(project=ScrapyProject.objects.create(name='scraper'), name='spider')
+        cls.job = ScrapyJob.objects.create(spider=spider, job_id='job', status='finished')
+
+    def scrapyd_lists(self, state):
+        client = mock.Mock(**{'list_jobs.return_value': {state: [{'id': 'job'}]}})
+        return mock.patch('scrapy_manager.tasks.get_client', return_value=client)
+
+    def write_log(self, lines):
+        with tempfile.NamedTemporaryFile(suffix='.log', delete=False) as log_file:
+            log_file.writelines(lines)
+
+        self.addCleanup(lambda: os.path.exists(log_file.name) and os.remove(log_file.name))
+        return log_file.name
+
+    def test_upload_crawl_log_streams_gzip_to_storage(self):
+        lines = [f'2026-01-01 10:00:00 [spider] DEBUG: line {index}\n'.encode() for index in range(50000)]
+        path = self.write_log(lines)
+
+        with self.settings(CRAWL_LOG_CHUNK_SIZE=4096), self.scrapyd_lists('finished'):
+            name = upload_crawl_log('job', path, 'spider_job.log')
+
+        job = ScrapyJob.objects.get(id=self.job.id)
+        self.assertEqual(job.log_file.name, name)
+        self.assertTrue(name.endswith('.log.gz'))
+        self.assertFalse(os.path.exists(path))
+
+        with job.log_file.open('rb') as stored:
+            self.assertEqual(gzip.decompress(stored.read()), b''.join(lines))
+        self.assertLess(job.log_file.size, sum(map(len, lines)) / 5)
+
+        job.log_file.delete(save=False)
+
+    def test_upload_waits_until_the_crawl_process_exited(self):
+        path = self.write_log([b'INFO: Spider closed (finished)\n'])
+
+        with self.scrapyd_lists('running'), self.assertRaises(Retry):
+            upload_crawl_log('job', path, 'spider_job.log')
+
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(ScrapyJob.objects.get(id=self.job.id).log_file)
+
+    def test_upload_gives_up_waiting_after_the_last_check(self):
+        path = self.write_log([b'INFO: Spider closed (finished)\n'])
+        upload_crawl_log.push_request(retries=settings.CRAWL_LOG_WAIT_RETRIES)
+        self.addCleanup(upload_crawl_log.pop_request)
+
+        with self.scrapyd_lists('running'), self.assertLogs('scrapy_manager.tasks', 'WARNING'):
+            name = upload_crawl_log.run('job', path, 'spider_job.log')
+
+        self.assertFalse(os.path.exists(path))
+        ScrapyJob.objects.get(id=self.job.id).log_file.delete(save=False)
+        self.assertTrue(name.endswith('.log.gz'))
+
+
+@local_services
+class WorkableSpiderTests(TestCase):
+    """Feeds the spider responses of the Workable API saved in testdata/workable."""
+
+    @classmethod
+    def setUpTestData(cls):
+        company = Company.objects.create(name='BrowserStack')
+        Jobs.objects.create(title='Product Manager', post='', company=company, job_id='5E7D22C1A0',
+                            job_url='https://apply.workable.com/browserstack-2/j/5E7D22C1A0')
+
+    def setUp(self):
+        with mock.patch('scraper.spiders.workable_spider.tqdm', partial(tqdm, disable=True)):
+            self.spider = WorkableJobsSpider(company='BrowserStack')
+        self.addCleanup(self.spider.progress_bar.close)
+
+    def parse_listing(self, path):
+        async def collect(results):
+            return [result async for result in results]
+
+        response = saved_response(path, self.spider.list_url.format(account='browserstack-2'))
+
+        # The ORM calls made through sync_to_async run back on this thread, inside the test transaction
+        return async_to_sync(collect)(self.spider.parse(response))
+
+    def parse_job(self, shortcode):
+        url = self.spider.detail_url.format(account='browserstack-2', shortcode=shortcode)
+        return list(self.spider.parse_job_details(saved_response(f'workable/job_{shortcode}.json', url)))
+
+    def test_parse_requests_details_of_new_jobs_and_the_next_page(self):
+        results = self.parse_listing('workable/jobs_page_1.json')
+        *details, next_page = results
+
+        # The job already in the database is listed but not fetched again
+        self.assertEqual([request.url for request in details], [
+            'https://apply.workable.com/api/v2/accounts/browserstack-2/jobs/8C2F1A9B3D',
+            'https://apply.workable.com/api/v2/accounts/browserstack-2/jobs/A41B9077E2',
+        ])
+        self.assertTrue(all(request.callback == self.spider.parse_job_details for request in details))
+        self.assertEqual(self.spider.seen_job_ids, {'8C2F1A9B3D', '5E7D22C1A0', 'A41B9077E2'})
+        self.assertEqual(self.spider.progress_bar.total, 2)
+
+        self.assertIsInstance(next_page, JsonRequest)
+        self.assertEqual(next_page.url, 'https://apply.workable.com/api/v3/accounts/browserstack-2/jobs')
+        self.assertEqual(next_page.callback, self.spider.parse)
+        self.assertEqual(json.loads(next_page.body)['token'], 'WzE3MjgzNDU2MDAwMDAsMzgxMDAyM10=')
+
+    def test_last_page_has_no_next_page_request(self):
+        results = self.parse_listing('workable/jobs_page_2.json')
+
+        self.assertEqual([request.url for request in results],
+                         ['https://apply.workable.com/api/v2/accounts/browserstack-2/jobs/F09C3B6E71'])
+        self.assertEqual(self.spider.seen_job_ids, {'F09C3B6E71'})
+
+    def test_parse_job_details(self):
+        [item] = self.parse_job('8C2F1A9B3D')
+
+        self.assertEqual(item, {
+            'title': 'Senior Software Engineer - Backend',
+            'category': 'Engineering',
+            'sub_category': 'Backend',
+            'locations': [
+                {'location': 'Mumbai, Maharashtra, India', 'remote': False},
+                {'location': 'Pune, Maharashtra, India', 'remote': False},
+            ],
+            'job_url': 'https://apply.workable.com/browserstack-2/j/8C2F1A9B3D',
+            'job_id': '8C2F1A9B3D',
+            'company': 'BrowserStack',
+            'post': '<p>Build the services behind our testing cloud.</p><ul><li>5+ years of Python or Java</li></ul>'
+                    '<p>Health insurance</p>',
+        })
+
+    def test_parse_remote_job_details(self):
+        [item] = self.parse_job('A41B9077E2')
+
+        self.assertEqual((item['category'], item['sub_category']), ('Customer Success', None))
+        self.assertEqual(item['locations'], [{'location': 'Remote, Remote, Ireland', 'remote': True}])
+        self.assertEqual(item['post'], '<p>Help customers run their test suites.</p>')
+
+
+@local_services
+class CrawlStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        project = ScrapyProject.objects.create(name='scraper')
+        cls.spiders = [ScrapySpider.objects.create(project=project, name=name) for name in ('google', 'workable')]
+        cls.job = ScrapyJob.objects.create(spider=cls.spiders[0], job_id='job', status='finished')
+
+    def add_run(self, spider, hours_ago, elapsed, items):
+        job = ScrapyJob.objects.create(spider=spider, job_id=f'{spider.name}_{hours_ago}', status='finished',
+                                       start_time=timezone.now() - datetime.timedelta(hours=hours_ago))
+        return CrawlStats.objects.create(job=job, finish_reason='finished', elapsed_seconds=elapsed,
+                                         item_scraped_count=items)
+
+    def test_save_stats(self):
+        extension = SaveCrawlStatsExtension()
+        for latency in (0.5, 1.5):
+            extension.response_received(None, Request('https://example.com', meta={'download_latency': latency}),
+                                        None)
+        # Responses served from the cache or a redirect carry no latency
+        extension.response_received(None, Request('https://example.com'), None)
+
+        extension.save_stats('job', {
+            'finish_reason': 'finished',
+            'elapsed_time_seconds': 120.5,
+            'downloader/request_count': 12,
+            'downloader/response_count': 11,
+            'downloader/response_bytes': 4096,
+            'item_scraped_count': 10,
+            f'{STATS_PREFIX}/items_dropped/duplicate': 2,
+            f'{STATS_PREFIX}/items_dropped/location': 1,
+            f'{STATS_PREFIX}/db_write_seconds': 3.5,
+            f'{STATS_PREFIX}/location_seconds': 1.25,
+            'start_time': datetime.datetime(2026, 1, 1, 10, 0),
+        })
+
+        crawl_stats = CrawlStats.objects.get(job=self.job)
+        self.assertEqual((crawl_stats.finish_reason, crawl_stats.elapsed_seconds, crawl_stats.request_count,
+                          crawl_stats.response_count, crawl_stats.response_bytes, crawl_stats.item_scraped_count,
+                          crawl_stats.item_dropped_count), ('finished', 120.5, 12, 11, 4096, 10, 3))
+        self.assertEqual((crawl_stats.avg_latency_seconds, crawl_stats.max_latency_seconds), (1.0, 1.5))
+        self.assertEqual((crawl_stats.db_write_seconds, crawl_stats.location_seconds), (3.5, 1.25))
+        self.assertEqual(crawl_stats.stats['start_time'], '2026-01-01T10:00:00')
+
+        # Saving again, a retried close, updates the row
+        extension.save_stats('job', {'finish_reason': 'shutdown'})
+        crawl_stats = CrawlStats.objects.get(job=self.job)
+        self.assertEqual((crawl_stats.finish_reason, crawl_stats.item_scraped_count), ('shutdown', 0))
+
+    def test_save_stats_of_unknown_job(self):
+        SaveCrawlStatsExtension().save_stats('manual', {'finish_reason': 'finished'})
+
+        self.assertFalse(CrawlStats.objects.exists())
+
+    def test_recent_runs_loads_only_the_last_runs_of_each_spider(self):
+        google, workable = self.spiders
+        for hours_ago in range(1, 6):
+            self.add_run(google, hours_ago, elapsed=100, items=10)
+        self.add_run(workable, 1, elapsed=100, items=10)
+
+        with CaptureQueriesContext(connection) as queries:
+            runs = recent_runs(runs=3)
+
+        self.assertEqual(len(queries), 3)
+        self.assertEqual([crawl_stats.job.job_id for crawl_stats in runs['google']],
+                         ['google_1', 'google_2', 'google_3'])
+        self.assertEqual(len(runs['workable']), 1)
+        self.assertEqual(list(recent_runs(spider='workable')), ['workable'])
+
+    def test_speed_trend(self):
+        google = self.spiders[0]
+        latest = self.add_run(google, 1, elapsed=300, items=100)
+        self.add_run(google, 2, elapsed=None, items=0)
+        self.add_run(google, 3, elapsed=100, items=50)
+        self.add_run(google, 4, elapsed=300, items=50)
+
+        self.assertEqual(speed_trend(recent_runs()['google']), (3.0, 4.0))
+        self.assertIsNone(speed_trend([latest]))
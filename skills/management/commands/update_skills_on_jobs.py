@@ -1,54 +1,22 @@
-import datetime
-import os
-import random
-import time
-
 import spacy
-from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 
 from jobs.models import Jobs
-from skills.models import Skills
+from talent_bridge_cron.cache import get_skills, log_cache_metrics
+from talent_bridge_cron.run_logging import get_run_logger
 
 
 def startup():
     print(
         f"---------------------Update Skills Jobs Command Started {timezone.datetime.now()}----------------------\n")
 
-    try:
-        logging_file = open('logging/skills/start_up_end/daily_startup_and_close.txt', mode='a')
-    except:
-        path = str(settings.BASE_DIR) + '/logging/skills/start_up_end'
-        isExist = os.path.exists(path)
-
-        if not isExist:
-            os.makedirs(path)
-            print(f"The new directory is created!: {path}")
+    run_logger = get_run_logger('skills')
+    run_logger.info("Update Skills Jobs Command Started", extra={'event': 'start'})
 
-        logging_file = open('logging/skills/start_up_end/daily_startup_and_close.txt', mode='a')
-
-    logging_file.write(
-        f"---------------------Update Unavailable Jobs Command Started {timezone.datetime.now()}----------------------")
-    logging_file.close()
     jobs = Jobs.objects.filter(available=True)
 
-    try:
-        logging_file = open(
-            f'logging/skills/skills_status/{timezone.datetime.today().date()}.txt',
-            mode='a')
-    except:
-        path = str(settings.BASE_DIR) + '/logging/skills/skills_status'
-        isExist = os.path.exists(path)
-
-        if not isExist:
-            os.makedirs(path)
-            print(f"The new directory is created!: {path}")
-
-        logging_file = open(
-            f'logging/skills/skills_status/{timezone.datetime.today().date()}.txt',
-            mode='a')
-    all_skills = Skills.objects.all()
+    all_skills = get_skills()
     nlp = spacy.load("en_core_web_sm")
 
     for job in jobs:
@@ -64,27 +32,18 @@ def startup():
                     skills_list.append(skill.name)
 
             print(f"update job with job_id: {job.job_id} with skills: {skills_list} ")
-            logging_file.write(
-                f"update job with job_id: {job.job_id} with skills: {skills_list} \n")
+            run_logger.info(f"update job with job_id: {job.job_id} with skills: {skills_list}",
+                            extra={'event': 'job_skills', 'job_id': job.job_id, 'skills': skills_list})
         except:
             print(f"There is error in adding skills job url: {job.job_url} and job id: {job.job_id}")
 
-            logging_file.write(
-                f"There is error in adding skills job url: {job.job_url} and job id: {job.job_id} \n")
-
-    logging_file.close()
+            run_logger.exception(f"There is error in adding skills job url: {job.job_url} and job id: {job.job_id}",
+                                 extra={'event': 'job_error', 'job_id': job.job_id})
 
+    log_cache_metrics(run_logger)
     print(f"---------------------Update Skills Jobs Command Ended {timezone.datetime.now()}----------------------")
 
-    logging_file = open('logging/skills/start_up_end/daily_startup_and_close.txt', mode='a')
-    logging_file.write(
-        f"---------------------Update Skills Unavailable Jobs Command Ended {timezone.datetime.now()}----------------------\n")
-    logging_file.close()
-
-    sleep_time = random.randint(50400, 82800)
-    print(f'Waiting for {sleep_time % (24 * 3600)}')
-    time.sleep(sleep_time)
-    startup()
+    run_logger.info("Update Skills Jobs Command Ended", extra={'event': 'end'})
 
 
 class Command(BaseCommand):
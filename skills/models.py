@@ -6,3 +6,8 @@ from talent_bridge_cron.models import AbstractBaseModel
 
 class Skills(AbstractBaseModel):
     name = models.CharField(max_length=100, null=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], condition=models.Q(is_deleted=False), name='skills_live_name_idx'),
+        ]
@@ -0,0 +1,16 @@
+from celery import shared_task
+import logging
+
+from talent_bridge_cron.scheduling import ExclusiveTask
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, base=ExclusiveTask)
+def update_skills_on_jobs(self):
+    # Imported here so the worker only loads spaCy while tagging is actually running
+    from skills.management.commands.update_skills_on_jobs import startup
+
+    logger.info("Starting update_skills_on_jobs")
+    startup()
+    return 'update_skills_on_jobs finished'
@@ -0,0 +1,213 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Reference data (companies, locations, skills) is read by every crawl, pipeline and command but rarely changes.
+# Lookups go through two tiers: an LRU in each process, then the shared cache (redis), then the database.
+# Keys carry a per model version kept in the shared cache, creating, changing or deleting a row bumps the version
+# of its model, see connect_invalidation. Other processes pick the new version up within REFERENCE_CACHE_VERSION_TTL.
+# The shared cache ignores redis errors, a version bump lost that way is logged. Process LRU entries expire after
+# REFERENCE_CACHE_LOCAL_TTL either way, so a lost bump does not keep a process on old rows for good.
+# Cached instances are shared between callers, treat them as read only.
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+REFERENCE_MODELS = ('companies.company', 'locations.locations', 'skills.skills')
+
+
+class ReferenceCache:
+
+    def __init__(self, alias='default', maxsize=10000, version_ttl=30, local_ttl=300, timeout=24 * 3600):
+        self.alias = alias
+        self.maxsize = maxsize
+        self.version_ttl = version_ttl
+        self.local_ttl = local_ttl
+        self.timeout = timeout
+        self.local = OrderedDict()
+        self.versions = {}
+        self.metrics = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def version(self, label):
+        with self.lock:
+            version, expires = self.versions.get(label, (None, 0))
+
+        if expires > time.monotonic():
+            return version
+
+        version_key = f'refdata:version:{label}'
+        version = self.shared.get(version_key)
+
+        if version is None:
+            self.shared.add(version_key, 1, timeout=None)
+            version = self.shared.get(version_key, 1)
+
+        with self.lock:
+            self.versions[label] = (version, time.monotonic() + self.version_ttl)
+
+        return version
+
+    def get(self, model, lookup, loader):
+        """Value of ``lookup`` for ``model`` from the process LRU, the shared cache or ``loader()``, in that order."""
+        label = model._meta.label_lower
+        digest = hashlib.sha1(lookup.encode()).hexdigest()
+        key = f'refdata:{label}:{self.version(label)}:{digest}'
+
+        with self.lock:
+            value, expires = self.local.get(key, (MISSING, 0))
+
+            if value is not MISSING and expires > time.monotonic():
+                self.local.move_to_end(key)
+                self.metrics[f'{label}.local_hits'] += 1
+                return value
+
+        value = self.shared.get(key, MISSING)
+
+        if value is MISSING:
+            self.metrics[f'{label}.misses'] += 1
+            value = loader()
+            self.shared.set(key, value, timeout=self.timeout)
+        else:
+            self.metrics[f'{label}.shared_hits'] += 1
+
+        with self.lock:
+            self.local[key] = (value, time.monotonic() + self.local_ttl)
+            self.local.move_to_end(key)
+
+            if len(self.local) > self.maxsize:
+                self.local.popitem(last=False)
+
+        return value
+
+    def invalidate(self, model):
+        label = model._meta.label_lower
+        version_key = f'refdata:version:{label}'
+
+        # With IGNORE_EXCEPTIONS a redis error makes incr and add return None instead of raising
+        try:
+            bumped = self.shared.incr(version_key) is not None
+        except ValueError:
+            bumped = self.shared.add(version_key, 2, timeout=None) is not None
+
+        if not bumped:
+            self.metrics[f'{label}.invalidation_failures'] += 1
+            logger.warning(f"Could not bump the reference cache version of {label}, other processes serve their "
+                           "cached rows until they expire")
+
+        with self.lock:
+            self.versions.pop(label, None)
+            prefix = f'refdata:{label}:'
+
+            for key in [key for key in self.local if key.startswith(prefix)]:
+                del self.local[key]
+
+        self.metrics[f'{label}.invalidations'] += 1
+
+
+reference_cache = ReferenceCache(
+    maxsize=settings.REFERENCE_CACHE_LOCAL_SIZE,
+    version_ttl=settings.REFERENCE_CACHE_VERSION_TTL,
+    local_ttl=settings.REFERENCE_CACHE_LOCAL_TTL,
+    timeout=settings.REFERENCE_CACHE_TIMEOUT,
+)
+
+
+def get_company(name):
+    from companies.models import Company
+
+    return reference_cache.get(Company, f'name:{name}', lambda: Company.objects.filter(name=name).first())
+
+
+def get_skills():
+    from skills.models import Skills
+
+    return reference_cache.get(Skills, 'all', lambda: list(Skills.objects.order_by('id')))
+
+
+def find_location(city=None, state=None, country=None):
+    """First location matching every part given, None when there is none."""
+    from locations.models import Locations
+
+    lookup = {field: value for field, value in (('city', city), ('state', state), ('country', country)) if value}
+
+    return reference_cache.get(Locations, f'find:{sorted(lookup.items())}',
+                               lambda: Locations.objects.filter(**lookup).order_by('id').first())
+
+
+def get_location_values(field):
+    """Every distinct value of ``field`` (city, state, country, country_code_iso2/iso3) as a frozenset."""
+    from locations.models import Locations
+
+    return reference_cache.get(Locations, f'values:{field}',
+                               lambda: frozenset(Locations.objects.values_list(field, flat=True).distinct()))
+
+
+def get_country_for_code(code):
+    """Country name of an ISO2 or ISO3 code, None when unknown."""
+    from locations.models import Locations
+
+    field = 'country_code_iso2' if len(code) == 2 else 'country_code_iso3'
+
+    return reference_cache.get(Locations, f'country:{field}:{code}', lambda: Locations.objects.filter(
+        **{field: code}).order_by('id').values_list('country', flat=True).first())
+
+
+def invalidate(model):
+    if model._meta.label_lower in REFERENCE_MODELS:
+        reference_cache.invalidate(model)
+
+
+def on_reference_change(sender, **kwargs):
+    # Again once the transaction commits, another process may have cached the old rows in between
+    reference_cache.invalidate(sender)
+    transaction.on_commit(lambda: reference_cache.invalidate(sender))
+
+
+def check_reference_change(sender, instance, raw=False, **kwargs):
+    """
+    Before an existing row is saved, notes whether the save changes it. The crawls save locations and companies
+    they just looked up without changing them, which must not drop the cache of the whole model every time.
+    """
+    if raw or instance._state.adding:
+        return
+
+    values = {field.attname: getattr(instance, field.attname) for field in sender._meta.concrete_fields
+              if not field.primary_key and not getattr(field, 'auto_now', False)}
+    instance._reference_changed = not sender._base_manager.filter(pk=instance.pk, **values).exists()
+
+
+def on_reference_save(sender, instance, created, **kwargs):
+    if created or getattr(instance, '_reference_changed', True):
+        on_reference_change(sender)
+
+
+def connect_invalidation(model):
+    """Connected from the ready() of the apps owning reference models. Bulk updates go through invalidate()."""
+    from django.db.models.signals import post_delete, post_save, pre_save
+
+    label = model._meta.label_lower
+    pre_save.connect(check_reference_change, sender=model, dispatch_uid=f'refdata_check_{label}')
+    post_save.connect(on_reference_save, sender=model, dispatch_uid=f'refdata_save_{label}')
+    post_delete.connect(on_reference_change, sender=model, dispatch_uid=f'refdata_delete_{label}')
+
+
+def cache_metrics():
+    """Hit, miss and invalidation counts of this process since it started, by model."""
+    return dict(reference_cache.metrics)
+
+
+def log_cache_metrics(run_logger):
+    metrics = cache_metrics()
+    print(f"Reference cache: {metrics}")
+    run_logger.info("Reference cache metrics", extra={'event': 'reference_cache', 'metrics': metrics})
@@ -1,10 +1,35 @@
+from django.core.exceptions import NON_FIELD_ERRORS
 from django.db import models
 from django.utils import timezone
 
 
-class BaseManager(models.Manager):
+class BaseQuerySet(models.QuerySet):
+    def soft_delete(self):
+        """Marks every row of the queryset deleted with a single UPDATE, returns the number of rows."""
+        return self.changed(self.update(is_deleted=True, modified=timezone.now()))
+
+    def restore(self):
+        return self.changed(self.update(is_deleted=False, modified=timezone.now()))
+
+    def changed(self, rows):
+        # update() sends no signals, drop cached reference data here instead
+        from talent_bridge_cron.cache import invalidate
+
+        if rows:
+            invalidate(self.model)
+
+        return rows
+
+
+class BaseManager(models.Manager.from_queryset(BaseQuerySet)):
+    """Live rows only, soft deleted rows are reachable through ``all_with_deleted``."""
+
     def get_queryset(self):
-        return super().get_queryset()
+        return super().get_queryset().filter(is_deleted=False)
+
+
+class AllObjectsManager(models.Manager.from_queryset(BaseQuerySet)):
+    pass
 
 
 class AbstractBaseModel(models.Model):
@@ -17,6 +42,7 @@ class AbstractBaseModel(models.Model):
     modified = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False, blank=False)
     objects = BaseManager()
+    all_with_deleted = AllObjectsManager()
 
     class Meta:
         abstract = True
@@ -24,3 +50,34 @@ class AbstractBaseModel(models.Model):
     def save(self, *args, **kwargs):
         self.modified = timezone.now()
         return super().save(*args, **kwargs)
+
+    def _perform_unique_checks(self, unique_checks):
+        """
+        Same as Django's check but through ``all_with_deleted``, soft deleted rows still hold the unique
+        constraints, so a form reusing their values gets a validation error instead of an IntegrityError.
+        """
+        errors = {}
+
+        for model_class, unique_check in unique_checks:
+            lookup_kwargs = {}
+            for field_name in unique_check:
+                field = self._meta.get_field(field_name)
+                value = getattr(self, field.attname)
+                if value is None or (field.primary_key and not self._state.adding):
+                    continue
+                lookup_kwargs[str(field_name)] = value
+
+            if len(unique_check) != len(lookup_kwargs):
+                continue
+
+            manager = getattr(model_class, 'all_with_deleted', model_class._default_manager)
+            queryset = manager.filter(**lookup_kwargs)
+            model_class_pk = self._get_pk_val(model_class._meta)
+            if not self._state.adding and model_class_pk is not None:
+                queryset = queryset.exclude(pk=model_class_pk)
+
+            if queryset.exists():
+                key = unique_check[0] if len(unique_check) == 1 else NON_FIELD_ERRORS
+                errors.setdefault(key, []).append(self.unique_error_message(model_class, unique_check))
+
+        return errors
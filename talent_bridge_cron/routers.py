@@ -0,0 +1,104 @@
+import datetime
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.admin.views.main import ChangeList
+from django.utils import timezone
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+def replica_db():
+    """Alias the read only workloads should use, the replica when REPLICA_DATABASE_URL is set, else the primary."""
+    return REPLICA if REPLICA in settings.DATABASES else PRIMARY
+
+
+def replica_db_before(moment):
+    """
+    Alias for reads that must see every row written before ``moment``. The replica once ``moment`` is more than
+    REPLICA_MAX_LAG_SECONDS ago, the primary while the replica may still be catching up.
+    """
+    if timezone.now() - moment > datetime.timedelta(seconds=settings.REPLICA_MAX_LAG_SECONDS):
+        return replica_db()
+
+    return PRIMARY
+
+
+@contextmanager
+def use_replica():
+    """
+    Reads inside the block go to the replica. Writes always go to the primary. Querysets are evaluated lazily,
+    ones returned out of the block need ``.using(replica_db())`` instead.
+    """
+    token = _read_from_replica.set(True)
+
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Everything is read from and written to the primary, except reads made inside ``use_replica()``.
+    The replica is a copy of the primary, it is never migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get():
+            return replica_db()
+
+        return None
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaChangeList(ChangeList):
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+
+        if request.method in ('GET', 'HEAD') and not pinned_to_primary(request):
+            queryset = queryset.using(replica_db())
+
+        return queryset
+
+
+def pinned_to_primary(request):
+    return request.session.get('primary_until', 0) > time.time()
+
+
+class ReplicaChangeListMixin:
+    """
+    ModelAdmin mixin listing rows from the replica. Changes, deletes and actions stay on the primary, and after
+    a change the user's changelists are read from the primary for REPLICA_PIN_SECONDS so they see their own edit.
+    """
+
+    def get_changelist(self, request, **kwargs):
+        return ReplicaChangeList
+
+    def pin_to_primary(self, request):
+        request.session['primary_until'] = time.time() + settings.REPLICA_PIN_SECONDS
+
+    def save_model(self, request, obj, form, change):
+        self.pin_to_primary(request)
+        super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        self.pin_to_primary(request)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        self.pin_to_primary(request)
+        super().delete_queryset(request, queryset)
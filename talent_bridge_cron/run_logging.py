@@ -0,0 +1,147 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import uuid
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from django.conf import settings
+
+# Attributes every LogRecord has, anything else on a record came in through ``extra`` and is written as a field
+RESERVED_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listeners = {}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in RESERVED_RECORD_ATTRS})
+
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Lets every INFO and above record through but only a ``rate`` fraction of DEBUG records,
+    which is where the per-request events live.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+
+class RunIdFilter(logging.Filter):
+    def __init__(self, run_id):
+        super().__init__()
+        self.run_id = run_id
+
+    def filter(self, record):
+        record.run_id = self.run_id
+        return True
+
+
+def _queue_handler(key, *handlers, sample_rate):
+    """
+    Starts a listener thread doing the actual I/O for ``handlers`` and returns the handler feeding it,
+    so logging from the scraping thread or the reactor is only a queue put.
+    """
+    # Configuring the same log again replaces its listener, the old thread and file are not left behind
+    _stop_listener(key)
+
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[key] = listener
+
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_rate))
+    return queue_handler
+
+
+def get_run_logger(run_name):
+    """
+    Logger for a command or scraper run writing JSON lines to ``RUN_LOGS_DIR/<run_name>.jsonl``,
+    rotated by size. Fields passed through ``extra`` are written alongside the message.
+    """
+    logger = logging.getLogger(f'runs.{run_name.replace("/", ".")}')
+
+    if run_name not in _listeners:
+        path = os.path.join(settings.RUN_LOGS_DIR, f'{run_name}.jsonl')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        file_handler = RotatingFileHandler(path, maxBytes=settings.RUN_LOG_MAX_BYTES,
+                                           backupCount=settings.RUN_LOG_BACKUP_COUNT, encoding='utf-8')
+        file_handler.setFormatter(JsonLinesFormatter())
+
+        logger.addHandler(_queue_handler(run_name, file_handler, sample_rate=settings.RUN_LOG_DEBUG_SAMPLE_RATE))
+        logger.addFilter(RunIdFilter(uuid.uuid4().hex[:12]))
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+
+    return logger
+
+
+def configure_spider_logging(log_file, log_level, sample_rate):
+    """
+    Root logging for a scrapy process, a plain text file plus the console behind a queue. The file is not
+    rotated since SaveCrawlStatsExtension uploads it whole when the spider closes.
+    """
+    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setLevel(log_level)
+    file_handler.setFormatter(formatter)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(log_level)
+    console_handler.setFormatter(formatter)
+
+    logger = logging.getLogger()
+    logger.setLevel(log_level)
+
+    # Clear existing handlers, if any
+    if logger.hasHandlers():
+        logger.handlers.clear()
+
+    logger.addHandler(_queue_handler(log_file, file_handler, console_handler, sample_rate=sample_rate))
+
+
+def flush_run_logging():
+    """Blocks until every queued record has been written."""
+    for listener in _listeners.values():
+        listener.queue.join()
+
+
+def _stop_listener(key):
+    """Writes out the queued records of the listener registered under ``key``, stops it and closes its handlers."""
+    listener = _listeners.pop(key, None)
+
+    if listener is None:
+        return
+
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def stop_run_logging():
+    for key in list(_listeners):
+        _stop_listener(key)
+
+
+atexit.register(stop_run_logging)
@@ -0,0 +1,67 @@
+import logging
+import random
+import threading
+
+import redis
+from celery import Task
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class ExclusiveTask(Task):
+    """
+    Base class for the long running periodic tasks (crawls, availability checks, skill tagging)
+
+    * ``jitter`` kwarg: when > 0 the run is pushed back by a random countdown of up to ``jitter`` seconds
+      instead of running immediately, so beat can fire at a fixed time without the crawl looking like a cron job.
+    * only one run of a given task can be active at a time, guarded by a redis lock on the broker. The lock expires
+      after ``lock_timeout`` seconds and is renewed while the run goes on, a killed worker frees it within that time.
+    * run history (args, state, result, traceback, start/end) is kept by django_celery_results.
+    """
+
+    abstract = True
+    lock_timeout = 600
+
+    def __call__(self, *args, **kwargs):
+        jitter = kwargs.pop('jitter', 0)
+
+        if jitter:
+            countdown = random.randint(0, jitter)
+            logger.info(f"Delaying {self.name} by {countdown} seconds")
+            self.apply_async(args=args, kwargs=kwargs, countdown=countdown)
+            return f'{self.name} delayed by {countdown} seconds'
+
+        lock = get_redis_connection().lock(f'lock:{self.name}', timeout=self.lock_timeout, blocking=False)
+
+        if not lock.acquire():
+            logger.warning(f"{self.name} is already running, skipping this run")
+            return f'{self.name} skipped, already running'
+
+        finished = threading.Event()
+        threading.Thread(target=keep_lock, args=(lock, self.lock_timeout, finished), daemon=True).start()
+
+        close_old_connections()
+        try:
+            return super().__call__(*args, **kwargs)
+        finally:
+            finished.set()
+            close_old_connections()
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                logger.warning(f"Lock for {self.name} expired before the run finished")
+
+
+def keep_lock(lock, timeout, finished):
+    """Renews ``lock`` for another ``timeout`` seconds every third of it, until ``finished`` is set."""
+    while not finished.wait(timeout / 3):
+        try:
+            lock.reacquire()
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Could not renew lock {lock.name}: {e}")
+
+
+def get_redis_connection():
+    return redis.Redis.from_url(settings.CELERY_BROKER_URL)
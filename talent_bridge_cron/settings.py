@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 import os
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -32,6 +33,7 @@ AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME')
 BUCKET_TYPE = config('BUCKET_TYPE')
 
 DATABASE_URL = config('DATABASE_URL')
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
 REDIS_CLOUD_URL = config('REDIS_CLOUD_URL')
 
 MAIL_JET_API_KEY = config('MAIL_JET_API_KEY')
@@ -116,6 +118,18 @@ import dj_database_url
 #updated
 DATABASES = {'default': dj_database_url.config(default=config('DATABASE_URL'))}
 
+# Read only workloads (stats rebuilds, search, admin changelists) go to a read replica when one is configured,
+# see talent_bridge_cron.routers. Tests read the replica through the test database of default.
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(REPLICA_DATABASE_URL)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['talent_bridge_cron.routers.ReplicaRouter']
+# Seconds an admin user's changelists are read from the primary after they changed something
+REPLICA_PIN_SECONDS = 10
+# Upper bound of the replica's replication lag, reads that must see recent writes use the primary until then
+REPLICA_MAX_LAG_SECONDS = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -258,13 +272,101 @@ MAIL_JET_API_KEY = config('MAIL_JET_API_KEY')
 MAIL_JET_API_SECRET = config('MAIL_JET_API_SECRET')
 MAIL_JET_EMAIL_ADDRESS = config('MAIL_JET_EMAIL_ADDRESS')
 
+# Run logs written by the management commands and scrapers, see talent_bridge_cron/run_logging.py
+RUN_LOGS_DIR = os.path.join(BASE_DIR, 'logging')
+RUN_LOG_MAX_BYTES = 10 * 1024 * 1024
+RUN_LOG_BACKUP_COUNT = 5
+RUN_LOG_DEBUG_SAMPLE_RATE = 0.05  # Fraction of DEBUG (per-request) records that are kept
+
+# Selenium scrapers, see jobs/utility.py
+SELENIUM_HEADLESS = config('SELENIUM_HEADLESS', cast=bool, default=False)
+SELENIUM_POOL_SIZE = config('SELENIUM_POOL_SIZE', cast=int, default=1)
+SELENIUM_PROFILES_DIR = os.path.join(BASE_DIR, 'selenium', 'profiles')
+SELENIUM_DRIVER_PATH_CACHE = os.path.join(BASE_DIR, 'selenium', 'chromedriver_path.txt')
+SELENIUM_BROWSER_PROFILE = {
+    'block_images': config('SELENIUM_BLOCK_IMAGES', cast=bool, default=True),
+    'block_media': True,
+    # Chrome URL patterns, fonts, media files and third party analytics/tracking hosts
+    'blocked_urls': [
+        '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+        '*.mp4', '*.webm', '*.mp3', '*.m3u8',
+        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*connect.facebook.net*',
+        '*hotjar.com*', '*segment.io*', '*segment.com*', '*optimizely.com*', '*newrelic.com*', '*nr-data.net*',
+        '*linkedin.com/px*', '*bat.bing.com*', '*clarity.ms*', '*fullstory.com*', '*qualtrics.com*',
+    ],
+    'disabled_features': [
+        'Translate', 'MediaRouter', 'OptimizationHints', 'AutofillServerCommunication', 'InterestFeedContentSuggestions',
+    ],
+    'extra_arguments': [
+        '--disable-background-networking', '--disable-sync', '--disable-default-apps', '--no-first-run',
+        '--disable-notifications', '--disable-client-side-phishing-detection',
+    ],
+}
+
+# HTTP availability checks of stored jobs, see jobs.availability
+AVAILABILITY_CONCURRENCY = config('AVAILABILITY_CONCURRENCY', cast=int, default=100)
+AVAILABILITY_PER_DOMAIN_CONCURRENCY = config('AVAILABILITY_PER_DOMAIN_CONCURRENCY', cast=int, default=8)
+AVAILABILITY_TIMEOUT = 20
+AVAILABILITY_REQUEST_BUDGET = config('AVAILABILITY_REQUEST_BUDGET', cast=int, default=5000)  # Jobs checked per run
+AVAILABILITY_CHUNK_SIZE = 500  # Jobs read, checked and written back at a time
+# A job is rechecked once the chance it closed since the last check reaches this probability
+AVAILABILITY_RECHECK_PROBABILITY = 0.2
+AVAILABILITY_DEFAULT_CLOSURE_RATE = 0.02  # Daily closure rate of companies without history
+AVAILABILITY_CLOSURE_RATE_WINDOW_DAYS = 30
+AVAILABILITY_AGE_SCALE_DAYS = 30  # The closure rate of a job grows by the company rate every this many days of age
+AVAILABILITY_MIN_RECHECK_HOURS = 12
+AVAILABILITY_MAX_RECHECK_DAYS = 14
+AVAILABILITY_ERROR_RECHECK_HOURS = 6
+
+# Jobs missing from this many consecutive complete crawls of their company are marked unavailable
+LISTING_DIFF_MISSES = 2
+# A crawl listing less than this share of the company's available jobs is treated as partial and ignored
+LISTING_DIFF_MIN_SHARE = 0.5
+# Companies with a complete crawl this recent are left out of the per job availability checks
+LISTING_DIFF_MAX_AGE_DAYS = 3
+
+# Jobs closed for longer than this are moved to the archive by the archive_jobs command
+JOBS_ARCHIVE_AFTER_DAYS = 90
+
+# Jobs whose SimHash differs in at most this many bits are near duplicates, must stay below 4, see jobs.dedupe
+DUPLICATE_MAX_DISTANCE = 3
+DUPLICATE_MAX_BUCKET = 1000  # Jobs compared per band value when clustering, see jobs.dedupe.cluster
+
+# scrapyd API used by scrapy_manager, see scrapy_manager.scrapyd
+SCRAPYD_URL = config('SCRAPYD_URL', default='http://localhost:6800')
+SCRAPYD_TIMEOUT = (3.05, 30)  # connect, read seconds
+SCRAPYD_RETRIES = 3
+SCRAPYD_BACKOFF = 0.5  # seconds, doubled on every retry
+SCRAPYD_POOL_SIZE = 10  # connections kept open, also the number of spiders scheduled in parallel
+# Spider run queue, see scrapy_manager.dispatch
+SPIDER_MAX_RUNNING = 8  # runs pending or running on scrapyd at once
+SPIDER_MAX_RUNNING_PER_PROJECT = 8
+SPIDER_MAX_RUNNING_PER_DOMAIN = 1  # two crawls of the same site trip its rate limits
+SPIDER_DISPATCH_BATCH = 50  # queued runs looked at per dispatch
+SPIDER_RUN_MAX_ATTEMPTS = 3  # scrapyd refusals before a run is failed
+SPIDER_RUN_RETRY_SECONDS = 60  # doubled after every refusal
+SPIDER_RUN_START_TIMEOUT = 600  # seconds after which a run still starting is taken for lost and queued again
+# Bytes read from a crawl log per gzip write, the upload never holds more than this in memory
+CRAWL_LOG_CHUNK_SIZE = 1024 * 1024
+# A crawl log is uploaded once scrapyd reports its job finished, checked this often and this many times
+CRAWL_LOG_WAIT_SECONDS = 15
+CRAWL_LOG_WAIT_RETRIES = 20
+
 #Caching
-# CACHES = {
-#     "default": {
-#         "BACKEND": "django_redis.cache.RedisCache",
-#         "LOCATION": config('REDISCLOUD_URL'),
-#     }
-# }
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": REDIS_CLOUD_URL,
+        # Redis being down makes the reference cache fall through to the database instead of failing
+        "OPTIONS": {"IGNORE_EXCEPTIONS": True},
+    }
+}
+
+# Companies, locations and skills lookups, see talent_bridge_cron.cache
+REFERENCE_CACHE_LOCAL_SIZE = 10000  # entries of the per process LRU
+REFERENCE_CACHE_VERSION_TTL = 30  # seconds a process trusts its copy of the versions, bounds cross process staleness
+REFERENCE_CACHE_LOCAL_TTL = 300  # seconds an LRU entry lives, bounds staleness when redis missed a version bump
+REFERENCE_CACHE_TIMEOUT = 24 * 3600
 
 # Celery settings
 CELERY_BROKER_URL = 'redis://localhost:6379/0'  # Use Redis or another broker of your choice
@@ -273,9 +375,56 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Redis hands a task not acknowledged within visibility_timeout to another worker. Jittered runs wait in the
+# queue with a countdown, so this must stay above the largest jitter in CELERY_BEAT_SCHEDULE or they run twice.
+CELERY_BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 6 * 3600}
+
+CELERY_RESULT_EXTENDED = True  # Keep task name, args and worker in the run history
+CELERY_TASK_TRACK_STARTED = True
+# Crawls, availability checks and skill tagging hold selenium and spaCy memory, they run on their own worker which
+# gets a fresh process per run, the frequent scrapy_manager tasks stay on the default queue:
+#   celery -A talent_bridge_cron worker -Q heavy --concurrency=1 --max-tasks-per-child=1
+#   celery -A talent_bridge_cron worker -Q celery
+CELERY_TASK_ROUTES = {
+    'jobs.tasks.update_jobs_data': {'queue': 'heavy'},
+    'jobs.tasks.check_unavailable_jobs': {'queue': 'heavy'},
+    'skills.tasks.update_skills_on_jobs': {'queue': 'heavy'},
+}
 
 # Django-Celery-Results settings
 INSTALLED_APPS += ['django_celery_results']
 
 # Make sure the Django-Celery-Results tables are created
-CELERY_RESULT_BACKEND = 'django-db'
\ No newline at end of file
+CELERY_RESULT_BACKEND = 'django-db'
+
+# Django-Celery-Beat settings, periodic schedule is stored in the database and can be paused or run from the admin
+INSTALLED_APPS += ['django_celery_beat']
+
+CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+
+# Initial schedule, synced into the database by beat on startup. jitter is in seconds.
+CELERY_BEAT_SCHEDULE = {
+    'update-jobs-data': {
+        'task': 'jobs.tasks.update_jobs_data',
+        'schedule': crontab(minute=0, hour=1),
+        'kwargs': {'jitter': 4 * 3600},
+    },
+    'check-unavailable-jobs': {
+        'task': 'jobs.tasks.check_unavailable_jobs',
+        'schedule': crontab(minute=0, hour=9),
+        'kwargs': {'jitter': 2 * 3600},
+    },
+    'update-skills-on-jobs': {
+        'task': 'skills.tasks.update_skills_on_jobs',
+        'schedule': crontab(minute=0, hour=15),
+        'kwargs': {'jitter': 2 * 3600},
+    },
+    'reconcile-scrapy-jobs': {
+        'task': 'scrapy_manager.tasks.reconcile_scrapy_jobs',
+        'schedule': crontab(minute='*/5'),
+    },
+    'dispatch-spider-runs': {
+        'task': 'scrapy_manager.tasks.dispatch_spider_runs',
+        'schedule': crontab(),
+    },
+}
\ No newline at end of file
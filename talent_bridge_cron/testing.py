@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+
+# Test cases that save reference rows or upload files run against a per process in-memory cache instead of redis,
+# and store uploads (crawl logs) in a local directory instead of S3/MinIO
+local_services = override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage',
+    MEDIA_ROOT=os.path.join(tempfile.gettempdir(), f'{settings.PROJECT_NAME}_test_media'),
+)
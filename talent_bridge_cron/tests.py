@@ -0,0 +1,339 @@
+import datetime
+import logging
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs.stats import reconcile_day
+from scrapy_manager.models import ScrapyProject, ScrapySpider, SpiderRun
+from skills.models import Skills
+from talent_bridge_cron import cache, run_logging
+from talent_bridge_cron.routers import PRIMARY, REPLICA, replica_db_before, use_replica
+from talent_bridge_cron.scheduling import ExclusiveTask, keep_lock
+from talent_bridge_cron.testing import local_services
+
+
+@shared_task(bind=True, base=ExclusiveTask)
+def exclusive_task(self, value):
+    return value
+
+
+class FakeLock:
+
+    name = 'lock:test'
+
+    def __init__(self, acquired):
+        self.acquired = acquired
+        self.released = False
+        self.renewals = 0
+
+    def acquire(self):
+        return self.acquired
+
+    def reacquire(self):
+        self.renewals += 1
+
+    def release(self):
+        self.released = True
+
+
+class ExclusiveTaskTests(SimpleTestCase):
+
+    def run_with_lock(self, acquired):
+        lock = FakeLock(acquired)
+        redis = mock.Mock(**{'lock.return_value': lock})
+
+        with mock.patch('talent_bridge_cron.scheduling.get_redis_connection', return_value=redis):
+            result = exclusive_task(value=1)
+
+        redis.lock.assert_called_once_with(f'lock:{exclusive_task.name}', timeout=ExclusiveTask.lock_timeout,
+                                           blocking=False)
+        return result, lock
+
+    def test_jitter_enqueues_the_run_again_with_a_countdown(self):
+        with mock.patch.object(exclusive_task, 'apply_async') as apply_async, \
+                mock.patch('talent_bridge_cron.scheduling.random.randint', return_value=42), \
+                mock.patch('talent_bridge_cron.scheduling.get_redis_connection') as get_redis_connection:
+            result = exclusive_task(value=1, jitter=3600)
+
+        # The jitter is dropped from the delayed run, which takes the lock when it runs
+        apply_async.assert_called_once_with(args=(), kwargs={'value': 1}, countdown=42)
+        get_redis_connection.assert_not_called()
+        self.assertEqual(result, f'{exclusive_task.name} delayed by 42 seconds')
+
+    def test_runs_and_releases_the_lock(self):
+        result, lock = self.run_with_lock(acquired=True)
+
+        self.assertEqual(result, 1)
+        self.assertTrue(lock.released)
+
+    def test_skips_while_another_run_holds_the_lock(self):
+        result, lock = self.run_with_lock(acquired=False)
+
+        self.assertEqual(result, f'{exclusive_task.name} skipped, already running')
+        self.assertFalse(lock.released)
+
+    def test_lock_is_renewed_until_the_run_finishes(self):
+        lock = FakeLock(acquired=True)
+        finished = threading.Event()
+        keeper = threading.Thread(target=keep_lock, args=(lock, 0.03, finished))
+        keeper.start()
+
+        time.sleep(0.1)
+        finished.set()
+        keeper.join(1)
+
+        self.assertFalse(keeper.is_alive())
+        self.assertGreaterEqual(lock.renewals, 2)
+
+    def test_heavy_tasks_run_on_their_own_queue(self):
+        for name in ('jobs.tasks.update_jobs_data', 'jobs.tasks.check_unavailable_jobs',
+                     'skills.tasks.update_skills_on_jobs'):
+            self.assertEqual(settings.CELERY_TASK_ROUTES[name], {'queue': 'heavy'})
+
+        self.assertNotIn('scrapy_manager.tasks.dispatch_spider_runs', settings.CELERY_TASK_ROUTES)
+        self.assertFalse(hasattr(settings, 'CELERY_WORKER_MAX_TASKS_PER_CHILD'))
+
+    def test_jitter_stays_below_the_broker_visibility_timeout(self):
+        visibility_timeout = settings.CELERY_BROKER_TRANSPORT_OPTIONS['visibility_timeout']
+
+        for name, entry in settings.CELERY_BEAT_SCHEDULE.items():
+            self.assertLess(entry.get('kwargs', {}).get('jitter', 0), visibility_timeout, name)
+
+
+class RunLoggingTests(SimpleTestCase):
+
+    def setUp(self):
+        root = logging.getLogger()
+        self.addCleanup(setattr, root, 'handlers', root.handlers[:])
+        self.addCleanup(root.setLevel, root.level)
+        self.addCleanup(run_logging.stop_run_logging)
+
+    def test_configuring_the_same_log_again_stops_the_old_listener(self):
+        with tempfile.NamedTemporaryFile(suffix='.log') as log_file:
+            run_logging.configure_spider_logging(log_file.name, logging.INFO, sample_rate=1)
+            first = run_logging._listeners[log_file.name]
+            first_file_handler = first.handlers[0]
+
+            run_logging.configure_spider_logging(log_file.name, logging.INFO, sample_rate=1)
+            second = run_logging._listeners[log_file.name]
+
+            self.assertIsNot(first, second)
+            self.assertIsNone(first._thread)
+            self.assertIsNone(first_file_handler.stream)
+
+            logging.getLogger('spider').info('after reconfigure')
+            run_logging.stop_run_logging()
+
+            self.assertEqual(run_logging._listeners, {})
+            with open(log_file.name) as written:
+                self.assertIn('after reconfigure', written.read())
+
+
+@local_services
+class ReplicaRouterTests(TransactionTestCase):
+    """
+    Runs with a replica, a second connection to the test database, to see which connection each query goes to.
+    Rows are committed, so the replica always has them, like one without lag.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # The test database exists by now, the replica is added here so that other tests keep reading the primary.
+        # connections reads its aliases from settings.DATABASES.
+        primary = connections[PRIMARY].settings_dict
+        replica = {**primary, 'TEST': {**primary['TEST'], 'MIRROR': PRIMARY}}
+        cls.databases_patch = mock.patch.dict(settings.DATABASES, {REPLICA: replica})
+        cls.databases_patch.start()
+        cls.databases = {PRIMARY, REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        cls.databases_patch.stop()
+
+    def setUp(self):
+        self.primary = CaptureQueriesContext(connections[PRIMARY])
+        self.replica = CaptureQueriesContext(connections[REPLICA])
+
+    def queries(self, context, table):
+        return [query['sql'] for query in context.captured_queries if table in query['sql']]
+
+    def test_reads_in_use_replica_go_to_the_replica(self):
+        Skills.objects.create(name='Python')
+
+        with self.primary, self.replica:
+            with use_replica():
+                self.assertEqual(list(Skills.objects.values_list('name', flat=True)), ['Python'])
+
+        self.assertEqual(len(self.queries(self.replica, 'skills')), 1)
+        self.assertEqual(self.queries(self.primary, 'skills'), [])
+
+    def test_reads_outside_use_replica_go_to_the_primary(self):
+        with self.primary, self.replica:
+            Skills.objects.count()
+
+        self.assertEqual(len(self.queries(self.primary, 'skills')), 1)
+        self.assertEqual(self.queries(self.replica, 'skills'), [])
+
+    def test_writes_go_to_the_primary(self):
+        with self.primary, self.replica:
+            with use_replica():
+                skill = Skills.objects.create(name='Python')
+                Skills.objects.filter(id=skill.id).update(name='Go')
+                skill.delete()
+
+        self.assertTrue(self.queries(self.primary, 'skills'))
+        self.assertEqual(self.queries(self.replica, 'skills'), [])
+
+    def test_select_for_update_goes_to_the_primary(self):
+        Skills.objects.create(name='Python')
+
+        with self.primary, self.replica:
+            with use_replica(), transaction.atomic():
+                list(Skills.objects.select_for_update())
+
+        self.assertEqual(len(self.queries(self.primary, 'skills')), 1)
+        self.assertEqual(self.queries(self.replica, 'skills'), [])
+
+    def test_reads_of_recent_writes_stay_on_the_primary(self):
+        now = timezone.now()
+        max_lag = datetime.timedelta(seconds=settings.REPLICA_MAX_LAG_SECONDS)
+
+        self.assertEqual(replica_db_before(now - max_lag / 2), PRIMARY)
+        self.assertEqual(replica_db_before(now - max_lag * 2), REPLICA)
+
+    def test_stats_of_today_are_rebuilt_from_the_primary(self):
+        today = timezone.localdate()
+
+        with self.replica:
+            reconcile_day(today)
+        self.assertEqual(self.queries(self.replica, 'jobs'), [])
+
+        with self.replica:
+            reconcile_day(today - datetime.timedelta(days=2))
+        self.assertEqual(len(self.queries(self.replica, 'jobs')), 2)
+
+    def test_admin_reads_the_primary_after_a_change(self):
+        user = get_user_model().objects.create_superuser(email='admin@example.com', username='admin',
+                                                         password='password')
+        get_user_model().objects.filter(id=user.id).update(is_active=True)
+        self.client.force_login(user)
+        spider = ScrapySpider.objects.create(project=ScrapyProject.objects.create(name='scraper'), name='spider')
+        run = SpiderRun.objects.create(spider=spider)
+        changelist = reverse('admin:scrapy_manager_spiderrun_changelist')
+
+        with self.replica:
+            self.assertEqual(self.client.get(changelist).status_code, 200)
+        self.assertTrue(self.queries(self.replica, 'spiderrun'))
+
+        self.client.post(changelist, {'action': 'cancel_runs', '_selected_action': [run.id]})
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'cancelled')
+
+        with self.replica:
+            self.assertEqual(self.client.get(changelist).status_code, 200)
+        self.assertEqual(self.queries(self.replica, 'spiderrun'), [])
+
+
+@local_services
+class ReferenceCacheTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        # A fresh process, and a second one sharing the same cache
+        self.cache = cache.ReferenceCache(version_ttl=0)
+        self.other = cache.ReferenceCache(version_ttl=0)
+        patcher = mock.patch.object(cache, 'reference_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_second_lookup_comes_from_the_process_then_the_shared_cache(self):
+        loader = mock.Mock(return_value='Acme')
+
+        self.assertEqual(self.cache.get(Skills, 'name:Acme', loader), 'Acme')
+        self.assertEqual(self.cache.get(Skills, 'name:Acme', loader), 'Acme')
+        self.assertEqual(self.other.get(Skills, 'name:Acme', loader), 'Acme')
+
+        loader.assert_called_once_with()
+        self.assertEqual(self.cache.metrics, {'skills.skills.misses': 1, 'skills.skills.local_hits': 1})
+        self.assertEqual(self.other.metrics, {'skills.skills.shared_hits': 1})
+
+    def test_saving_and_deleting_a_row_bumps_the_version(self):
+        python = Skills.objects.create(name='Python')
+        self.assertEqual(cache.get_skills(), [python])
+        self.other.get(Skills, 'all', lambda: list(Skills.objects.order_by('id')))
+
+        go = Skills.objects.create(name='Go')
+        self.assertEqual(cache.get_skills(), [python, go])
+        self.assertEqual(self.other.get(Skills, 'all', lambda: list(Skills.objects.order_by('id'))), [python, go])
+
+        go.delete()
+        self.assertEqual(cache.get_skills(), [python])
+        # Three changes, each bumped the version once
+        self.assertEqual(self.cache.version('skills.skills'), 4)
+        self.assertEqual(self.cache.metrics['skills.skills.invalidations'], 3)
+        self.assertEqual(cache.cache_metrics(), dict(self.cache.metrics))
+
+    def test_unchanged_saves_keep_the_version(self):
+        python = Skills.objects.create(name='Python')
+        version = self.cache.version('skills.skills')
+
+        Skills.objects.get_or_create(name='Python')
+        python.save()
+        Skills.objects.get(id=python.id).save()
+        self.assertEqual(self.cache.version('skills.skills'), version)
+
+        python.name = 'Python 3'
+        python.save()
+        self.assertEqual(self.cache.version('skills.skills'), version + 1)
+        self.assertEqual(cache.get_skills(), [python])
+
+    def test_bulk_updates_bump_the_version(self):
+        Skills.objects.create(name='Python')
+        cache.get_skills()
+
+        Skills.objects.filter(name='Python').soft_delete()
+
+        self.assertEqual(cache.get_skills(), [])
+
+    def test_lost_version_bump_is_logged_and_local_entries_expire(self):
+        loader = mock.Mock(side_effect=['old', 'new'])
+        self.other.get(Skills, 'all', loader)
+
+        # What django_redis returns with IGNORE_EXCEPTIONS when redis is unreachable
+        with mock.patch.object(caches['default'], 'incr', return_value=None), \
+                self.assertLogs('talent_bridge_cron.cache', 'WARNING'):
+            self.cache.invalidate(Skills)
+        self.assertEqual(self.cache.metrics['skills.skills.invalidation_failures'], 1)
+
+        self.assertEqual(self.other.get(Skills, 'all', loader), 'old')
+
+        caches['default'].clear()
+        expired = time.monotonic() + self.other.local_ttl + 1
+        with mock.patch('talent_bridge_cron.cache.time.monotonic', return_value=expired):
+            self.assertEqual(self.other.get(Skills, 'all', loader), 'new')
+
+    def test_least_recently_used_entries_are_evicted(self):
+        small = cache.ReferenceCache(maxsize=2)
+
+        for name in ('a', 'b', 'a', 'c'):
+            small.get(Skills, name, lambda: name)
+
+        self.assertEqual(len(small.local), 2)
+        small.get(Skills, 'a', mock.Mock())
+        self.assertEqual(small.metrics['skills.skills.local_hits'], 2)